@@ -1,146 +1,346 @@
 # backend/ai_detector.py
-import re
 from statistics import mean, stdev
 import math
 import random  # For demonstration purposes only
+import hashlib
+import json
+import time
+import numpy as np
+import text_features
+from text_features import extract_features, chunk_diversities, sentence_texts
 
-def detect_ai_content(text):
-    """Detect AI-generated content using improved heuristic methods"""
+WEIGHTS = {
+    'sentence_variety': 0.25,
+    'word_repetition': 0.3,
+    'transition_usage': 0.2,
+    'burstiness': 0.25
+}
+
+def _scoring_version():
+    """Fingerprint of the weights and the scoring code, so cached results from an
+    older version of the heuristics are never reused"""
+    digest = hashlib.sha256(json.dumps(WEIGHTS, sort_keys=True).encode('utf-8'))
+    for path in (__file__, text_features.__file__):
+        with open(path, 'rb') as source:
+            digest.update(source.read())
+    return digest.hexdigest()[:16]
+
+SCORING_VERSION = _scoring_version()
+
+class _stage:
+    """Add the time spent in the block to timings[name] when timings are requested.
+
+    A plain class rather than @contextmanager: it runs several times per request,
+    and metrics keep it on permanently.
+    """
+    __slots__ = ('timings', 'name', 'start')
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        if self.timings is not None:
+            self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        if self.timings is not None:
+            self.timings[self.name] = self.timings.get(self.name, 0.0) + time.perf_counter() - self.start
+
+def empty_result():
+    """Result returned for texts too short to analyze"""
+    return {
+        'ai_percentage': 0,
+        'highlighted_sections': [],
+        'details': {
+            'sentence_variety': 0,
+            'word_repetition': 0,
+            'transition_usage': 0,
+            'burstiness': 0
+        }
+    }
+
+def find_highlighted_sections(text, features):
+    """Find up to 3 sentences that appear most AI-generated"""
+    sentence_lengths = features.sentence_lengths
+    highlighted_sections = []
+    if len(sentence_lengths) > 3:
+        avg_length = mean(sentence_lengths)
+        candidates = []
+        
+        for i, length in enumerate(sentence_lengths):
+            # Only sentences with a transition word and a length very close to
+            # the average score above 50 (30 + 40); scores are assigned in
+            # document order, so the top 3 are simply the first 3 such sentences
+            if length > 5 and features.sentence_transitions[i] and abs(length - avg_length) < 2:
+                candidates.append(i)
+                if len(candidates) == 3:
+                    break
+        
+        originals = sentence_texts(text, features, candidates)
+        for i in candidates:
+            if len(originals[i]) > 20:
+                highlighted_sections.append(originals[i])
+    return highlighted_sections
+
+def build_result(sentence_count, sentence_variance, word_count, unique_words,
+                 transition_count, chunk_diversity, highlighted_sections, statistics=None):
+    """Turn raw text statistics into the detect_ai_content result dict.
+
+    If statistics is a dict, the raw statistics and the component scores
+    before rounding are added to it, for the feature store.
+    """
+    # 1. Sentence structure variety
+    # AI text often has consistent sentence lengths
+    sentence_variety_score = min(100, max(0, 100 - (20 * (5 / (sentence_variance + 1)))))
+    
+    # 2. Word repetition analysis (only meaningful words count as unique)
+    if word_count > 0 and unique_words:
+        unique_ratio = unique_words / word_count
+        repetition_score = min(100, max(0, 100 * (1 - unique_ratio) * 3))
+    else:
+        repetition_score = 0
+    
+    # 3. Transition words analysis
+    # Normalize by text length
+    transition_ratio = transition_count / (word_count / 100) if word_count > 0 else 0
+    transition_score = min(100, max(0, transition_ratio * 10))
+    
+    # 4. Burstiness (human writing tends to be more "bursty" with varied word usage)
+    chunk_stdev = None
+    if sentence_count > 5:
+        # Calculate variance in lexical diversity
+        if len(chunk_diversity) > 1:
+            chunk_stdev = stdev(chunk_diversity)
+        burstiness = chunk_stdev * 100 if chunk_stdev is not None else 50
+        burstiness_score = min(100, max(0, 100 - burstiness))
+    else:
+        burstiness_score = 50
+    
+    # Calculate final score with weighted components
+    ai_percentage = int(
+        sentence_variety_score * WEIGHTS['sentence_variety'] +
+        repetition_score * WEIGHTS['word_repetition'] +
+        transition_score * WEIGHTS['transition_usage'] +
+        burstiness_score * WEIGHTS['burstiness']
+    )
+
+    if statistics is not None:
+        statistics.update(
+            sentence_count=sentence_count, sentence_length_stdev=sentence_variance,
+            word_count=word_count, unique_long_words=unique_words, transition_count=transition_count,
+            chunk_diversity_stdev=chunk_stdev if chunk_stdev is not None else math.nan,
+            sentence_variety=sentence_variety_score, word_repetition=repetition_score,
+            transition_usage=transition_score, burstiness=burstiness_score, ai_percentage=ai_percentage
+        )
+    
+    return {
+        'ai_percentage': ai_percentage,
+        'highlighted_sections': highlighted_sections,
+        'details': {
+            'sentence_variety': int(sentence_variety_score),
+            'word_repetition': int(repetition_score),
+            'transition_usage': int(transition_score),
+            'burstiness': int(burstiness_score)
+        }
+    }
+
+def detect_ai_content(text, timings=None, progress=None, statistics=None, max_ms=None, sample_rate=None):
+    """Detect AI-generated content using improved heuristic methods.
+
+    Pass a dict as timings to get the seconds spent in each stage, a
+    function as progress to hear how much of the text has been tokenized,
+    and a dict as statistics to get the numbers the score was built from
+    (left empty for texts too short to analyze).
+
+    With max_ms (a latency budget) or sample_rate (the largest share of
+    sentences to read), a large text is scored from a sample of its
+    sentences instead; see approximate_detector.
+    """
+    if max_ms is not None or sample_rate is not None:
+        # Imported here: approximate_detector builds on this module
+        from approximate_detector import detect_approximate
+        deadline = time.time() + max_ms / 1000 if max_ms is not None else None
+        return detect_approximate(text, deadline, sample_rate, timings)
     try:
         if not text or len(text) < 50:
-            return {
-                'ai_percentage': 0,
-                'highlighted_sections': [],
-                'details': {
-                    'sentence_variety': 0,
-                    'word_repetition': 0,
-                    'transition_usage': 0,
-                    'burstiness': 0
-                }
-            }
+            return empty_result()
 
-        # Split into sentences
-        sentences = re.split(r'[.!?]+', text)
-        sentences = [s.strip() for s in sentences if s.strip()]
-        
-        # 1. Sentence structure variety
-        sentence_lengths = [len(s.split()) for s in sentences]
+        # Tokenize once: sentences, words and transition hits in a single pass
+        with _stage(timings, 'extraction'):
+            features = extract_features(text, progress)
+        sentence_lengths = features.sentence_lengths
         
         # Calculate variance and normalize based on text length
-        try:
+        with _stage(timings, 'sentence_variety'):
             sentence_variance = stdev(sentence_lengths) if len(sentence_lengths) > 1 else 0
-            # AI text often has consistent sentence lengths
-            sentence_variety_score = min(100, max(0, 100 - (20 * (5 / (sentence_variance + 1)))))
-        except:
-            sentence_variety_score = 50
-        
-        # 2. Word repetition analysis
-        words = re.findall(r'\b\w+\b', text.lower())
-        word_count = len(words)
         
-        if word_count > 0:
-            word_freq = {}
-            for word in words:
-                if len(word) > 3:  # Only consider meaningful words
-                    word_freq[word] = word_freq.get(word, 0) + 1
-            
-            # Calculate repetition score
-            if word_freq:
-                unique_ratio = len(word_freq) / word_count
-                repetition_score = min(100, max(0, 100 * (1 - unique_ratio) * 3))
-            else:
-                repetition_score = 0
-        else:
-            repetition_score = 0
+        with _stage(timings, 'word_repetition'):
+            unique_words = features.unique_long_words()
         
-        # 3. Transition words analysis
-        transition_words = [
-            'however', 'therefore', 'moreover', 'furthermore', 'consequently',
-            'additionally', 'nevertheless', 'thus', 'hence', 'accordingly',
-            'subsequently', 'meanwhile', 'conversely', 'similarly', 'likewise'
-        ]
+        # Calculate lexical diversity in different parts of the text
+        with _stage(timings, 'burstiness'):
+            chunk_diversity = (chunk_diversities(features.token_ids, features.long_word_mask())
+                               if len(sentence_lengths) > 5 else None)
         
-        transition_count = sum(text.lower().count(" " + word + " ") for word in transition_words)
-        # Normalize by text length
-        transition_ratio = transition_count / (word_count / 100) if word_count > 0 else 0
-        transition_score = min(100, max(0, transition_ratio * 10))
-        
-        # 4. Burstiness (human writing tends to be more "bursty" with varied word usage)
-        if len(sentences) > 5:
-            # Calculate lexical diversity in different parts of the text
-            chunks = [words[i:i+len(words)//3] for i in range(0, len(words), len(words)//3)]
-            chunk_diversities = []
-            
-            for chunk in chunks:
-                if chunk:
-                    chunk_freq = {}
-                    for word in chunk:
-                        if len(word) > 3:
-                            chunk_freq[word] = chunk_freq.get(word, 0) + 1
-                    chunk_diversities.append(len(chunk_freq) / len(chunk))
-            
-            # Calculate variance in lexical diversity
-            burstiness = stdev(chunk_diversities) * 100 if len(chunk_diversities) > 1 else 50
-            burstiness_score = min(100, max(0, 100 - burstiness))
-        else:
-            burstiness_score = 50
-        
-        # Calculate final score with weighted components
-        weights = {
-            'sentence_variety': 0.25,
-            'word_repetition': 0.3,
-            'transition_usage': 0.2,
-            'burstiness': 0.25
-        }
+        with _stage(timings, 'highlighting'):
+            highlighted_sections = find_highlighted_sections(text, features)
         
-        ai_percentage = int(
-            sentence_variety_score * weights['sentence_variety'] +
-            repetition_score * weights['word_repetition'] +
-            transition_score * weights['transition_usage'] +
-            burstiness_score * weights['burstiness']
-        )
-        
-        # Find sections that appear most AI-generated
-        highlighted_sections = []
-        if len(sentences) > 3:
-            sentence_scores = []
-            
-            for i, sentence in enumerate(sentences):
-                if len(sentence.split()) > 5:
-                    # Score each sentence based on length, common phrases, etc.
-                    words_in_sentence = sentence.lower().split()
-                    
-                    # Check for transition words
-                    has_transition = any(word in transition_words for word in words_in_sentence)
-                    
-                    # Check for sentence length compared to average
-                    avg_length = mean(sentence_lengths)
-                    length_diff = abs(len(words_in_sentence) - avg_length)
-                    
-                    # Score the sentence
-                    sentence_score = 0
-                    if has_transition:
-                        sentence_score += 30
-                    if length_diff < 2:  # Very close to average length
-                        sentence_score += 40
-                    
-                    sentence_scores.append((i, sentence, sentence_score))
-            
-            # Sort by score and take top 3
-            sentence_scores.sort(key=lambda x: x[2], reverse=True)
-            for _, sentence, score in sentence_scores[:3]:
-                if score > 50 and len(sentence) > 20:
-                    highlighted_sections.append(sentence)
-        
-        return {
-            'ai_percentage': ai_percentage,
-            'highlighted_sections': highlighted_sections,
-            'details': {
-                'sentence_variety': int(sentence_variety_score),
-                'word_repetition': int(repetition_score),
-                'transition_usage': int(transition_score),
-                'burstiness': int(burstiness_score)
-            }
-        }
+        with _stage(timings, 'scoring'):
+            if statistics is not None:
+                statistics['sentence_length_mean'] = (sum(sentence_lengths) / len(sentence_lengths)
+                                                      if sentence_lengths else 0.0)
+                statistics['transition_sentences'] = features.sentence_transitions.count(1)
+            return build_result(
+                len(sentence_lengths), sentence_variance, features.word_count,
+                unique_words, features.transition_count, chunk_diversity,
+                highlighted_sections, statistics
+            )
     except Exception as e:
         return {"error": f"Error during AI detection: {str(e)}"}
+
+def detect_ai_content_timed(text):
+    """detect_ai_content returning (result, timings), so stage timings survive a worker process"""
+    timings = {}
+    return detect_ai_content(text, timings), timings
+
+def detect_ai_content_recorded(text):
+    """detect_ai_content_timed that also returns the statistics behind the result, as (result, timings, statistics)"""
+    timings, statistics = {}, {}
+    return detect_ai_content(text, timings, statistics=statistics), timings, statistics
+
+def detect_ai_content_batch_recorded(texts):
+    """detect_ai_content_batch that also returns the statistics behind each result, as (results, statistics)"""
+    statistics = []
+    return detect_ai_content_batch(texts, statistics), statistics
+
+def _near_integer(scores):
+    """Rows whose score is close enough to an integer that int() could truncate either way;
+    those rows are recomputed with the exact statistics.stdev used by detect_ai_content"""
+    with np.errstate(invalid='ignore'):
+        return np.flatnonzero(np.abs(scores - np.round(scores)) < 1e-9)
+
+def detect_ai_content_batch(texts, statistics=None):
+    """Detect AI-generated content for many texts, scoring them together as NumPy arrays.
+
+    Pass a list as statistics to get one dict per text with the numbers its
+    score was built from, as detect_ai_content fills them in (empty for
+    texts that were too short or failed).
+    """
+    results = [None] * len(texts)
+    if statistics is not None:
+        statistics[:] = [{} for _ in texts]
+    docs = []
+    for index, text in enumerate(texts):
+        if not text or len(text) < 50:
+            results[index] = empty_result()
+            continue
+        try:
+            features = extract_features(text)
+            diversities = (chunk_diversities(features.token_ids, features.long_word_mask())
+                           if len(features.sentence_lengths) > 5 else [])
+            docs.append((index, text, features, diversities))
+        except Exception as e:
+            results[index] = {"error": f"Error during AI detection: {str(e)}"}
+
+    if not docs:
+        return results
+
+    try:
+        sentence_count = np.array([len(f.sentence_lengths) for _, _, f, _ in docs], dtype=np.float64)
+        word_count = np.array([f.word_count for _, _, f, _ in docs], dtype=np.float64)
+        unique_words = np.array([f.unique_long_words() for _, _, f, _ in docs], dtype=np.float64)
+        transition_count = np.array([f.transition_count for _, _, f, _ in docs], dtype=np.float64)
+
+        # 1. Sentence-length stdev from exact per-document sums of lengths and squares
+        lengths = np.concatenate([np.asarray(f.sentence_lengths, dtype=np.float64) for _, _, f, _ in docs])
+        owners = np.repeat(np.arange(len(docs)), sentence_count.astype(np.int64))
+        length_sum = np.bincount(owners, weights=lengths, minlength=len(docs))
+        length_sq_sum = np.bincount(owners, weights=lengths * lengths, minlength=len(docs))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variance = np.where(
+                sentence_count > 1,
+                (sentence_count * length_sq_sum - length_sum * length_sum) / (sentence_count * (sentence_count - 1)),
+                0.0
+            )
+        sentence_variance = np.sqrt(variance)
+        sentence_variety = 100 - (20 * (5 / (sentence_variance + 1)))
+        for row in _near_integer(sentence_variety):
+            if sentence_count[row] > 1:
+                sentence_variance[row] = stdev(docs[row][2].sentence_lengths)
+        sentence_variety = np.clip(100 - (20 * (5 / (sentence_variance + 1))), 0, 100)
+
+        # 2. Unique ratio of meaningful words
+        with np.errstate(divide='ignore', invalid='ignore'):
+            unique_ratio = unique_words / word_count
+            repetition = np.where(
+                (word_count > 0) & (unique_words > 0),
+                np.clip(100 * (1 - unique_ratio) * 3, 0, 100),
+                0.0
+            )
+
+            # 3. Transition words per 100 words
+            transition_ratio = np.where(word_count > 0, transition_count / (word_count / 100), 0.0)
+        transition = np.clip(transition_ratio * 10, 0, 100)
+
+        # 4. Burstiness: stdev of chunk diversities (3 or 4 chunks per document)
+        chunks = np.zeros((len(docs), 4))
+        filled = np.zeros((len(docs), 4), dtype=bool)
+        for row, (_, _, _, diversities) in enumerate(docs):
+            chunks[row, :len(diversities)] = diversities
+            filled[row, :len(diversities)] = True
+        chunk_count = filled.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            chunk_mean = chunks.sum(axis=1) / chunk_count
+            deviation = np.where(filled, chunks - chunk_mean[:, None], 0.0)
+            chunk_stdev = np.sqrt(np.sum(deviation * deviation, axis=1) / (chunk_count - 1))
+        for row in _near_integer(100 - chunk_stdev * 100):
+            if chunk_count[row] > 1:
+                chunk_stdev[row] = stdev(docs[row][3])
+        burstiness = np.where(chunk_count > 1, chunk_stdev * 100, 50)
+        burstiness = np.where(sentence_count > 5, np.clip(100 - burstiness, 0, 100), 50.0)
+
+        ai_percentage = (
+            sentence_variety * WEIGHTS['sentence_variety'] +
+            repetition * WEIGHTS['word_repetition'] +
+            transition * WEIGHTS['transition_usage'] +
+            burstiness * WEIGHTS['burstiness']
+        ).astype(np.int64)
+    except Exception as e:
+        for index, _, _, _ in docs:
+            results[index] = {"error": f"Error during AI detection: {str(e)}"}
+        return results
+
+    for row, (index, text, features, _) in enumerate(docs):
+        try:
+            if statistics is not None:
+                lengths = features.sentence_lengths
+                measured = sentence_count[row] > 5 and chunk_count[row] > 1
+                statistics[index] = {
+                    'sentence_count': len(lengths),
+                    'sentence_length_mean': sum(lengths) / len(lengths) if lengths else 0.0,
+                    'sentence_length_stdev': float(sentence_variance[row]),
+                    'transition_sentences': features.sentence_transitions.count(1),
+                    'word_count': features.word_count,
+                    'unique_long_words': int(unique_words[row]),
+                    'transition_count': features.transition_count,
+                    'chunk_diversity_stdev': float(chunk_stdev[row]) if measured else math.nan,
+                    'sentence_variety': float(sentence_variety[row]),
+                    'word_repetition': float(repetition[row]),
+                    'transition_usage': float(transition[row]),
+                    'burstiness': float(burstiness[row]),
+                    'ai_percentage': int(ai_percentage[row]),
+                }
+            results[index] = {
+                'ai_percentage': int(ai_percentage[row]),
+                'highlighted_sections': find_highlighted_sections(text, features),
+                'details': {
+                    'sentence_variety': int(sentence_variety[row]),
+                    'word_repetition': int(repetition[row]),
+                    'transition_usage': int(transition[row]),
+                    'burstiness': int(burstiness[row])
+                }
+            }
+        except Exception as e:
+            results[index] = {"error": f"Error during AI detection: {str(e)}"}
+    return results
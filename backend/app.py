@@ -1,16 +1,186 @@
 # backend/app.py
-from flask import Flask, request, jsonify, Response
-from ai_detector import detect_ai_content
+from flask import Flask, request, jsonify, Response, g
+from ai_detector import detect_ai_content_recorded, detect_ai_content_batch_recorded, SCORING_VERSION
+from approximate_detector import detect_approximate_timed, parse_budget, with_exact_interval
+from feature_store import FeatureStore, reweight_stores
+from result_cache import ResultCache
+from near_duplicates import NearDuplicateIndex, signature as text_signature
+from streaming_detector import StreamingDetector
+from scoring_pool import ScoringPool, PoolFull, JobTimeout
+from profiling import profile_detection
+from heatmap import score_windows, DEFAULT_WINDOW, DEFAULT_STRIDE, DEFAULT_TOP_K
+from phrase_matcher import find_markers, DEFAULT_LEXICON
+from live_document import LiveSessions, UnknownSession, VersionConflict, update as update_live_document
+from job_queue import JobQueue, FINISHED
+from wire_format import (WireRequest, DecompressingReader, BodyTooLarge, UnsupportedEncoding,
+                         encode_response, msgpack, JSON_TYPE, MSGPACK_TYPES, MAX_DECOMPRESSED_BYTES)
+from werkzeug.exceptions import HTTPException
+import metrics
+import argparse
+import atexit
+import codecs
+import hmac
+import itertools
+import json
 import logging
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
 from flask_cors import CORS
 
 app = Flask(__name__)
+app.request_class = WireRequest  # Bodies may be gzip/zstd compressed and MessagePack
+# Plain bodies get the same limit as decompressed ones
+app.config['MAX_CONTENT_LENGTH'] = MAX_DECOMPRESSED_BYTES
 CORS(app)  # Enable CORS for all routes
 logging.basicConfig(level=logging.INFO)
 
+# Number of texts scored together per vectorized batch
+BATCH_CHUNK_SIZE = int(os.environ.get('BATCH_CHUNK_SIZE', 256))
+
+# Raw text/plain uploads are read in blocks of this size, up to a maximum (decompressed) body size
+STREAM_BLOCK_SIZE = int(os.environ.get('STREAM_BLOCK_SIZE', 64 * 1024))
+MAX_STREAM_BYTES = int(os.environ.get('MAX_STREAM_BYTES', 512 * 1024 * 1024))
+
+# Results of previously scored texts; set RESULT_CACHE_DB to keep them across restarts
+result_cache = ResultCache.from_env(SCORING_VERSION)
+# MinHash signatures of scored texts, so light edits of a text can reuse its result;
+# set NEAR_DUP_PATH to keep them across restarts
+near_duplicates = NearDuplicateIndex.from_env(SCORING_VERSION)
+# Statistics behind every scored document, for re-weighting without rescoring; set
+# FEATURE_STORE_DIR to turn it on
+feature_store = FeatureStore.from_env()
+
+@atexit.register
+def save_indexes():
+    """Write unsaved near-duplicate entries and buffered feature rows, in either serving mode"""
+    near_duplicates.close()
+    if feature_store is not None:
+        feature_store.flush()
+
+# Process pool used in production mode; None means score inline on the request thread
+scoring_pool = None
+RETRY_AFTER_SECONDS = int(os.environ.get('RETRY_AFTER_SECONDS', 1))
+
+# Opt-in profiling of /api/detect_ai: send X-Profile (or ?profile=) set to 'timings' or
+# 'cprofile', with an X-Admin-Token header matching PROFILE_ADMIN_TOKEN
+PROFILE_ADMIN_TOKEN = os.environ.get('PROFILE_ADMIN_TOKEN')
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'ai_detector_profiles'))
+# Write a cProfile dump for one in every N scored requests; 0 turns sampling off
+PROFILE_SAMPLE_EVERY = int(os.environ.get('PROFILE_SAMPLE_EVERY', 0))
+scored_requests = itertools.count(1)
+
+# Phrase lexicon for /api/detect_ai/markers, compiled to an index next to it on first use
+MARKER_LEXICON = os.environ.get('MARKER_LEXICON', DEFAULT_LEXICON)
+MAX_MARKER_MATCHES = int(os.environ.get('MAX_MARKER_MATCHES', 1000))
+
+# Documents being edited in the GUI's live mode. They hold state between requests,
+# so they live in this process and are updated on the request thread; an update
+# only rescores the changed paragraphs
+live_sessions = LiveSessions.from_env()
+
+# Background jobs for documents too large to score within one request; the
+# queue and its worker processes start with the first job
+job_queue = None
+job_queue_lock = threading.Lock()
+# Seconds between keep-alive comments on an idle job event stream
+JOB_EVENTS_HEARTBEAT = float(os.environ.get('JOB_EVENTS_HEARTBEAT', 15))
+
+def run_scoring(func, *args, block=False):
+    """Run a scoring function inline, or in the worker pool when serving in production mode"""
+    if scoring_pool is None:
+        return func(*args)
+    return scoring_pool.run(func, *args, block=block)
+
+def get_job_queue():
+    global job_queue
+    with job_queue_lock:
+        if job_queue is None:
+            job_queue = JobQueue.from_env()
+        return job_queue
+
+def find_job(job_id):
+    """(queue, job) for a job ID; only create_job starts the queue, so before that there are no jobs"""
+    queue = job_queue
+    return queue, queue.get(job_id) if queue is not None else None
+
+def record_job(key, result, statistics):
+    result_cache.put(key, result)
+    if feature_store is not None:
+        feature_store.append(key, statistics)
+
+def busy_response(error):
+    """429 telling the client when to retry"""
+    response = jsonify({"error": str(error)})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(RETRY_AFTER_SECONDS)
+    return response
+
+def requested_profile():
+    """Profiling mode asked for by the request: None, 'timings' or 'cprofile'"""
+    mode = request.headers.get('X-Profile') or request.args.get('profile')
+    if not mode:
+        return None
+    return 'cprofile' if mode.lower() == 'cprofile' else 'timings'
+
+def profiling_authorized():
+    token = request.headers.get('X-Admin-Token', '')
+    return bool(PROFILE_ADMIN_TOKEN) and hmac.compare_digest(token.encode(), PROFILE_ADMIN_TOKEN.encode())
+
+def sampled_for_profiling():
+    return PROFILE_SAMPLE_EVERY > 0 and next(scored_requests) % PROFILE_SAMPLE_EVERY == 0
+
+@app.before_request
+def start_request_metrics():
+    g.metrics_started = metrics.request_started()
+
+@app.after_request
+def finish_request_metrics(response):
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    status = response.status_code
+    started = g.metrics_started
+    # Streamed responses only count as finished once the whole body was sent
+    response.call_on_close(lambda: metrics.request_finished(route, status, started))
+    return response
+
+@app.before_request
+def decode_request_body():
+    """Decompress and parse the body up front, so oversized or broken bodies get a proper status"""
+    if request.mimetype in MSGPACK_TYPES and msgpack is None:
+        return jsonify({"error": "MessagePack bodies are not supported"}), 415
+    # The raw stream endpoint decompresses as it reads
+    if request.endpoint in request.streaming_endpoints:
+        return None
+    try:
+        if request.headers.get('Content-Encoding'):
+            request.get_data()
+        if request.method in ('POST', 'PUT', 'PATCH') and request.mimetype in (JSON_TYPE,) + MSGPACK_TYPES:
+            request.get_json()  # Cached for the route
+    except BodyTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    except UnsupportedEncoding as e:
+        return jsonify({"error": str(e)}), 415
+    except HTTPException as e:
+        return jsonify({"error": e.description}), e.code
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.after_request
+def encode_response_body(response):
+    return encode_response(request, response)
+
 @app.route('/api/detect_ai', methods=['POST'])
 def detect_ai():
-    """Detect AI-generated content from the input text"""
+    """Detect AI-generated content from the input text.
+
+    Send max_ms (a latency budget) or sample_rate (the largest share of
+    sentences to read) to have a large text scored from a sample of its
+    sentences; see approximate_detector.
+    """
+    received = time.time()
     try:
         data = request.get_json()
         
@@ -21,16 +191,409 @@ def detect_ai():
         if not text.strip():
             return jsonify({"error": "Empty text provided"}), 400
 
-        result = detect_ai_content(text)
-        return jsonify(result)
+        profile_mode = requested_profile()
+        if profile_mode and not profiling_authorized():
+            return jsonify({"error": "Profiling requires a valid admin token"}), 403
+        try:
+            max_ms, sample_rate = parse_budget(data.get('max_ms', request.args.get('max_ms')),
+                                               data.get('sample_rate', request.args.get('sample_rate')))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        # A profiled request measures the exact scorer
+        approximate = not profile_mode and (max_ms is not None or sample_rate is not None)
+
+        metrics.observe_input_size('/api/detect_ai', len(text))
+        key = result_cache.key(text)
+        # A profiled request always scores, so there is a run to measure
+        result, tier = (None, None) if profile_mode else result_cache.get(key)
+        # On an exact hit the nearest earlier submission is the text itself
+        nearest = (key, 1.0, result) if tier else (None, 0.0, None)
+        signature = None
+        # Signing a large text can take longer than a latency budget allows
+        if result is None and not approximate:
+            # Hashing every shingle is CPU-bound like scoring, so it goes through the pool too
+            signature = run_scoring(text_signature, text)
+            if signature is not None:
+                nearest = near_duplicates.nearest(signature)
+            if not profile_mode and near_duplicates.reusable(nearest):
+                result, tier = nearest[2], 'near-duplicate'
+        profile = None
+        if result is None and approximate:
+            # Estimates vary with the sample, so they are never cached, indexed or stored
+            deadline = received + max_ms / 1000 if max_ms is not None else None
+            result, timings = run_scoring(detect_approximate_timed, text, deadline, sample_rate)
+            metrics.observe_stages(timings)
+            if 'error' in result:
+                metrics.count_error('/api/detect_ai', 'scoring')
+        elif approximate:
+            result = with_exact_interval(result)
+        elif result is None:
+            if profile_mode:
+                result, profile, statistics = run_scoring(profile_detection, text,
+                                                          PROFILE_DIR if profile_mode == 'cprofile' else None)
+                timings = profile['stages']
+            elif sampled_for_profiling():
+                # Sampled requests get the same response; only the dump is kept
+                result, sample, statistics = run_scoring(profile_detection, text, PROFILE_DIR)
+                timings = sample['stages']
+                app.logger.info(f"Sampled profile of a {len(text)} character text written to {sample['dump']}")
+            else:
+                result, timings, statistics = run_scoring(detect_ai_content_recorded, text)
+            metrics.observe_stages(timings)
+            if 'error' in result:
+                metrics.count_error('/api/detect_ai', 'scoring')
+            else:
+                # Profiling rescores cached texts; those are in the store already
+                if feature_store is not None and not (profile_mode and result_cache.get(key)[0] is not None):
+                    feature_store.append(key, statistics)
+                result_cache.put(key, result)
+                if signature is not None:
+                    near_duplicates.add(key, signature, result)
+
+        response = jsonify(dict(result, profile=profile) if profile else result)
+        response.headers['X-Cache'] = 'HIT' if tier else 'MISS'
+        if tier:
+            response.headers['X-Cache-Tier'] = tier
+        if nearest[0] is not None:
+            response.headers['X-Near-Duplicate'] = nearest[0]
+            response.headers['X-Near-Duplicate-Similarity'] = f"{nearest[1]:.3f}"
+        response.headers['X-Scoring-Version'] = SCORING_VERSION
+        return response
+    except PoolFull as e:
+        return busy_response(e)
+    except JobTimeout as e:
+        return jsonify({"error": str(e)}), 504
     except Exception as e:
         app.logger.error(f"Error in detect_ai: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/detect_ai/batch', methods=['POST'])
+def detect_ai_batch():
+    """Detect AI-generated content for a list of texts, streamed back as NDJSON"""
+    try:
+        data = request.get_json()
+        
+        if not data or not isinstance(data.get('texts'), list):
+            return jsonify({"error": "No texts provided"}), 400
+
+        texts = data['texts']
+        if not all(isinstance(text, str) for text in texts):
+            return jsonify({"error": "Every text must be a string"}), 400
+        for text in texts:
+            metrics.observe_input_size('/api/detect_ai/batch', len(text))
+
+        # Score the first chunk up front so a saturated pool can still answer 429
+        first = run_scoring(detect_ai_content_batch_recorded, texts[:BATCH_CHUNK_SIZE])
+
+        def generate():
+            # Results are yielded in input order, one vectorized chunk at a time
+            for start in range(0, len(texts), BATCH_CHUNK_SIZE):
+                chunk = texts[start:start + BATCH_CHUNK_SIZE]
+                try:
+                    results, statistics = (first if start == 0 else
+                                           run_scoring(detect_ai_content_batch_recorded, chunk, block=True))
+                except JobTimeout as e:
+                    results, statistics = [{"error": str(e)}] * len(chunk), [{}] * len(chunk)
+                for text, result, text_statistics in zip(chunk, results, statistics):
+                    if not text.strip():
+                        result = {"error": "Empty text provided"}
+                    elif feature_store is not None and 'error' not in result:
+                        feature_store.append(result_cache.key(text), text_statistics)
+                    yield json.dumps(result) + '\n'
+
+        return Response(generate(), mimetype='application/x-ndjson')
+    except PoolFull as e:
+        return busy_response(e)
+    except JobTimeout as e:
+        return jsonify({"error": str(e)}), 504
+    except Exception as e:
+        app.logger.error(f"Error in detect_ai_batch: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/detect_ai/heatmap', methods=['POST'])
+def detect_ai_heatmap():
+    """Per-window AI-likelihood scores with character offsets across the whole text"""
+    try:
+        data = request.get_json()
+
+        if not data or 'text' not in data:
+            return jsonify({"error": "No text provided"}), 400
+
+        text = data['text']
+        if not text.strip():
+            return jsonify({"error": "Empty text provided"}), 400
+
+        try:
+            window = int(data.get('window', DEFAULT_WINDOW))
+            stride = int(data.get('stride', DEFAULT_STRIDE))
+            top_k = int(data.get('top_k', DEFAULT_TOP_K))
+            if window < 1 or stride < 1 or top_k < 0:
+                raise ValueError()
+        except (TypeError, ValueError):
+            return jsonify({"error": "window and stride must be positive integers and top_k at least 0"}), 400
+
+        metrics.observe_input_size('/api/detect_ai/heatmap', len(text))
+        return jsonify(run_scoring(score_windows, text, window, stride, top_k))
+    except PoolFull as e:
+        return busy_response(e)
+    except JobTimeout as e:
+        return jsonify({"error": str(e)}), 504
+    except Exception as e:
+        app.logger.error(f"Error in detect_ai_heatmap: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/detect_ai/markers', methods=['POST'])
+def detect_ai_markers():
+    """Find AI-marker phrases from the lexicon, with character offsets"""
+    try:
+        data = request.get_json()
+
+        if not data or 'text' not in data:
+            return jsonify({"error": "No text provided"}), 400
+
+        text = data['text']
+        if not text.strip():
+            return jsonify({"error": "Empty text provided"}), 400
+
+        metrics.observe_input_size('/api/detect_ai/markers', len(text))
+        return jsonify(run_scoring(find_markers, text, MARKER_LEXICON, MAX_MARKER_MATCHES))
+    except PoolFull as e:
+        return busy_response(e)
+    except JobTimeout as e:
+        return jsonify({"error": str(e)}), 504
+    except Exception as e:
+        app.logger.error(f"Error in detect_ai_markers: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/detect_ai/live', methods=['POST'])
+def detect_ai_live():
+    """Update a live document with the paragraphs that changed and return its new score"""
+    try:
+        data = request.get_json()
+
+        if not data or not isinstance(data.get('paragraphs'), list):
+            return jsonify({"error": "No paragraphs provided"}), 400
+
+        paragraphs = data['paragraphs']
+        if not all(isinstance(paragraph, str) for paragraph in paragraphs):
+            return jsonify({"error": "Every paragraph must be a string"}), 400
+        session = data.get('session')
+        version = data.get('version')
+        start = data.get('start', 0)
+        delete = data.get('delete', 0)
+        if not all(isinstance(value, int) for value in (start, delete)) or \
+                (version is not None and not isinstance(version, int)):
+            return jsonify({"error": "start, delete and version must be integers"}), 400
+
+        metrics.observe_input_size('/api/detect_ai/live', sum(len(paragraph) for paragraph in paragraphs))
+        try:
+            session, version, result = update_live_document(live_sessions, session, version,
+                                                            start, delete, paragraphs)
+        except UnknownSession as e:
+            return jsonify({"error": str(e)}), 404
+        except VersionConflict as e:
+            return jsonify({"error": str(e)}), 409
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if 'error' in result:
+            metrics.count_error('/api/detect_ai/live', 'scoring')
+        return jsonify(dict(result, session=session, version=version))
+    except Exception as e:
+        app.logger.error(f"Error in detect_ai_live: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    """Start scoring a text in the background; returns the job ID right away"""
+    try:
+        data = request.get_json()
+
+        if not data or 'text' not in data:
+            return jsonify({"error": "No text provided"}), 400
+
+        text = data['text']
+        if not isinstance(text, str) or not text.strip():
+            return jsonify({"error": "Empty text provided"}), 400
+
+        metrics.observe_input_size('/api/jobs', len(text))
+        key = result_cache.key(text)
+        cached, _ = result_cache.get(key)
+        job = get_job_queue().submit(text, cached, on_result=lambda result, statistics: record_job(key, result, statistics))
+        response = jsonify(job.snapshot())
+        response.status_code = 202
+        response.headers['Location'] = f"/api/jobs/{job.id}"
+        return response
+    except PoolFull as e:
+        return busy_response(e)
+    except Exception as e:
+        app.logger.error(f"Error in create_job: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Status and progress of a job, with its result once it is done"""
+    queue, job = find_job(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    return jsonify(job.snapshot())
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running job"""
+    queue, job = find_job(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    if job.status in FINISHED:
+        return jsonify(dict(job.snapshot(), error=f"Job already {job.status}")), 409
+    return jsonify(queue.cancel(job_id).snapshot())
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """Server-Sent Events: a 'progress' event on every change, then one named after the final status"""
+    queue, job = find_job(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+
+    def generate():
+        # Each open stream holds one HTTP thread; clients with many jobs should poll instead
+        state, version = job.snapshot(), job.version
+        while True:
+            if state is None:
+                yield ': keep-alive\n\n'
+            else:
+                finished = state['status'] in FINISHED
+                yield f"event: {state['status'] if finished else 'progress'}\ndata: {json.dumps(state)}\n\n"
+                if finished:
+                    return
+            state, version = queue.wait(job, version, JOB_EVENTS_HEARTBEAT)
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/detect_ai/stream', methods=['POST'])
+def detect_ai_stream():
+    """Detect AI-generated content from a raw text/plain body without loading it whole"""
+    try:
+        if request.mimetype != 'text/plain':
+            return jsonify({"error": "Expected a text/plain body"}), 415
+        if request.content_length is not None and request.content_length > MAX_STREAM_BYTES:
+            return jsonify({"error": "Text too large"}), 413
+
+        encoding = request.headers.get('Content-Encoding', 'identity')
+        try:
+            body = request.stream if encoding.lower() == 'identity' else DecompressingReader(request.stream, encoding)
+        except UnsupportedEncoding as e:
+            return jsonify({"error": str(e)}), 415
+
+        decoder = codecs.getincrementaldecoder(request.mimetype_params.get('charset', 'utf-8'))()
+        detector = StreamingDetector()
+        received = 0
+        characters = 0
+        try:
+            while True:
+                block = body.read(STREAM_BLOCK_SIZE)
+                if not block:
+                    break
+                received += len(block)
+                if received > MAX_STREAM_BYTES:
+                    detector.close()
+                    return jsonify({"error": "Text too large"}), 413
+                piece = decoder.decode(block)
+                characters += len(piece)
+                detector.feed(piece)
+            piece = decoder.decode(b'', final=True)
+            characters += len(piece)
+            detector.feed(piece)
+        except (ValueError, LookupError) as e:
+            # Broken compression or text that does not decode
+            detector.close()
+            return jsonify({"error": f"Could not decode text: {str(e)}"}), 400
+
+        if not detector.has_text:
+            detector.close()
+            return jsonify({"error": "Empty text provided"}), 400
+
+        metrics.observe_input_size('/api/detect_ai/stream', characters)
+        return jsonify(detector.finalize())
+    except Exception as e:
+        app.logger.error(f"Error in detect_ai_stream: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/reweight', methods=['POST'])
+def reweight():
+    """Score every document in the feature store under one or more weight profiles.
+
+    Takes {"profiles": {name: weights}} (or a list of weights) and returns the
+    score distribution of each profile. Reads the whole store, so like
+    profiling it needs an X-Admin-Token header matching PROFILE_ADMIN_TOKEN.
+    """
+    try:
+        if not profiling_authorized():
+            return jsonify({"error": "Re-weighting requires a valid admin token"}), 403
+        if feature_store is None:
+            return jsonify({"error": "No feature store configured; set FEATURE_STORE_DIR"}), 404
+
+        data = request.get_json()
+        if not data or 'profiles' not in data:
+            return jsonify({"error": "No profiles provided"}), 400
+        try:
+            _, _, summaries = reweight_stores([feature_store], data['profiles'])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({"profiles": summaries})
+    except Exception as e:
+        app.logger.error(f"Error in reweight: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return Response(status=200)
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus metrics"""
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
+
+def serve_production(host, port, workers, queue_depth, timeout, threads):
+    """Serve with waitress, scoring in a bounded process pool"""
+    global scoring_pool
+    from waitress import serve
+
+    scoring_pool = ScoringPool(workers, queue_depth, timeout)
+    # More HTTP threads than pool slots, so overload reaches the pool and gets a 429
+    threads = threads or scoring_pool.workers + scoring_pool.queue_depth + 4
+    app.logger.info(f"Serving on {host}:{port} with {scoring_pool.workers} scoring workers, "
+                    f"queue depth {scoring_pool.queue_depth}, {threads} HTTP threads")
+    try:
+        serve(app, host=host, port=port, threads=threads)
+    finally:
+        app.logger.info("Shutting down scoring workers")
+        scoring_pool.shutdown()
+        if job_queue is not None:
+            job_queue.shutdown()
+
 if __name__ == '__main__': 
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    parser = argparse.ArgumentParser(description="AI content detector API server")
+    parser.add_argument('--production', action='store_true',
+                        default=os.environ.get('SERVE_MODE') == 'production',
+                        help="serve with waitress and a scoring process pool")
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('SCORING_WORKERS', 0)) or None,
+                        help="scoring processes (default: CPU count)")
+    parser.add_argument('--queue-depth', type=int,
+                        default=int(os.environ['SCORING_QUEUE_DEPTH']) if 'SCORING_QUEUE_DEPTH' in os.environ else None,
+                        help="jobs allowed to wait for a worker (default: 2 per worker)")
+    parser.add_argument('--timeout', type=float, default=float(os.environ.get('SCORING_TIMEOUT', 30)),
+                        help="seconds before a scoring job answers 504")
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('HTTP_THREADS', 0)) or None)
+    args = parser.parse_args()
+
+    # Turn SIGTERM into SystemExit so the pool is shut down and save_indexes runs
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    if args.production:
+        serve_production(args.host, args.port, args.workers, args.queue_depth, args.timeout, args.threads)
+    else:
+        app.run(debug=True, host=args.host, port=args.port)
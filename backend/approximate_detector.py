@@ -0,0 +1,414 @@
+# backend/approximate_detector.py
+"""Approximate detect_ai_content for very large texts under a latency budget.
+
+Exact scoring tokenizes every sentence. Here one vectorized pass over the
+code points counts the sentences and words exactly and finds the word
+offsets where the burstiness thirds start; only a sample of the sentences is
+then tokenized. The sample grows in small batches until the time budget or
+the requested sample rate runs out, and a bootstrap over the sampled
+sentences gives a confidence interval for the score.
+
+Sentences are sampled without replacement from each burstiness third in
+proportion to its size, so the sample is self-weighting. The components are
+estimated as:
+
+- sentence variety: the standard deviation of the sampled sentence lengths;
+- transition usage: transitions per sampled word (a ratio estimator) times
+  the exact word count;
+- word repetition and burstiness: distinct long words, overall and per third,
+  by the GEE estimator (Charikar et al., "Towards estimation error guarantees
+  for distinct values", 2000): sqrt(N / n) * f1 + (values seen twice or more),
+  where f1 counts the words seen once in a sample of n of the N words.
+
+The remainder words after the last full third (the fourth burstiness chunk)
+are read exactly. Highlighted sections are the first qualifying sentences
+among the sampled ones, so they can differ from the exact result.
+"""
+import math
+import re
+import time
+from array import array
+from collections import defaultdict
+from statistics import NormalDist
+
+import numpy as np
+
+from ai_detector import WEIGHTS, build_result, detect_ai_content
+from text_features import WORD_RE, TRANSITION_SET, count_transitions
+
+# Sentences tokenized between two looks at the clock
+BATCH_SENTENCES = 64
+# Fewer sampled sentences than this make the estimates meaningless, whatever the budget
+MIN_SAMPLE = 256
+# Share of the remaining budget spent sampling; the rest is left for the bootstrap
+SAMPLING_SHARE = 0.8
+BOOTSTRAP_REPLICATES = 200
+MIN_BOOTSTRAP_REPLICATES = 20
+CONFIDENCE_LEVEL = 0.95
+_Z = NormalDist().inv_cdf(0.5 + CONFIDENCE_LEVEL / 2)
+# Conservative exact-scoring throughput: texts expected to score exactly within
+# the budget are scored exactly
+EXACT_CHARS_PER_SECOND = 4e6
+# Fixed, so the same text and sample rate always give the same estimate
+SEED = 0x5EED
+COMPONENTS = ('sentence_variety', 'word_repetition', 'transition_usage', 'burstiness')
+
+_TERMINALS = (ord('.'), ord('!'), ord('?'))
+# bytes.translate tables giving 1 for ASCII word characters, whitespace and terminals,
+# several times faster than indexing an array with the bytes
+_ASCII_WORD = bytes(chr(c).isalnum() or chr(c) == '_' if c < 128 else 0 for c in range(256))
+_ASCII_SPACE = bytes(chr(c).isspace() if c < 128 else 0 for c in range(256))
+_ASCII_TERMINAL = bytes(c in _TERMINALS for c in range(256))
+
+
+def _bmp_classes():
+    """(word, whitespace) lookup tables over the Basic Multilingual Plane.
+
+    Word characters are what WORD_RE matches and whitespace is what
+    str.split() splits at (re's \\s is the same set). Built at import, in
+    under 20 ms, so no request pays for it.
+    """
+    every = ''.join(map(chr, range(0x10000)))
+    word = np.zeros(0x10000, dtype=bool)
+    for match in WORD_RE.finditer(every):
+        word[match.start():match.end()] = True
+    space = np.zeros(0x10000, dtype=bool)
+    for match in re.finditer(r'\s+', every):
+        space[match.start():match.end()] = True
+    return word, space
+
+
+_BMP_WORD, _BMP_SPACE = _bmp_classes()
+
+
+def _classify(codes):
+    """Word and whitespace masks for an array of code points"""
+    astral = codes > 0xFFFF
+    if not astral.any():
+        return _BMP_WORD[codes], _BMP_SPACE[codes]
+    # Code points beyond the BMP are rare: classify the distinct ones present
+    word = _BMP_WORD[np.where(astral, 0, codes)]
+    space = _BMP_SPACE[np.where(astral, 0, codes)]
+    values, inverse = np.unique(codes[astral], return_inverse=True)
+    characters = [chr(value) for value in values.tolist()]
+    word[astral] = np.array([WORD_RE.match(c) is not None for c in characters])[inverse]
+    space[astral] = np.array([c.isspace() for c in characters])[inverse]
+    return word, space
+
+
+class _Layout:
+    """Exact counts from one vectorized pass: sentence spans, word count and the burstiness thirds.
+
+    Classes are taken from the original text, not its lower-cased copy; that
+    only differs for the rare non-ASCII characters whose lower case is longer.
+    """
+
+    def __init__(self, text):
+        if text.isascii():
+            data = text.encode('ascii')
+            word = np.frombuffer(data.translate(_ASCII_WORD), dtype=bool)
+            space = np.frombuffer(data.translate(_ASCII_SPACE), dtype=bool)
+            terminal = np.frombuffer(data.translate(_ASCII_TERMINAL), dtype=bool)
+        else:
+            codes = np.frombuffer(text.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+            word, space = _classify(codes)
+            terminal = (codes == _TERMINALS[0]) | (codes == _TERMINALS[1]) | (codes == _TERMINALS[2])
+
+        # Sentences are the runs between terminals (SENTENCE_RE) with a non-space character in them
+        edges = np.diff(terminal.view(np.int8), prepend=np.int8(1), append=np.int8(1))
+        starts = np.flatnonzero(edges == -1)
+        ends = np.flatnonzero(edges == 1)
+        if len(starts):
+            content = ~(space | terminal)
+            kept = np.logical_or.reduceat(content, starts)
+            starts, ends = starts[kept], ends[kept]
+        self.sentence_starts = starts
+        self.sentence_ends = ends
+
+        word_starts = np.flatnonzero(np.diff(word.view(np.int8), prepend=np.int8(0)) == 1)
+        self.word_count = len(word_starts)
+        self.chunk_size = self.word_count // 3
+        if self.chunk_size:
+            # The words of each full third; whatever is left over is the fourth chunk
+            bounds = word_starts[[self.chunk_size, 2 * self.chunk_size]]
+            self.strata = np.searchsorted(bounds, starts, side='right')
+            remainder = self.word_count - 3 * self.chunk_size
+            self.remainder_words = (WORD_RE.findall(text[word_starts[3 * self.chunk_size]:].lower())
+                                    if remainder else [])
+
+    @property
+    def sentence_count(self):
+        return len(self.sentence_starts)
+
+
+class _Sample:
+    """Per-sentence statistics of the sampled sentences, and the words in them"""
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.strata = []
+        self.lengths = []
+        self.word_counts = []
+        self.transitions = []
+        self.has_transition = []
+        self.word_ids = array('I')
+        # Looking up an unseen word assigns it the next ID, as in extract_features
+        self.vocabulary = defaultdict()
+        self.vocabulary.default_factory = self.vocabulary.__len__
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def add(self, text, start, end, stratum):
+        segment = text[start:end].lower()
+        tokens = segment.split()
+        words = WORD_RE.findall(segment)
+        self.word_ids.extend(map(self.vocabulary.__getitem__, words))
+        has_transition = not TRANSITION_SET.isdisjoint(tokens)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.strata.append(stratum)
+        self.lengths.append(len(tokens))
+        self.word_counts.append(len(words))
+        self.transitions.append(count_transitions(segment) if has_transition else 0)
+        self.has_transition.append(has_transition)
+
+
+class _Arrays:
+    """The sample as arrays, with the long-word occurrences overall and per third"""
+
+    def __init__(self, sample):
+        self.strata = np.array(sample.strata, dtype=np.intp)
+        self.lengths = np.array(sample.lengths, dtype=np.float64)
+        self.word_counts = np.array(sample.word_counts, dtype=np.float64)
+        self.transitions = np.array(sample.transitions, dtype=np.float64)
+        self.in_stratum = [self.strata == stratum for stratum in range(3)]
+
+        # Vocabulary IDs follow insertion order
+        long_words = np.fromiter((len(word) > 3 for word in sample.vocabulary), dtype=bool,
+                                 count=len(sample.vocabulary))
+        ids = np.frombuffer(sample.word_ids, dtype=np.uint32).astype(np.intp)
+        sentences = np.repeat(np.arange(len(sample)), sample.word_counts)
+        long = long_words[ids]
+        ids, sentences = ids[long], sentences[long]
+        self.long_counts = np.bincount(sentences, minlength=len(sample)).astype(np.float64)
+        self.vocabulary_size = len(long_words)
+        self.occurrences = [(ids, sentences)]
+        occurrence_strata = self.strata[sentences]
+        for stratum in range(3):
+            chosen = occurrence_strata == stratum
+            self.occurrences.append((ids[chosen], sentences[chosen]))
+
+
+def _distinct(weights, occurrences, vocabulary_size, sampled_words, population):
+    """GEE estimate of the distinct long words among population words, from a weighted sample"""
+    ids, sentences = occurrences
+    if sampled_words <= 0:
+        return 0.0
+    frequencies = np.bincount(ids, weights=weights[sentences], minlength=vocabulary_size)
+    once = np.count_nonzero(frequencies == 1)
+    more = np.count_nonzero(frequencies >= 2)
+    return math.sqrt(max(population / sampled_words, 1.0)) * once + more
+
+
+def _estimate(layout, arrays, weights, highlighted_sections=(), statistics=None):
+    """build_result on the statistics estimated from the sample, each sentence counted weights[i] times"""
+    sampled = weights.sum()
+    mean_length = (weights @ arrays.lengths) / sampled
+    variance = ((weights @ (arrays.lengths * arrays.lengths)) - sampled * mean_length * mean_length) / (sampled - 1)
+    sentence_variance = math.sqrt(max(variance, 0.0))
+
+    word_count = layout.word_count
+    sampled_words = weights @ arrays.word_counts
+    if sampled_words > 0:
+        transition_count = word_count * (weights @ arrays.transitions) / sampled_words
+        # There cannot be more distinct long words than long word occurrences
+        long_words = word_count * (weights @ arrays.long_counts) / sampled_words
+        unique_words = min(_distinct(weights, arrays.occurrences[0], arrays.vocabulary_size,
+                                     sampled_words, word_count), long_words)
+    else:
+        transition_count = unique_words = 0
+
+    chunk_diversity = []
+    for stratum in range(3):
+        in_stratum = arrays.in_stratum[stratum]
+        stratum_words = weights[in_stratum] @ arrays.word_counts[in_stratum]
+        distinct = _distinct(weights, arrays.occurrences[stratum + 1], arrays.vocabulary_size,
+                             stratum_words, layout.chunk_size)
+        chunk_diversity.append(min(distinct / layout.chunk_size, 1.0))
+    if layout.remainder_words:
+        distinct = len({word for word in layout.remainder_words if len(word) > 3})
+        chunk_diversity.append(distinct / len(layout.remainder_words))
+
+    return build_result(layout.sentence_count, sentence_variance, word_count, unique_words,
+                        transition_count, chunk_diversity, list(highlighted_sections), statistics)
+
+
+def _unrounded(statistics):
+    """The component scores and the weighted total before build_result rounds them"""
+    scores = {name: statistics[name] for name in COMPONENTS}
+    scores['ai_percentage'] = sum(statistics[name] * WEIGHTS[name] for name in COMPONENTS)
+    return scores
+
+
+def _highlighted_sections(text, sample):
+    """find_highlighted_sections over the sampled sentences, in document order"""
+    average = sum(sample.lengths) / len(sample)
+    order = sorted(range(len(sample)), key=sample.starts.__getitem__)
+    sections = []
+    candidates = 0
+    for i in order:
+        length = sample.lengths[i]
+        if length > 5 and sample.has_transition[i] and abs(length - average) < 2:
+            original = text[sample.starts[i]:sample.ends[i]].strip()
+            if len(original) > 20:
+                sections.append(original)
+            candidates += 1
+            if candidates == 3:
+                break
+    return sections
+
+
+def _interval(replicates, estimate, reported):
+    """Normal interval around an unrounded estimate from its bootstrap standard error.
+
+    A normal interval is steadier than bootstrap percentiles when the
+    budget only leaves time for a few dozen replicates. It is widened to
+    whole numbers and always contains the reported (rounded) value.
+    """
+    error = _Z * float(np.std(replicates, ddof=1))
+    low = max(0, math.floor(estimate - error))
+    high = min(100, math.ceil(estimate + error))
+    return [min(low, reported), max(high, reported)]
+
+
+def with_exact_interval(result):
+    """An exact result annotated like an approximate one: no sampling, a zero-width interval"""
+    if 'error' in result:
+        return result
+    return dict(
+        result,
+        sampling={'used': False},
+        confidence_interval={
+            'level': CONFIDENCE_LEVEL,
+            'ai_percentage': [result['ai_percentage']] * 2,
+            'details': {name: [result['details'][name]] * 2 for name in COMPONENTS},
+        }
+    )
+
+
+def detect_approximate(text, deadline=None, sample_rate=None, timings=None):
+    """detect_ai_content from a sample of the sentences.
+
+    deadline is a time.time() value to answer by and sample_rate the largest
+    share of the sentences to tokenize; either may be None. Texts that can be
+    scored exactly within the budget, or that have too few sentences to
+    sample, get the exact result. Either way the result says whether sampling
+    was used and carries a confidence interval for the score and each
+    component. timings, if given, gets the seconds spent in each stage.
+    """
+    try:
+        started = time.time()
+        if sample_rate is not None and sample_rate >= 1:
+            return with_exact_interval(detect_ai_content(text, timings))
+        if (sample_rate is None and deadline is not None
+                and len(text) / EXACT_CHARS_PER_SECOND <= deadline - started):
+            return with_exact_interval(detect_ai_content(text, timings))
+
+        counting = time.perf_counter()
+        layout = _Layout(text)
+        if timings is not None:
+            timings['counting'] = time.perf_counter() - counting
+        total = layout.sentence_count
+        # Without a sample rate only the deadline ends the sampling
+        limit = total if sample_rate is None else max(math.ceil(sample_rate * total), MIN_SAMPLE)
+        if total <= MIN_SAMPLE or not layout.chunk_size or (sample_rate is not None and limit >= total):
+            return with_exact_interval(detect_ai_content(text, timings))
+
+        sampling = time.perf_counter()
+        rng = np.random.default_rng(SEED)
+        strata = [rng.permutation(np.flatnonzero(layout.strata == stratum)) for stratum in range(3)]
+        taken = [0, 0, 0]
+        sample = _Sample()
+        stop_sampling = (None if deadline is None
+                         else started + SAMPLING_SHARE * max(deadline - started, 0.0))
+        batches = 0
+        while len(sample) < limit:
+            # Every third keeps its share of the sample as it grows
+            wanted = min(len(sample) + BATCH_SENTENCES, limit)
+            for stratum, members in enumerate(strata):
+                share = min(math.ceil(wanted * len(members) / total), len(members))
+                for index in members[taken[stratum]:share]:
+                    sample.add(text, int(layout.sentence_starts[index]), int(layout.sentence_ends[index]), stratum)
+                taken[stratum] = max(taken[stratum], share)
+            batches += 1
+            if stop_sampling is not None and len(sample) >= MIN_SAMPLE and time.time() >= stop_sampling:
+                break
+        arrays = _Arrays(sample)
+        highlighted_sections = _highlighted_sections(text, sample)
+        statistics = {}
+        result = _estimate(layout, arrays, np.ones(len(sample)), highlighted_sections, statistics)
+        estimate = _unrounded(statistics)
+        if timings is not None:
+            timings['sampling'] = time.perf_counter() - sampling
+
+        # Bootstrap: resample the sentences of each third with replacement
+        bootstrap = time.perf_counter()
+        members = [np.flatnonzero(arrays.strata == stratum) for stratum in range(3)]
+        replicates = {name: [] for name in estimate}
+        while len(replicates['ai_percentage']) < BOOTSTRAP_REPLICATES:
+            weights = np.zeros(len(sample))
+            for indices in members:
+                if len(indices):
+                    weights[indices] = np.bincount(rng.integers(0, len(indices), len(indices)),
+                                                   minlength=len(indices))
+            replicate = {}
+            _estimate(layout, arrays, weights, statistics=replicate)
+            for name, value in _unrounded(replicate).items():
+                replicates[name].append(value)
+            if (deadline is not None and len(replicates['ai_percentage']) >= MIN_BOOTSTRAP_REPLICATES
+                    and time.time() >= deadline):
+                break
+        if timings is not None:
+            timings['bootstrap'] = time.perf_counter() - bootstrap
+
+        result['sampling'] = {
+            'used': True,
+            'sentences': total,
+            'sentences_sampled': len(sample),
+            'sample_rate': len(sample) / total,
+            'batches': batches,
+            'replicates': len(replicates['ai_percentage']),
+            'elapsed_ms': round((time.time() - started) * 1000, 1),
+        }
+        result['confidence_interval'] = {
+            'level': CONFIDENCE_LEVEL,
+            'ai_percentage': _interval(replicates['ai_percentage'], estimate['ai_percentage'],
+                                       result['ai_percentage']),
+            'details': {name: _interval(replicates[name], estimate[name], result['details'][name])
+                        for name in COMPONENTS},
+        }
+        return result
+    except Exception as e:
+        return {"error": f"Error during AI detection: {str(e)}"}
+
+
+def parse_budget(max_ms, sample_rate):
+    """(max_ms, sample_rate) of a request as floats, either possibly None; raises ValueError"""
+    try:
+        max_ms = float(max_ms) if max_ms is not None else None
+        sample_rate = float(sample_rate) if sample_rate is not None else None
+    except (TypeError, ValueError):
+        raise ValueError("max_ms and sample_rate must be numbers")
+    if max_ms is not None and not (max_ms > 0 and math.isfinite(max_ms)):
+        raise ValueError("max_ms must be a positive number of milliseconds")
+    if sample_rate is not None and not 0 < sample_rate <= 1:
+        raise ValueError("sample_rate must be above 0 and at most 1")
+    return max_ms, sample_rate
+
+
+def detect_approximate_timed(text, deadline=None, sample_rate=None):
+    """detect_approximate returning (result, timings), so stage timings survive a worker process"""
+    timings = {}
+    return detect_approximate(text, deadline, sample_rate, timings), timings
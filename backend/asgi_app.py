@@ -0,0 +1,175 @@
+# backend/asgi_app.py
+import asyncio
+import logging
+import os
+import time
+
+from quart import Quart, request, jsonify, Response
+from quart_cors import cors
+
+from ai_detector import detect_ai_content_recorded, SCORING_VERSION
+from approximate_detector import detect_approximate, parse_budget, with_exact_interval
+from feature_store import FeatureStore
+from result_cache import ResultCache
+from near_duplicates import NearDuplicateIndex, signature as text_signature
+from scoring_pool import ScoringPool, PoolFull
+
+# Async variant of the detection API: run with `hypercorn asgi_app:app`
+app = cors(Quart(__name__))  # Enable CORS for all routes
+logging.basicConfig(level=logging.INFO)
+
+SCORING_WORKERS = int(os.environ.get('SCORING_WORKERS', 0)) or None
+SCORING_QUEUE_DEPTH = int(os.environ['SCORING_QUEUE_DEPTH']) if 'SCORING_QUEUE_DEPTH' in os.environ else None
+SCORING_TIMEOUT = float(os.environ.get('SCORING_TIMEOUT', 30))
+RETRY_AFTER_SECONDS = int(os.environ.get('RETRY_AFTER_SECONDS', 1))
+
+result_cache = ResultCache.from_env(SCORING_VERSION)
+near_duplicates = NearDuplicateIndex.from_env(SCORING_VERSION)
+# Statistics behind every scored document; set FEATURE_STORE_DIR to turn it on
+feature_store = FeatureStore.from_env()
+scoring_pool = None
+# Cache key -> future of the computation currently scoring that text
+in_flight = {}
+# Cache key -> cache writes still running for that text
+pending_writes = {}
+
+@app.before_serving
+async def start_pool():
+    global scoring_pool
+    scoring_pool = ScoringPool(SCORING_WORKERS, SCORING_QUEUE_DEPTH, SCORING_TIMEOUT)
+
+@app.after_serving
+async def stop_pool():
+    # Waits for running jobs, so keep it off the event loop
+    await asyncio.to_thread(scoring_pool.shutdown)
+    await asyncio.gather(*pending_writes.values(), return_exceptions=True)
+    await asyncio.to_thread(near_duplicates.close)
+    if feature_store is not None:
+        await asyncio.to_thread(feature_store.flush)
+
+def lookup_cached(text):
+    """(key, (result, tier)) for a text from the exact cache, (None, None) on a miss"""
+    key = result_cache.key(text)
+    return key, result_cache.get(key)
+
+def lookup_near_duplicate(signature):
+    """((result, tier), nearest) for a text signature, reusing the nearest earlier submission when close enough"""
+    nearest = near_duplicates.nearest(signature) if signature is not None else (None, 0.0, None)
+    if near_duplicates.reusable(nearest):
+        return (nearest[2], 'near-duplicate'), nearest
+    return (None, None), nearest
+
+def store_result(key, signature, result, statistics):
+    """Write a fresh result to the caches and its statistics to the feature store"""
+    result_cache.put(key, result)
+    if feature_store is not None:
+        feature_store.append(key, statistics)
+    if signature is not None:
+        near_duplicates.add(key, signature, result)
+
+def store_when_done(key, signature, future):
+    """Store the result of a scoring future once, whichever of its waiters are still around"""
+    if future.cancelled() or future.exception() is not None:
+        return
+    result, _, statistics = future.result()
+    if 'error' in result:
+        return
+    write = asyncio.ensure_future(asyncio.to_thread(store_result, key, signature, result, statistics))
+    pending_writes[key] = write
+    write.add_done_callback(lambda _: pending_writes.pop(key, None))
+
+def score_coalesced(key, text, signature=None):
+    """Future for the (result, timings, statistics) of a text, shared by every request for the same key.
+
+    Returns (future, coalesced) where coalesced says whether an existing
+    computation was joined. The result is stored when the future is done,
+    even if every request waiting on it has timed out or gone away.
+    """
+    future = in_flight.get(key)
+    if future is not None:
+        return future, True
+
+    future = asyncio.wrap_future(scoring_pool.submit(detect_ai_content_recorded, text))
+    in_flight[key] = future
+    # Forget the computation once it is done, however its waiters fared
+    future.add_done_callback(lambda _: in_flight.pop(key, None))
+    future.add_done_callback(lambda done: store_when_done(key, signature, done))
+    return future, False
+
+@app.route('/api/detect_ai', methods=['POST'])
+async def detect_ai():
+    """Detect AI-generated content from the input text, from a sample of it with max_ms or sample_rate"""
+    received = time.time()
+    try:
+        data = await request.get_json()
+
+        if not data or 'text' not in data:
+            return jsonify({"error": "No text provided"}), 400
+
+        text = data['text']
+        if not text.strip():
+            return jsonify({"error": "Empty text provided"}), 400
+
+        try:
+            max_ms, sample_rate = parse_budget(data.get('max_ms', request.args.get('max_ms')),
+                                               data.get('sample_rate', request.args.get('sample_rate')))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        approximate = max_ms is not None or sample_rate is not None
+
+        # Hashing and the SQLite tier stay off the event loop
+        key, (result, tier) = await asyncio.to_thread(lookup_cached, text)
+        # On an exact hit the nearest earlier submission is the text itself
+        nearest = (key, 1.0, result) if tier else (None, 0.0, None)
+        signature = None
+        # Signing a large text can take longer than a latency budget allows
+        if result is None and not approximate:
+            # Hashing every shingle is CPU-bound like scoring: in a thread it would hold
+            # the GIL against the event loop, so it goes through the pool too
+            signature = await asyncio.wait_for(
+                asyncio.wrap_future(scoring_pool.submit(text_signature, text)), SCORING_TIMEOUT)
+            (result, tier), nearest = await asyncio.to_thread(lookup_near_duplicate, signature)
+        coalesced = False
+        if result is None and approximate:
+            # Estimates vary with the sample, so they are neither shared nor cached
+            deadline = received + max_ms / 1000 if max_ms is not None else None
+            future = asyncio.wrap_future(scoring_pool.submit(detect_approximate, text, deadline, sample_rate))
+            result = await asyncio.wait_for(future, SCORING_TIMEOUT)
+        elif approximate:
+            result = with_exact_interval(result)
+        elif result is None:
+            future, coalesced = score_coalesced(key, text, signature)
+            # Shield the shared future so one client giving up does not cancel it for the rest
+            result, _, _ = await asyncio.wait_for(asyncio.shield(future), SCORING_TIMEOUT)
+            # Answer once the result is cached, so the client's next request finds it
+            if key in pending_writes:
+                await asyncio.shield(pending_writes[key])
+
+        response = jsonify(result)
+        response.headers['X-Cache'] = 'HIT' if tier else 'MISS'
+        if tier:
+            response.headers['X-Cache-Tier'] = tier
+        if nearest[0] is not None:
+            response.headers['X-Near-Duplicate'] = nearest[0]
+            response.headers['X-Near-Duplicate-Similarity'] = f"{nearest[1]:.3f}"
+        response.headers['X-Coalesced'] = 'true' if coalesced else 'false'
+        response.headers['X-Scoring-Version'] = SCORING_VERSION
+        return response
+    except PoolFull as e:
+        response = jsonify({"error": str(e)})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(RETRY_AFTER_SECONDS)
+        return response
+    except asyncio.TimeoutError:
+        return jsonify({"error": f"Scoring did not finish within {SCORING_TIMEOUT} seconds"}), 504
+    except Exception as e:
+        app.logger.error(f"Error in detect_ai: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/health', methods=['GET'])
+async def health_check():
+    """Health check endpoint"""
+    return Response('', status=200)
+
+if __name__ == '__main__':
+    app.run(host=os.environ.get('HOST', '0.0.0.0'), port=int(os.environ.get('PORT', 5000)))
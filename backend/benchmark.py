@@ -0,0 +1,270 @@
+# backend/benchmark.py
+"""Micro-benchmarks for detect_ai_content.
+
+    python benchmark.py                          # run and write benchmark_results.json
+    python benchmark.py --baseline benchmark_baseline.json
+    python benchmark.py --save-baseline benchmark_baseline.json
+
+With --baseline the run fails (exit code 1) when a case got slower or used
+more memory than the baseline by more than --tolerance.
+
+benchmark_baseline.json is the reference run, with the machine it was made
+on recorded under "meta". Timings only compare on similar hardware: on a
+different machine, regenerate it with --save-baseline from the commit you
+compare against, on an otherwise idle machine, before using --baseline.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from itertools import accumulate
+
+import metrics
+from ai_detector import detect_ai_content, detect_ai_content_timed, SCORING_VERSION
+from text_features import SENTENCE_RE, WORD_RE, TRANSITION_RE, TRANSITION_WORDS
+
+KB = 1024
+MB = 1024 * KB
+
+SIZES = {
+    '1KB': KB,
+    '10KB': 10 * KB,
+    '100KB': 100 * KB,
+    '1MB': MB,
+    '10MB': 10 * MB,
+    '50MB': 50 * MB,
+}
+
+# Corpus shapes: mean words per sentence, vocabulary size, share of sentences
+# opening with a transition word
+PROFILES = {
+    'default': {'sentence_length': 18, 'vocabulary': 20000, 'transition_density': 0.1},
+    'short_sentences': {'sentence_length': 6, 'vocabulary': 20000, 'transition_density': 0.1},
+    'long_sentences': {'sentence_length': 60, 'vocabulary': 20000, 'transition_density': 0.1},
+    'small_vocabulary': {'sentence_length': 18, 'vocabulary': 500, 'transition_density': 0.1},
+    'large_vocabulary': {'sentence_length': 18, 'vocabulary': 200000, 'transition_density': 0.1},
+    'transition_heavy': {'sentence_length': 18, 'vocabulary': 20000, 'transition_density': 0.8},
+}
+
+# Every size runs with the default profile; the other profiles run at these sizes
+PROFILE_SIZES = ('100KB', '1MB')
+
+SYLLABLES = ['ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'ti', 'vo', 'ze', 'an', 'el', 'or', 'is', 'um', 'et']
+
+
+def make_vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 5))))
+    return sorted(words)
+
+
+def generate_corpus(size, sentence_length=18, vocabulary=20000, transition_density=0.1, seed=0):
+    """Deterministic synthetic text of about `size` characters"""
+    rng = random.Random(seed)
+    words = make_vocabulary(vocabulary, rng)
+    # Zipf-like word frequencies, as in natural text
+    cumulative = list(accumulate(1 / rank for rank in range(1, len(words) + 1)))
+    sentences = []
+    total = 0
+    while total < size:
+        length = max(1, int(rng.gauss(sentence_length, sentence_length / 3)))
+        sentence = rng.choices(words, cum_weights=cumulative, k=length)
+        if rng.random() < transition_density:
+            sentence.insert(0, rng.choice(TRANSITION_WORDS))
+        sentence[0] = sentence[0].capitalize()
+        text = ' '.join(sentence) + rng.choice('..!?') + ' '
+        sentences.append(text)
+        total += len(text)
+    return ''.join(sentences)[:size]
+
+
+def time_kernels(text):
+    """Time the scans fused inside extract_features one at a time"""
+    lowered = text.lower()
+    kernels = {}
+
+    start = time.perf_counter()
+    sentences = [segment.split() for segment in SENTENCE_RE.findall(lowered)]
+    kernels['sentence_split'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    WORD_RE.findall(lowered)
+    kernels['tokenization'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sum(1 for _ in TRANSITION_RE.finditer(lowered))
+    kernels['transitions'] = time.perf_counter() - start
+
+    del sentences
+    return kernels
+
+
+# Small inputs are repeated until at least this much time was measured
+MIN_MEASURED_SECONDS = 0.5
+# Differences below these are noise, whatever the relative change
+TIME_FLOOR = 0.001
+MEMORY_FLOOR = 64 * KB
+
+
+def run_case(text, repeats):
+    best = None
+    measured = 0.0
+    runs = 0
+    while runs < repeats or measured < MIN_MEASURED_SECONDS:
+        timings = {}
+        start = time.perf_counter()
+        result = detect_ai_content(text, timings)
+        total = time.perf_counter() - start
+        runs += 1
+        measured += total
+        if 'error' in result:
+            raise RuntimeError(result['error'])
+        if best is None or total < best['total']:
+            best = {'total': total, 'stages': timings}
+
+    # Memory is measured in a separate run because tracing slows everything down
+    tracemalloc.start()
+    detect_ai_content(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best['kernels'] = time_kernels(text)
+    best['peak_memory'] = peak
+    best['runs'] = runs
+    best['size'] = len(text)
+    best['throughput_mb_s'] = len(text) / MB / best['total']
+    return best
+
+
+def instrumentation_overhead(text, calls=500, repetitions=9):
+    """Seconds per request added by stage timing and the Prometheus metrics of app.py
+
+    Bare and instrumented calls are interleaved, in alternating order, so
+    that drift in clock speed or cache state hits both alike. Each repetition
+    gives one estimate of the overhead; the median of them is reported with
+    the lowest and highest as its spread.
+    """
+    def bare():
+        detect_ai_content(text)
+
+    def instrumented():
+        started = metrics.request_started()
+        metrics.observe_input_size('benchmark', len(text))
+        _, timings = detect_ai_content_timed(text)
+        metrics.observe_stages(timings)
+        metrics.request_finished('benchmark', 200, started)
+
+    bare()
+    instrumented()
+    overheads, relatives = [], []
+    for _ in range(repetitions):
+        spent = {bare: 0.0, instrumented: 0.0}
+        for call in range(calls):
+            for func in ((bare, instrumented) if call % 2 else (instrumented, bare)):
+                start = time.perf_counter()
+                func()
+                spent[func] += time.perf_counter() - start
+        overheads.append((spent[instrumented] - spent[bare]) / calls)
+        relatives.append(spent[instrumented] / spent[bare] - 1)
+    return {
+        'per_request': statistics.median(overheads),
+        'per_request_range': [min(overheads), max(overheads)],
+        'relative': statistics.median(relatives),
+        'repetitions': repetitions,
+        'calls': calls,
+        'text_size': len(text),
+    }
+
+
+def cases(sizes):
+    for size_name in sizes:
+        yield f'{size_name}/default', SIZES[size_name], PROFILES['default']
+        if size_name in PROFILE_SIZES:
+            for profile_name, profile in PROFILES.items():
+                if profile_name != 'default':
+                    yield f'{size_name}/{profile_name}', SIZES[size_name], profile
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of regressions against a baseline run"""
+    regressions = []
+    for name, case in results['cases'].items():
+        previous = baseline.get('cases', {}).get(name)
+        if previous is None:
+            continue
+        for metric, floor in (('total', TIME_FLOOR), ('peak_memory', MEMORY_FLOOR)):
+            if case[metric] > previous[metric] * (1 + tolerance) + floor:
+                regressions.append(
+                    f"{name}: {metric} {case[metric]:.4g} vs baseline {previous[metric]:.4g} "
+                    f"(+{(case[metric] / previous[metric] - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark detect_ai_content")
+    parser.add_argument('--sizes', default=','.join(SIZES),
+                        help="comma-separated subset of " + ', '.join(SIZES))
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', help="fail on regressions against this results file")
+    parser.add_argument('--save-baseline', help="also write the results to this baseline file")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed slowdown or memory growth before failing (default 0.25 = 25%%)")
+    args = parser.parse_args()
+
+    results = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'scoring_version': SCORING_VERSION,
+            'seed': args.seed,
+        },
+        'cases': {},
+    }
+    for name, size, profile in cases(args.sizes.split(',')):
+        text = generate_corpus(size, seed=args.seed, **profile)
+        # Big inputs take long enough that one run is representative
+        case = run_case(text, args.repeats if size <= MB else 1)
+        results['cases'][name] = case
+        stages = ' '.join(f"{stage}={seconds * 1000:.1f}ms" for stage, seconds in case['stages'].items())
+        print(f"{name:<24} {case['total'] * 1000:10.1f} ms {case['throughput_mb_s']:8.2f} MB/s "
+              f"{case['peak_memory'] / MB:8.1f} MB peak  {stages}")
+
+    overhead = instrumentation_overhead(generate_corpus(KB, seed=args.seed))
+    results['instrumentation_overhead'] = overhead
+    low, high = overhead['per_request_range']
+    print(f"instrumentation overhead on a {overhead['text_size']} character text: "
+          f"{overhead['per_request'] * 1e6:.1f} us per request ({overhead['relative']:+.1%}), "
+          f"median of {overhead['repetitions']}, range {low * 1e6:.1f} to {high * 1e6:.1f} us")
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)
+        for key in ('platform', 'machine', 'cpus', 'python'):
+            if baseline.get('meta', {}).get(key) != results['meta'][key]:
+                print(f"Note: baseline {key} {baseline.get('meta', {}).get(key)!r} differs from "
+                      f"this run's {results['meta'][key]!r}; timings may not be comparable")
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print("REGRESSION", regression)
+        if regressions:
+            sys.exit(1)
+        print("No regressions against", args.baseline)
+
+
+if __name__ == '__main__':
+    main()
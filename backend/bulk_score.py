@@ -0,0 +1,271 @@
+# backend/bulk_score.py
+"""Score large collections of documents offline, without going through HTTP.
+
+    python bulk_score.py archive/ --output results/
+    python bulk_score.py corpus.jsonl --text-field body --id-field doc_id --output results/
+    python bulk_score.py archive/ corpus.jsonl --output results/ --workers 8
+
+Inputs are directories (every .txt file below them), .txt files and JSONL
+files (one JSON object per line). Results go to results/results-00000.jsonl,
+results-00001.jsonl, ... one line per document, in input order. Progress is
+checkpointed in results/checkpoint.json: run the same command again to resume
+an interrupted run, or pass --restart to start over.
+
+The statistics behind each score go to a feature store in results/features,
+so the corpus can be re-weighted later without rescoring it (see
+feature_store.py).
+"""
+import argparse
+import json
+import mmap
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+from ai_detector import detect_ai_content, SCORING_VERSION
+from feature_store import FeatureStore
+from result_cache import cache_key
+
+CHECKPOINT_NAME = 'checkpoint.json'
+FEATURES_NAME = 'features'
+SHARD_NAME = 'results-{:05d}.jsonl'
+
+
+def mapped(path):
+    """Read-only memory map of a file; None for an empty file, which cannot be mapped"""
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def input_files(paths):
+    """(path, kind) for every input, directories expanded in sorted order"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.endswith('.txt'):
+                        yield os.path.join(root, name), 'txt'
+        elif path.endswith('.jsonl'):
+            yield path, 'jsonl'
+        else:
+            yield path, 'txt'
+
+
+def line_spans(path):
+    """(start, end) of every non-blank line of a file, found by scanning its memory map"""
+    mm = mapped(path)
+    if mm is None:
+        return
+    with mm:
+        start = 0
+        size = len(mm)
+        while start < size:
+            end = mm.find(b'\n', start)
+            if end == -1:
+                end = size
+            if mm[start:end].strip():
+                yield start, end
+            start = end + 1
+
+
+def tasks(paths):
+    """Every document as (path, kind, start, end), in a stable order"""
+    for path, kind in input_files(paths):
+        if kind == 'txt':
+            yield path, kind, 0, None
+        else:
+            for start, end in line_spans(path):
+                yield path, kind, start, end
+
+
+def count_tasks(paths):
+    return sum(1 for _ in tasks(paths))
+
+
+# Per worker process: the JSONL file currently being read, kept mapped between tasks
+_open_map = (None, None)
+_options = {}
+
+
+def init_worker(options):
+    _options.update(options)
+
+
+def _jsonl_map(path):
+    global _open_map
+    if _open_map[0] != path:
+        if _open_map[1] is not None:
+            _open_map[1].close()
+        _open_map = (path, mapped(path))
+    return _open_map[1]
+
+
+def score_task(task):
+    """Score one document; returns its output line, its result-cache key and its statistics"""
+    path, kind, start, end = task
+    record = {'source': path}
+    key, statistics = None, {}
+    try:
+        if kind == 'txt':
+            record['id'] = path
+            mm = mapped(path)
+            if mm is None:
+                text = ''
+            else:
+                with mm:
+                    text = str(memoryview(mm), 'utf-8', errors='replace')
+        else:
+            record['id'] = f'{path}:{start}'
+            document = json.loads(_jsonl_map(path)[start:end])
+            if not isinstance(document, dict):
+                raise ValueError("Line is not a JSON object")
+            if _options.get('id_field') in document:
+                record['id'] = document[_options['id_field']]
+            text = document.get(_options['text_field'], '')
+            if not isinstance(text, str):
+                raise ValueError(f"Field {_options['text_field']!r} is not a string")
+        key = cache_key(text, SCORING_VERSION)
+        record['result'] = detect_ai_content(text, statistics=statistics)
+    except (OSError, ValueError) as e:
+        record['result'] = {"error": f"Could not read document: {str(e)}"}
+    return json.dumps(record, ensure_ascii=False) + '\n', key, statistics
+
+
+class ShardWriter:
+    """Appends lines to numbered JSONL shards of at most shard_size lines"""
+
+    def __init__(self, directory, shard_size, shard=0, lines=0, offset=0):
+        self.directory = directory
+        self.shard_size = shard_size
+        self.shard = shard
+        self.lines = lines
+        self.file = None
+        self._open(offset)
+
+    def _open(self, offset=0):
+        path = os.path.join(self.directory, SHARD_NAME.format(self.shard))
+        self.file = open(path, 'a+b')
+        # Anything past the checkpoint was written by an interrupted run and is redone
+        self.file.truncate(offset)
+        self.file.seek(offset)
+
+    def write(self, line):
+        if self.lines == self.shard_size:
+            self.file.close()
+            self.shard += 1
+            self.lines = 0
+            self._open()
+        self.file.write(line.encode('utf-8'))
+        self.lines += 1
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return {'shard': self.shard, 'lines': self.lines, 'offset': self.file.tell()}
+
+    def close(self):
+        self.file.close()
+
+
+def load_checkpoint(path, signature):
+    try:
+        with open(path, encoding='utf-8') as file:
+            checkpoint = json.load(file)
+    except FileNotFoundError:
+        return None
+    if checkpoint.get('signature') != signature:
+        sys.exit(f"{path} belongs to a run with other inputs or options; use --restart to start over")
+    return checkpoint
+
+
+def save_checkpoint(path, checkpoint):
+    temporary = path + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as file:
+        json.dump(checkpoint, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+
+def synced_checkpoint(checkpoint, done, writer, features):
+    """Checkpoint for the documents done so far, once the shards and feature store are on disk"""
+    features.flush()
+    return dict(checkpoint, done=done, features=len(features), **writer.sync())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score directories of .txt files or JSONL corpora offline")
+    parser.add_argument('inputs', nargs='+', help="directories, .txt files or .jsonl files")
+    parser.add_argument('--output', required=True, help="directory for the result shards and checkpoint")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--text-field', default='text', help="JSONL field holding the text")
+    parser.add_argument('--id-field', default='id', help="JSONL field used as the document id")
+    parser.add_argument('--shard-size', type=int, default=100000, help="documents per output shard")
+    parser.add_argument('--chunk-size', type=int, default=64, help="documents handed to a worker at a time")
+    parser.add_argument('--checkpoint-every', type=float, default=10, help="seconds between checkpoints")
+    parser.add_argument('--restart', action='store_true', help="ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    checkpoint_path = os.path.join(args.output, CHECKPOINT_NAME)
+    signature = {
+        'inputs': [os.path.abspath(path) for path in args.inputs],
+        'text_field': args.text_field,
+        'id_field': args.id_field,
+        'shard_size': args.shard_size,
+    }
+    checkpoint = None if args.restart else load_checkpoint(checkpoint_path, signature)
+    # Flushed only at checkpoints, so it can be cut back to the checkpoint like the shards
+    features = FeatureStore(os.path.join(args.output, FEATURES_NAME), segment_rows=float('inf'))
+    if checkpoint is None:
+        for name in os.listdir(args.output):
+            if name.startswith('results-') and name.endswith('.jsonl'):
+                os.remove(os.path.join(args.output, name))
+        checkpoint = {'signature': signature, 'done': 0, 'shard': 0, 'lines': 0, 'offset': 0}
+    elif checkpoint.get('scoring_version') != SCORING_VERSION:
+        print("Warning: resuming a run started with another version of the scoring code", file=sys.stderr)
+    checkpoint['scoring_version'] = SCORING_VERSION
+    features.truncate(checkpoint.get('features', 0))
+
+    total = count_tasks(args.inputs)
+    done = checkpoint['done']
+    if done:
+        print(f"Resuming after {done} of {total} documents", file=sys.stderr)
+
+    writer = ShardWriter(args.output, args.shard_size, checkpoint['shard'], checkpoint['lines'], checkpoint['offset'])
+    remaining = (task for index, task in enumerate(tasks(args.inputs)) if index >= done)
+    started = last_report = last_checkpoint = time.monotonic()
+    scored = 0
+    options = {'text_field': args.text_field, 'id_field': args.id_field}
+    try:
+        with Pool(args.workers, initializer=init_worker, initargs=(options,)) as pool:
+            for line, key, statistics in pool.imap(score_task, remaining, chunksize=args.chunk_size):
+                writer.write(line)
+                if statistics:
+                    features.append(key, statistics)
+                scored += 1
+                now = time.monotonic()
+                if now - last_checkpoint >= args.checkpoint_every:
+                    save_checkpoint(checkpoint_path, synced_checkpoint(checkpoint, done + scored, writer, features))
+                    last_checkpoint = now
+                if now - last_report >= 2:
+                    rate = scored / (now - started)
+                    eta = (total - done - scored) / rate if rate else 0
+                    print(f"{done + scored}/{total} documents, {rate:.0f} docs/s, {eta:.0f}s left",
+                          file=sys.stderr)
+                    last_report = now
+    finally:
+        save_checkpoint(checkpoint_path, synced_checkpoint(checkpoint, done + scored, writer, features))
+        writer.close()
+
+    elapsed = time.monotonic() - started
+    print(f"Scored {scored} documents in {elapsed:.1f}s ({scored / elapsed if elapsed else 0:.0f} docs/s); "
+          f"{done + scored} of {total} done", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+# backend/feature_store.py
+"""Columnar store of the statistics behind every scored document, for re-weighting.
+
+Tuning WEIGHTS used to mean rescoring the whole corpus from raw text. The
+store keeps each document's component scores and sentence statistics in
+.npy columns, so a weight profile is applied to every stored document as a
+few array operations:
+
+    python feature_store.py reweight store/ --weights '{"sentence_variety": 0.4, ...}'
+    python feature_store.py reweight store/ results/features --profiles profiles.json --scores scores.npy
+    python feature_store.py info store/
+
+A store is a directory of segments, segment-000000/ and on, each holding
+one <column>.npy file per column. Rows are buffered and written a segment
+at a time; one process writes a store at a time.
+"""
+import argparse
+import json
+import math
+import os
+import shutil
+import sys
+import threading
+import time
+
+import numpy as np
+
+from ai_detector import WEIGHTS
+
+COLUMNS = {
+    'key': 'V32',                     # result-cache key as raw SHA-256 bytes ('S' would drop trailing NULs)
+    'scored_at': 'f8',
+    'sentence_count': 'u4',
+    'sentence_length_mean': 'f8',
+    'sentence_length_stdev': 'f8',
+    'transition_sentences': 'u4',     # sentences containing a transition word
+    'word_count': 'u4',
+    'unique_long_words': 'u4',
+    'transition_count': 'u4',
+    'chunk_diversity_stdev': 'f8',    # NaN when burstiness was not measured
+    'sentence_variety': 'f8',         # component scores (0-100) before rounding
+    'word_repetition': 'f8',
+    'transition_usage': 'f8',
+    'burstiness': 'f8',
+    'ai_percentage': 'u1',            # the score the document got when it was stored
+}
+COMPONENTS = ('sentence_variety', 'word_repetition', 'transition_usage', 'burstiness')
+SEGMENT_PREFIX = 'segment-'
+# Rows re-weighted per block, bounding the temporary arrays to profiles x 8 MiB
+BLOCK_ROWS = 1 << 20
+
+
+class FeatureStore:
+    """Appends rows of detect_ai_content statistics and reads them back as columns"""
+
+    def __init__(self, directory, segment_rows=4096):
+        self.directory = directory
+        self.segment_rows = segment_rows
+        self.buffer = []
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        """Store in FEATURE_STORE_DIR with FEATURE_STORE_SEGMENT_ROWS rows per segment; None when it is unset"""
+        directory = os.environ.get('FEATURE_STORE_DIR')
+        if not directory:
+            return None
+        return cls(directory, int(os.environ.get('FEATURE_STORE_SEGMENT_ROWS', 4096)))
+
+    def append(self, key, statistics, scored_at=None):
+        """Add a document given its result-cache key (hex) and the statistics detect_ai_content filled in"""
+        if not statistics:
+            return  # Too short to analyze: there is nothing to re-weight
+        row = dict(statistics, key=bytes.fromhex(key), scored_at=scored_at or time.time())
+        with self.lock:
+            self.buffer.append(row)
+            if len(self.buffer) >= self.segment_rows:
+                self._flush()
+
+    def flush(self):
+        """Write buffered rows as a new segment"""
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        # Called with the lock held
+        if not self.buffer:
+            return
+        rows, self.buffer = self.buffer, []
+        self._write_segment({
+            name: np.array([row[name] for row in rows], dtype=dtype) for name, dtype in COLUMNS.items()
+        })
+
+    def _write_segment(self, columns):
+        segments = self.segments()
+        number = int(segments[-1][len(SEGMENT_PREFIX):]) + 1 if segments else 0
+        name = f'{SEGMENT_PREFIX}{number:06d}'
+        # Written under a temporary name, so readers never see half a segment
+        temporary = os.path.join(self.directory, f'.{name}.tmp')
+        shutil.rmtree(temporary, ignore_errors=True)
+        os.makedirs(temporary)
+        for column, values in columns.items():
+            np.save(os.path.join(temporary, f'{column}.npy'), values)
+        os.rename(temporary, os.path.join(self.directory, name))
+
+    def segments(self):
+        return sorted(name for name in os.listdir(self.directory) if name.startswith(SEGMENT_PREFIX))
+
+    def _segment_rows(self, segment):
+        return np.load(os.path.join(self.directory, segment, 'key.npy'), mmap_mode='r').shape[0]
+
+    def __len__(self):
+        with self.lock:
+            return sum(map(self._segment_rows, self.segments())) + len(self.buffer)
+
+    def columns(self, names=COLUMNS):
+        """Every stored row (buffered ones included) as {name: array}"""
+        with self.lock:
+            parts = {name: [] for name in names}
+            for segment in self.segments():
+                for name in names:
+                    parts[name].append(np.load(os.path.join(self.directory, segment, f'{name}.npy'),
+                                               mmap_mode='r'))
+            for name in names:
+                parts[name].append(np.array([row[name] for row in self.buffer], dtype=COLUMNS[name]))
+        return {name: np.concatenate(arrays) for name, arrays in parts.items()}
+
+    def truncate(self, rows):
+        """Drop every row after the first rows, written or buffered"""
+        with self.lock:
+            self.buffer = []
+            kept = 0
+            for segment in self.segments():
+                path = os.path.join(self.directory, segment)
+                size = self._segment_rows(segment)
+                if kept + size > rows:
+                    keep = rows - kept
+                    columns = {name: np.load(os.path.join(path, f'{name}.npy'))[:keep] for name in COLUMNS}
+                    shutil.rmtree(path)
+                    if keep:
+                        self._write_segment(columns)
+                    size = keep
+                kept += size
+
+
+def normalized_profiles(profiles):
+    """{name: weights} from a dict of named profiles or a list of unnamed ones; raises ValueError"""
+    if isinstance(profiles, list):
+        profiles = {f'profile-{index}': weights for index, weights in enumerate(profiles)}
+    if not isinstance(profiles, dict) or not profiles:
+        raise ValueError("Expected one or more weight profiles")
+    for name, weights in profiles.items():
+        if not isinstance(weights, dict) or set(weights) != set(COMPONENTS):
+            raise ValueError(f"Profile {name!r} must give a weight for each of {', '.join(COMPONENTS)}")
+        if not all(isinstance(weight, (int, float)) and math.isfinite(weight) for weight in weights.values()):
+            raise ValueError(f"Profile {name!r} has a weight that is not a number")
+    return profiles
+
+
+def reweight(columns, profiles):
+    """ai_percentage of every stored document under each weight profile, as a (profiles, rows) array.
+
+    The component scores are combined in the same order and with the same
+    float64 arithmetic as build_result, so the default WEIGHTS reproduce the
+    stored scores exactly.
+    """
+    weights = np.array([[profile[name] for name in COMPONENTS] for profile in profiles], dtype=np.float64)
+    rows = len(columns[COMPONENTS[0]])
+    scores = np.empty((len(profiles), rows), dtype=np.int32)
+    for start in range(0, rows, BLOCK_ROWS):
+        block = slice(start, start + BLOCK_ROWS)
+        total = columns[COMPONENTS[0]][block] * weights[:, 0:1]
+        for index, name in enumerate(COMPONENTS[1:], 1):
+            total = total + columns[name][block] * weights[:, index:index + 1]
+        # int() truncates toward zero, and so does this cast
+        scores[:, block] = total.astype(np.int32)
+    return scores
+
+
+def summarize(scores, stored):
+    """Distribution of one profile's scores, and how many differ from the stored ones"""
+    if not len(scores):
+        return {'documents': 0, 'mean': None, 'histogram': [0] * 10, 'changed': 0}
+    buckets = np.clip(scores, 0, 99) // 10
+    return {
+        'documents': int(len(scores)),
+        'mean': float(scores.mean()),
+        'histogram': np.bincount(buckets, minlength=10).tolist(),  # 0-9, 10-19, ... 90-100
+        'changed': int(np.count_nonzero(scores != stored)),
+    }
+
+
+def reweight_stores(stores, profiles):
+    """(names, scores, summaries) of the weight profiles applied to every row of the stores"""
+    profiles = normalized_profiles(profiles)
+    parts = [store.columns(COMPONENTS + ('ai_percentage',)) for store in stores]
+    columns = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+    names = list(profiles)
+    scores = reweight(columns, [profiles[name] for name in names])
+    summaries = {name: dict(summarize(row, columns['ai_percentage']), weights=profiles[name])
+                 for name, row in zip(names, scores)}
+    return names, scores, summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-weight the documents in feature stores without rescoring them")
+    commands = parser.add_subparsers(dest='command', required=True)
+    reweight_parser = commands.add_parser('reweight', help="apply weight profiles to every stored document")
+    reweight_parser.add_argument('stores', nargs='+', help="feature store directories")
+    reweight_parser.add_argument('--weights', action='append', default=[],
+                                 help="one weight profile as JSON; may be repeated")
+    reweight_parser.add_argument('--profiles', help="JSON file of {name: weights} profiles")
+    reweight_parser.add_argument('--scores', help="write the (profiles, documents) score matrix to this .npy file")
+    info_parser = commands.add_parser('info', help="rows and segments of each store")
+    info_parser.add_argument('stores', nargs='+')
+    args = parser.parse_args()
+
+    for directory in args.stores:
+        if not os.path.isdir(directory):
+            sys.exit(f"{directory} is not a feature store")
+    stores = [FeatureStore(directory) for directory in args.stores]
+    if args.command == 'info':
+        for store in stores:
+            print(f"{store.directory}: {len(store)} documents in {len(store.segments())} segments")
+        return
+
+    profiles = {}
+    try:
+        if args.profiles:
+            try:
+                with open(args.profiles, encoding='utf-8') as file:
+                    profiles.update(normalized_profiles(json.load(file)))
+            except json.JSONDecodeError as e:
+                raise ValueError(f"--profiles {args.profiles}: {e}") from e
+        for index, weights in enumerate(args.weights):
+            try:
+                weights = json.loads(weights)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"--weights {weights!r}: {e}") from e
+            profiles.update(normalized_profiles({f'weights-{index}': weights}))
+        if not profiles:
+            profiles['current'] = WEIGHTS
+        started = time.perf_counter()
+        names, scores, summaries = reweight_stores(stores, profiles)
+    except (OSError, ValueError) as e:
+        sys.exit(str(e))
+    elapsed = time.perf_counter() - started
+    if args.scores:
+        np.save(args.scores, scores)
+    json.dump(summaries, sys.stdout, indent=2)
+    print()
+    print(f"Re-weighted {scores.shape[1]} documents under {len(names)} profiles in {elapsed:.2f}s",
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+# backend/heatmap.py
+"""Sliding-window AI-likelihood scores, to show where in a long document the AI-like text is."""
+import heapq
+
+import numpy as np
+
+from ai_detector import WEIGHTS
+from text_features import extract_features, original_offsets
+
+DEFAULT_WINDOW = 10   # sentences per window
+DEFAULT_STRIDE = 5    # sentences between window starts
+DEFAULT_TOP_K = 3
+
+# Only the components that add up over sentences can be computed per window
+# from prefix sums; repetition and burstiness need the whole window's vocabulary
+WINDOW_WEIGHT_TOTAL = WEIGHTS['sentence_variety'] + WEIGHTS['transition_usage']
+
+
+def window_starts(sentence_count, window, stride):
+    """First sentence of every window; the last window always reaches the end"""
+    if sentence_count <= window:
+        return np.zeros(1, dtype=np.int64)
+    starts = np.arange(0, sentence_count - window + 1, stride, dtype=np.int64)
+    if starts[-1] + window < sentence_count:
+        starts = np.append(starts, sentence_count - window)
+    return starts
+
+
+def window_sums(values, starts, ends):
+    """Sum of values[start:end] for every window, from one prefix-sum array"""
+    prefix = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum(values, out=prefix[1:])
+    return prefix[ends] - prefix[starts]
+
+
+def top_sections(scores, starts, ends, top_k):
+    """Highest-scoring windows that do not overlap an already chosen one"""
+    heap = [(-score, start, end) for score, start, end in zip(scores, starts, ends)]
+    heapq.heapify(heap)
+    chosen = []
+    while heap and len(chosen) < top_k:
+        score, start, end = heapq.heappop(heap)
+        if all(end <= other_start or start >= other_end for _, other_start, other_end in chosen):
+            chosen.append((-score, start, end))
+    return chosen
+
+
+def score_windows(text, window=DEFAULT_WINDOW, stride=DEFAULT_STRIDE, top_k=DEFAULT_TOP_K):
+    """Score every window of `window` sentences, `stride` sentences apart.
+
+    Sentence variety and transition usage are scored like detect_ai_content
+    does for the whole text, from prefix sums over sentence lengths, squared
+    lengths, word counts and transition hits, so the whole map costs O(n).
+    Offsets are character offsets into the original text.
+    """
+    if window < 1 or stride < 1 or top_k < 0:
+        raise ValueError("window and stride must be at least 1 and top_k at least 0")
+
+    result = {'window': window, 'stride': stride, 'scores': [], 'starts': [], 'ends': [], 'top_sections': []}
+    if not text or len(text) < 50:
+        return result
+
+    features = extract_features(text)
+    sentence_count = len(features.sentence_lengths)
+    if sentence_count == 0:
+        return result
+
+    first = window_starts(sentence_count, window, stride)
+    last = np.minimum(first + window, sentence_count)
+    counts = last - first
+
+    lengths = np.asarray(features.sentence_lengths, dtype=np.int64)
+    length_sums = window_sums(lengths, first, last)
+    square_sums = window_sums(lengths * lengths, first, last)
+    word_counts = window_sums(features.sentence_word_counts, first, last)
+    transition_counts = window_sums(features.sentence_transition_counts, first, last)
+
+    # Sample variance from the sums, as statistics.stdev computes it for one window
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variance = (square_sums - length_sums * length_sums / counts) / (counts - 1)
+        deviation = np.where(counts > 1, np.sqrt(np.clip(variance, 0, None)), 0.0)
+        sentence_variety = np.clip(100 - (20 * (5 / (deviation + 1))), 0, 100)
+        transition_ratio = np.where(word_counts > 0, transition_counts / (word_counts / 100), 0.0)
+    transition_usage = np.clip(transition_ratio * 10, 0, 100)
+    scores = ((sentence_variety * WEIGHTS['sentence_variety'] +
+               transition_usage * WEIGHTS['transition_usage']) / WINDOW_WEIGHT_TOTAL).astype(int)
+
+    starts = np.frombuffer(features.sentence_starts, dtype=np.uint64)[first].astype(np.int64)
+    ends = np.frombuffer(features.sentence_ends, dtype=np.uint64)[last - 1].astype(np.int64)
+    if features.lowered_length != len(text):
+        offsets = np.asarray(original_offsets(text), dtype=np.int64)
+        starts, ends = offsets[starts], offsets[ends]
+
+    result['scores'] = scores.tolist()
+    result['starts'] = starts.tolist()
+    result['ends'] = ends.tolist()
+    result['top_sections'] = [
+        {'score': score, 'start': start, 'end': end, 'text': text[start:end].strip()}
+        for score, start, end in top_sections(result['scores'], result['starts'], result['ends'], top_k)
+    ]
+    return result
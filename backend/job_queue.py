@@ -0,0 +1,233 @@
+# backend/job_queue.py
+"""Background scoring jobs for documents too large to score within one request.
+
+Jobs run in their own process pool, so a few huge documents cannot starve
+the interactive endpoints. Workers send progress back over a queue; a
+listener thread applies it to the jobs and wakes up anyone waiting on them.
+"""
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from ai_detector import detect_ai_content
+from scoring_pool import PoolFull
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(BaseException):
+    """Raised inside a worker to stop a cancelled job.
+
+    A BaseException, like asyncio.CancelledError, so the detector's own
+    error handling does not turn it into an error result.
+    """
+
+
+# Set in each worker process by init_worker
+_progress = None
+_cancelled = None
+
+
+def init_worker(progress, cancelled):
+    global _progress, _cancelled
+    _progress = progress
+    _cancelled = cancelled
+
+
+def run_job(job_id, text):
+    """Score a job's text in a worker process, reporting progress as it goes"""
+    def report(fraction):
+        if job_id in _cancelled:
+            raise JobCancelled()
+        _progress.put((job_id, fraction, 'extraction'))
+
+    statistics = {}
+    try:
+        report(0.0)
+        result = detect_ai_content(text, progress=report, statistics=statistics)
+    except JobCancelled:
+        return CANCELLED, None, None
+    _progress.put((job_id, 1.0, 'scoring'))
+    return DONE, result, statistics
+
+
+class Job:
+    __slots__ = ('id', 'status', 'progress', 'stage', 'result', 'error', 'text_length',
+                 'created_at', 'finished_at', 'version', 'future', 'on_result')
+
+    def __init__(self, text_length, on_result=None):
+        self.id = uuid.uuid4().hex
+        self.status = QUEUED
+        self.progress = 0.0
+        self.stage = None
+        self.result = None
+        self.error = None
+        self.text_length = text_length
+        self.created_at = time.time()
+        self.finished_at = None
+        self.version = 0  # bumped on every change, so waiters can tell what is new
+        self.future = None
+        self.on_result = on_result
+
+    def snapshot(self):
+        state = {
+            'job_id': self.id,
+            'status': self.status,
+            'progress': self.progress,
+            'stage': self.stage,
+            'text_length': self.text_length,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+        }
+        if self.status == DONE:
+            state['result'] = self.result
+        elif self.status == FAILED:
+            state['error'] = self.error
+        return state
+
+
+class JobQueue:
+    """Scoring jobs by ID: queued and running ones are bounded, finished ones kept for ttl seconds"""
+
+    def __init__(self, workers=None, max_active=32, ttl=3600):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_active = max_active
+        self.ttl = ttl
+        context = multiprocessing.get_context()
+        # Cancellation flags are read by the workers between blocks of the text
+        self.manager = context.Manager()
+        self.cancelled = self.manager.dict()
+        self.progress = context.Queue()
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                            initargs=(self.progress, self.cancelled))
+        self.jobs = {}
+        self.condition = threading.Condition()
+        self.listener = threading.Thread(target=self._listen, name='job-progress', daemon=True)
+        self.listener.start()
+        self.closed = False
+
+    @classmethod
+    def from_env(cls):
+        """Queue configured from JOB_WORKERS, JOB_MAX_ACTIVE and JOB_TTL"""
+        return cls(
+            workers=int(os.environ.get('JOB_WORKERS', 0)) or None,
+            max_active=int(os.environ.get('JOB_MAX_ACTIVE', 32)),
+            ttl=float(os.environ.get('JOB_TTL', 3600))
+        )
+
+    def submit(self, text, result=None, on_result=None):
+        """Start a job for the text; one with a known result is finished straight away.
+
+        on_result is called with the result and the statistics behind it
+        (see detect_ai_content) when the job is done.
+        """
+        job = Job(len(text), on_result)
+        with self.condition:
+            if self.closed:
+                raise PoolFull("Server is shutting down")
+            self._expire()
+            if sum(1 for other in self.jobs.values() if other.status not in FINISHED) >= self.max_active:
+                raise PoolFull("Too many jobs in progress")
+            self.jobs[job.id] = job
+            if result is not None:
+                self._finish(job, DONE, result=result)
+                return job
+            job.future = self.executor.submit(run_job, job.id, text)
+        job.future.add_done_callback(lambda future: self._done(job, future))
+        return job
+
+    def get(self, job_id):
+        with self.condition:
+            self._expire()
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; returns it, or None if there is no such job"""
+        with self.condition:
+            job = self.jobs.get(job_id)
+            if job is None or job.status in FINISHED:
+                return job
+            if not job.future.cancel():
+                # Already running: the worker stops at its next progress report
+                self.cancelled[job_id] = True
+            self._finish(job, CANCELLED)
+            return job
+
+    def wait(self, job, version, timeout):
+        """Wait until the job changes from the given version; returns (snapshot, version), or (None, version) on timeout"""
+        with self.condition:
+            if not self.condition.wait_for(lambda: job.version != version, timeout):
+                return None, version
+            return job.snapshot(), job.version
+
+    def _finish(self, job, status, result=None, error=None):
+        # Called with the condition held
+        job.status = status
+        job.result = result
+        job.error = error
+        if status == DONE:
+            job.progress = 1.0
+        job.finished_at = time.time()
+        job.future = None
+        job.version += 1
+        self.condition.notify_all()
+
+    def _done(self, job, future):
+        self.cancelled.pop(job.id, None)
+        if future.cancelled():
+            return
+        try:
+            status, result, statistics = future.result()
+        except Exception as e:
+            status, result, statistics = FAILED, str(e), None
+        with self.condition:
+            if job.status in FINISHED:
+                return  # Cancelled while the worker was finishing; the result is dropped
+            if status == DONE and 'error' in result:
+                status, result = FAILED, result['error']
+            if status == FAILED:
+                self._finish(job, FAILED, error=result)
+            else:
+                self._finish(job, status, result=result)
+        if status == DONE and job.on_result is not None:
+            job.on_result(result, statistics)
+
+    def _listen(self):
+        while True:
+            update = self.progress.get()
+            if update is None:
+                return
+            job_id, fraction, stage = update
+            with self.condition:
+                job = self.jobs.get(job_id)
+                if job is None or job.status in FINISHED:
+                    continue
+                job.status = RUNNING
+                job.progress = round(fraction, 4)
+                job.stage = stage
+                job.version += 1
+                self.condition.notify_all()
+
+    def _expire(self):
+        # Called with the condition held
+        cutoff = time.time() - self.ttl
+        for job_id in [job_id for job_id, job in self.jobs.items()
+                       if job.finished_at is not None and job.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+    def shutdown(self):
+        """Cancel queued jobs, wait for running ones and stop the helper processes"""
+        with self.condition:
+            self.closed = True
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.progress.put(None)
+        self.listener.join()
+        self.manager.shutdown()
@@ -0,0 +1,216 @@
+# backend/live_document.py
+"""Incremental scoring of a document that is being edited, one paragraph at a time.
+
+The client splits its text into paragraphs that each end at a sentence
+boundary (terminal punctuation followed by a line break), keeps the list it
+last sent, and sends only the paragraphs that changed as a splice. Because no
+sentence spans two paragraphs, the per-paragraph statistics add up to exactly
+what detect_ai_content computes for the whole text.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from fractions import Fraction
+
+import numpy as np
+
+from ai_detector import build_result, empty_result
+from streaming_detector import _float_sqrt_of_frac
+from text_features import extract_features, chunk_diversities, sentence_texts
+
+
+class UnknownSession(Exception):
+    """The live session does not exist or has expired"""
+
+
+class VersionConflict(Exception):
+    """The client's view of the document is not the version the server holds"""
+
+
+class Paragraph:
+    """Statistics of one paragraph, with its words mapped to document-wide IDs"""
+
+    __slots__ = ('text', 'features', 'token_ids', 'distinct_ids', 'length_sum', 'length_sq_sum', 'candidates')
+
+    def __init__(self, text, document):
+        self.text = text
+        self.features = features = extract_features(text)
+        # Translate the paragraph's own vocabulary IDs into the document's
+        mapping = np.fromiter((document.intern(word) for word in features.vocabulary),
+                              dtype=np.uint32, count=len(features.vocabulary))
+        self.token_ids = mapping[np.frombuffer(features.token_ids, dtype=np.uint32)]
+        self.distinct_ids = mapping
+        self.length_sum = sum(features.sentence_lengths)
+        self.length_sq_sum = sum(length * length for length in features.sentence_lengths)
+        # Only these sentences can ever be highlighted, as (index, length)
+        self.candidates = [
+            (i, length) for i, length in enumerate(features.sentence_lengths)
+            if length > 5 and features.sentence_transitions[i]
+        ]
+
+
+class LiveDocument:
+    """A document kept as a list of scored paragraphs; splice() replaces some of them"""
+
+    def __init__(self):
+        self.paragraphs = []
+        self.version = 0
+        self.lock = threading.Lock()
+
+        self.vocabulary = {}        # word -> document-wide ID; words are never forgotten
+        self.long_words = bytearray()  # per ID: word longer than three characters
+        self.frequency = np.zeros(1024, dtype=np.int32)  # per ID: paragraphs containing the word
+        self.unique_words = 0       # long words in at least one paragraph
+
+        self.length = 0
+        self.sentence_count = 0
+        self.length_sum = 0
+        self.length_sq_sum = 0
+        self.word_count = 0
+        self.transition_count = 0
+
+    def intern(self, word):
+        word_id = self.vocabulary.get(word)
+        if word_id is None:
+            word_id = self.vocabulary[word] = len(self.vocabulary)
+            self.long_words.append(len(word) > 3)
+            if word_id == len(self.frequency):
+                self.frequency = np.concatenate([self.frequency, np.zeros_like(self.frequency)])
+        return word_id
+
+    def splice(self, start, delete, texts):
+        """Replace paragraphs[start:start + delete] with new paragraphs; returns how many were scored"""
+        if not 0 <= start <= len(self.paragraphs) or not 0 <= delete <= len(self.paragraphs) - start:
+            raise ValueError(f"Splice {start}+{delete} is outside the {len(self.paragraphs)} paragraphs")
+        added = [Paragraph(text, self) for text in texts]
+        for paragraph in self.paragraphs[start:start + delete]:
+            self._count(paragraph, -1)
+        for paragraph in added:
+            self._count(paragraph, 1)
+        self.paragraphs[start:start + delete] = added
+        self.version += 1
+        return len(added)
+
+    def _count(self, paragraph, sign):
+        features = paragraph.features
+        self.length += sign * len(paragraph.text)
+        self.sentence_count += sign * len(features.sentence_lengths)
+        self.length_sum += sign * paragraph.length_sum
+        self.length_sq_sum += sign * paragraph.length_sq_sum
+        self.word_count += sign * features.word_count
+        self.transition_count += sign * features.transition_count
+
+        ids = paragraph.distinct_ids
+        long_words = np.frombuffer(self.long_words, dtype=bool)
+        self.frequency[ids] += sign
+        # Words that just appeared in, or disappeared from, the whole document
+        changed = ids[self.frequency[ids] == (1 if sign > 0 else 0)]
+        self.unique_words += sign * int(np.count_nonzero(long_words[changed]))
+
+    def result(self):
+        """The same dict detect_ai_content returns for the concatenated paragraphs"""
+        try:
+            if self.length < 50:
+                return empty_result()
+
+            if self.sentence_count > 1:
+                sentence_variance = _float_sqrt_of_frac(
+                    self.sentence_count * self.length_sq_sum - self.length_sum ** 2,
+                    self.sentence_count * (self.sentence_count - 1)
+                )
+            else:
+                sentence_variance = 0
+
+            chunk_diversity = None
+            if self.sentence_count > 5:
+                token_ids = np.concatenate([paragraph.token_ids for paragraph in self.paragraphs])
+                chunk_diversity = chunk_diversities(token_ids, np.frombuffer(self.long_words, dtype=bool))
+
+            return build_result(
+                self.sentence_count, sentence_variance, self.word_count, self.unique_words,
+                self.transition_count, chunk_diversity, self._highlighted_sections()
+            )
+        except Exception as e:
+            return {"error": f"Error during AI detection: {str(e)}"}
+
+    def _highlighted_sections(self):
+        highlighted_sections = []
+        if self.sentence_count > 3:
+            average = Fraction(self.length_sum, self.sentence_count)
+            # statistics.mean returns an int when the mean is whole, otherwise a float
+            avg_length = int(average) if average.denominator == 1 else float(average)
+            chosen = 0
+            for paragraph in self.paragraphs:
+                indices = [i for i, length in paragraph.candidates if abs(length - avg_length) < 2][:3 - chosen]
+                if not indices:
+                    continue
+                originals = sentence_texts(paragraph.text, paragraph.features, indices)
+                highlighted_sections.extend(originals[i] for i in indices if len(originals[i]) > 20)
+                chosen += len(indices)
+                if chosen == 3:
+                    break
+        return highlighted_sections
+
+
+class LiveSessions:
+    """Live documents by session ID, least recently used dropped first, idle ones expired"""
+
+    def __init__(self, max_sessions=32, ttl=1800):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.sessions = OrderedDict()  # session ID -> (last used, LiveDocument)
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Sessions configured from LIVE_MAX_SESSIONS and LIVE_SESSION_TTL"""
+        return cls(
+            max_sessions=int(os.environ.get('LIVE_MAX_SESSIONS', 32)),
+            ttl=float(os.environ.get('LIVE_SESSION_TTL', 1800))
+        )
+
+    def create(self):
+        session_id = uuid.uuid4().hex
+        with self.lock:
+            self._expire()
+            self.sessions[session_id] = (time.monotonic(), LiveDocument())
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+            return session_id, self.sessions[session_id][1]
+
+    def get(self, session_id):
+        with self.lock:
+            self._expire()
+            entry = self.sessions.get(session_id)
+            if entry is None:
+                raise UnknownSession(f"Unknown or expired live session: {session_id}")
+            self.sessions[session_id] = (time.monotonic(), entry[1])
+            self.sessions.move_to_end(session_id)
+            return entry[1]
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        while self.sessions:
+            session_id, (last_used, _) = next(iter(self.sessions.items()))
+            if last_used > cutoff:
+                break
+            del self.sessions[session_id]
+
+
+def update(sessions, session_id, version, start, delete, texts):
+    """Apply one splice from a client and return (session ID, document version, result).
+
+    Without a session ID a new document is started; the splice must then
+    insert every paragraph.
+    """
+    if session_id is None:
+        session_id, document = sessions.create()
+    else:
+        document = sessions.get(session_id)
+    with document.lock:
+        if version is not None and version != document.version:
+            raise VersionConflict(f"Live session is at version {document.version}, not {version}")
+        document.splice(start, delete, texts)
+        return session_id, document.version, document.result()
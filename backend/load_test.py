@@ -0,0 +1,367 @@
+# backend/load_test.py
+"""Load generator for the /api/detect_ai endpoint.
+
+    python load_test.py --mode closed --concurrency 8 --duration 30
+    python load_test.py --mode open --rate 50 --sizes lognormal:2000:1.0
+    python load_test.py --server-args "--production --workers 4"
+    python load_test.py --url http://otherhost:5000 --mode open --rate 20
+
+Unless --url is given, app.py is started locally (with --server-args) and
+stopped afterwards. Latency, throughput and error rate are reported along
+with the server's CPU and RSS over time, summed over the server and its
+worker processes. The same --seed gives the same texts and arrival times.
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import shlex
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from benchmark import generate_corpus
+
+# Texts are cut from one synthetic corpus at random offsets
+CORPUS_SIZE = 4 * 1024 * 1024
+SAMPLE_INTERVAL = 0.5
+PERCENTILES = (50, 95, 99, 99.9)
+
+
+def parse_size_distribution(spec):
+    """Return a function rng -> text size for specs like fixed:2000,
+    uniform:100-10000, lognormal:<median>:<sigma> or choice:500,5000,50000"""
+    kind, _, arguments = spec.partition(':')
+    if kind == 'fixed':
+        size = int(arguments)
+        return lambda rng: size
+    if kind == 'uniform':
+        low, high = (int(value) for value in arguments.split('-'))
+        return lambda rng: rng.randint(low, high)
+    if kind == 'lognormal':
+        median, sigma = arguments.split(':')
+        mu = math.log(float(median))
+        return lambda rng: max(1, min(CORPUS_SIZE, int(rng.lognormvariate(mu, float(sigma)))))
+    if kind == 'choice':
+        sizes = [int(value) for value in arguments.split(',')]
+        return lambda rng: rng.choice(sizes)
+    raise ValueError(f"Unknown size distribution: {spec}")
+
+
+class RequestTexts:
+    """Deterministic sequence of request texts, cut from the corpus on demand"""
+
+    def __init__(self, count, size_distribution, seed):
+        rng = random.Random(seed)
+        self.corpus = generate_corpus(CORPUS_SIZE, seed=seed)
+        self.spans = []
+        for _ in range(count):
+            size = min(size_distribution(rng), len(self.corpus))
+            self.spans.append((rng.randint(0, len(self.corpus) - size), size))
+
+    def __len__(self):
+        return len(self.spans)
+
+    def __getitem__(self, index):
+        start, size = self.spans[index]
+        return self.corpus[start:start + size]
+
+
+def percentile(sorted_values, percent):
+    if not sorted_values:
+        return None
+    rank = max(0, math.ceil(percent / 100 * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+
+class ProcessSampler:
+    """Samples CPU and RSS of a process tree from /proc in a background thread"""
+
+    def __init__(self, pid, interval=SAMPLE_INTERVAL):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._ticks = os.sysconf('SC_CLK_TCK')
+        self._page_size = os.sysconf('SC_PAGE_SIZE')
+
+    def _tree(self):
+        children = {}
+        for entry in os.listdir('/proc'):
+            if entry.isdigit():
+                try:
+                    with open(f'/proc/{entry}/stat') as file:
+                        # The command name may contain spaces, so split after it
+                        fields = file.read().rsplit(')', 1)[1].split()
+                except OSError:
+                    continue
+                children.setdefault(int(fields[1]), []).append(int(entry))
+        tree, stack = [], [self.pid]
+        while stack:
+            pid = stack.pop()
+            tree.append(pid)
+            stack.extend(children.get(pid, []))
+        return tree
+
+    def _usage(self):
+        """Total CPU seconds and resident bytes of the process tree"""
+        cpu = rss = 0
+        for pid in self._tree():
+            try:
+                with open(f'/proc/{pid}/stat') as file:
+                    fields = file.read().rsplit(')', 1)[1].split()
+                with open(f'/proc/{pid}/statm') as file:
+                    resident = int(file.read().split()[1])
+            except OSError:
+                continue
+            cpu += (int(fields[11]) + int(fields[12])) / self._ticks
+            rss += resident * self._page_size
+        return cpu, rss
+
+    def _run(self):
+        start = time.monotonic()
+        previous_time, previous_cpu = start, self._usage()[0]
+        while not self._stop.wait(self.interval):
+            now = time.monotonic()
+            cpu, rss = self._usage()
+            self.samples.append({
+                'time': round(now - start, 3),
+                'cpu_percent': round((cpu - previous_cpu) / (now - previous_time) * 100, 1),
+                'rss_mb': round(rss / (1024 * 1024), 1),
+            })
+            previous_time, previous_cpu = now, cpu
+
+    def start(self):
+        if os.path.isdir(f'/proc/{self.pid}'):
+            self._thread.start()
+        else:
+            print("Server process metrics need /proc; skipping them", file=sys.stderr)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+
+class Client:
+    """One keep-alive connection per thread"""
+
+    def __init__(self, url, timeout):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def post(self, text):
+        """Send one request; returns (HTTP status or exception name, X-Cache header)"""
+        body = json.dumps({'text': text})
+        for attempt in range(2):
+            connection = getattr(self.local, 'connection', None)
+            if connection is None:
+                connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+                self.local.connection = connection
+            try:
+                connection.request('POST', '/api/detect_ai', body, {'Content-Type': 'application/json'})
+                response = connection.getresponse()
+                response.read()
+                return response.status, response.getheader('X-Cache')
+            except (http.client.HTTPException, OSError) as e:
+                connection.close()
+                self.local.connection = None
+                # A keep-alive connection the server already closed is retried once
+                if attempt or not isinstance(e, (http.client.RemoteDisconnected, ConnectionResetError,
+                                                 BrokenPipeError)):
+                    return type(e).__name__, None
+
+
+def run_closed_loop(client, texts, concurrency, duration):
+    """Each of `concurrency` users sends its next request as soon as the last one returns"""
+    records = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+    cursor = iter(range(len(texts)))
+
+    def user():
+        while time.monotonic() < deadline:
+            with lock:
+                index = next(cursor, None)
+            if index is None:
+                return
+            start = time.monotonic()
+            text = texts[index]
+            status, cache = client.post(text)
+            end = time.monotonic()
+            with lock:
+                records.append((start, end, status, cache, len(text)))
+
+    threads = [threading.Thread(target=user) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return records
+
+
+def run_open_loop(client, texts, rate, duration, seed, max_outstanding):
+    """Requests arrive as a Poisson process whatever the server's speed.
+
+    Latency is measured from each request's scheduled arrival, so time spent
+    waiting for a free sender counts against the server (no coordinated omission).
+    """
+    rng = random.Random(seed + 1)
+    arrivals = []
+    offset = rng.expovariate(rate)
+    while offset < duration and len(arrivals) < len(texts):
+        arrivals.append(offset)
+        offset += rng.expovariate(rate)
+
+    records = []
+    lock = threading.Lock()
+
+    def send(index, scheduled):
+        text = texts[index]
+        status, cache = client.post(text)
+        end = time.monotonic()
+        with lock:
+            records.append((scheduled, end, status, cache, len(text)))
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max_outstanding) as executor:
+        for index, arrival in enumerate(arrivals):
+            delay = start + arrival - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, index, start + arrival)
+    return records
+
+
+def summarize(records, elapsed):
+    latencies = sorted(end - start for start, end, status, _, _ in records if status == 200)
+    errors = {}
+    for _, _, status, _, _ in records:
+        if status != 200:
+            errors[str(status)] = errors.get(str(status), 0) + 1
+    cache_hits = sum(1 for record in records if record[3] == 'HIT')
+    return {
+        'requests': len(records),
+        'succeeded': len(latencies),
+        'elapsed': elapsed,
+        'throughput_rps': len(latencies) / elapsed if elapsed else 0,
+        'bytes_per_second': sum(record[4] for record in records if record[2] == 200) / elapsed if elapsed else 0,
+        'error_rate': (len(records) - len(latencies)) / len(records) if records else 0,
+        'errors': errors,
+        'cache_hit_rate': cache_hits / len(records) if records else 0,
+        'latency': {f'p{p}': percentile(latencies, p) for p in PERCENTILES} | {
+            'mean': sum(latencies) / len(latencies) if latencies else None,
+            'max': latencies[-1] if latencies else None,
+        },
+    }
+
+
+def start_server(port, server_args):
+    """Start app.py on the given port and wait until its health check answers"""
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py'),
+               '--host', '127.0.0.1', '--port', str(port)] + shlex.split(server_args)
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}")
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/api/health')
+            if connection.getresponse().status == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("Server did not become healthy within 30 seconds")
+
+
+def stop_server(server):
+    server.terminate()
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the AI detection API")
+    parser.add_argument('--url', help="target an already running server instead of starting app.py")
+    parser.add_argument('--server-args', default='--production',
+                        help="arguments for the locally started app.py (default: --production)")
+    parser.add_argument('--port', type=int, default=5055, help="port for the locally started server")
+    parser.add_argument('--server-pid', type=int, help="process to sample when using --url")
+    parser.add_argument('--mode', choices=('open', 'closed'), default='closed')
+    parser.add_argument('--rate', type=float, default=10, help="open loop: mean requests per second")
+    parser.add_argument('--concurrency', type=int, default=4, help="closed loop: simultaneous users")
+    parser.add_argument('--max-outstanding', type=int, default=256,
+                        help="open loop: most requests in flight at once")
+    parser.add_argument('--duration', type=float, default=30, help="seconds")
+    parser.add_argument('--sizes', default='lognormal:2000:1.0',
+                        help="text sizes: fixed:N, uniform:A-B, lognormal:MEDIAN:SIGMA or choice:A,B,...")
+    parser.add_argument('--max-requests', type=int, default=100000)
+    parser.add_argument('--timeout', type=float, default=60, help="per-request timeout in seconds")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write the report as JSON")
+    args = parser.parse_args()
+
+    if args.mode == 'open':
+        count = min(args.max_requests, int(args.rate * args.duration * 1.5) + 100)
+    else:
+        count = args.max_requests
+    texts = RequestTexts(count, parse_size_distribution(args.sizes), args.seed)
+
+    server = None
+    if args.url:
+        url, server_pid = args.url, args.server_pid
+    else:
+        server = start_server(args.port, args.server_args)
+        url, server_pid = f'http://127.0.0.1:{args.port}', server.pid
+
+    sampler = ProcessSampler(server_pid) if server_pid else None
+    client = Client(url, args.timeout)
+    try:
+        if sampler:
+            sampler.start()
+        start = time.monotonic()
+        if args.mode == 'open':
+            records = run_open_loop(client, texts, args.rate, args.duration, args.seed, args.max_outstanding)
+        else:
+            records = run_closed_loop(client, texts, args.concurrency, args.duration)
+        elapsed = time.monotonic() - start
+    finally:
+        if sampler:
+            sampler.stop()
+        if server:
+            stop_server(server)
+
+    report = {
+        'config': vars(args),
+        'summary': summarize(records, elapsed),
+        'server': sampler.samples if sampler else [],
+    }
+    summary = report['summary']
+    print(f"{summary['requests']} requests in {elapsed:.1f}s: {summary['throughput_rps']:.1f} req/s, "
+          f"error rate {summary['error_rate']:.2%} {summary['errors'] or ''}")
+    print("latency " + ' '.join(
+        f"{name}={value * 1000:.1f}ms" for name, value in summary['latency'].items() if value is not None
+    ))
+    if report['server']:
+        print(f"server CPU peak {max(s['cpu_percent'] for s in report['server']):.0f}%, "
+              f"RSS peak {max(s['rss_mb'] for s in report['server']):.1f} MB")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
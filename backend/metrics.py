@@ -0,0 +1,86 @@
+# backend/metrics.py
+"""Prometheus metrics for the detection API, served at /api/metrics."""
+import time
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+
+registry = CollectorRegistry()
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+STAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 10)
+SIZE_BUCKETS = tuple(10 ** exponent for exponent in range(1, 10))
+
+# Error responses by status; scoring errors returned inside a 200 are counted as 'scoring'
+ERROR_TYPES = {
+    400: 'bad_request',
+    404: 'not_found',
+    405: 'method_not_allowed',
+    413: 'too_large',
+    415: 'unsupported_media_type',
+    429: 'pool_full',
+    504: 'timeout',
+}
+
+requests_total = Counter(
+    'detector_requests_total', "HTTP requests handled", ['route', 'status'], registry=registry
+)
+request_duration = Histogram(
+    'detector_request_duration_seconds', "Time from request start until the response body was sent",
+    ['route'], buckets=LATENCY_BUCKETS, registry=registry
+)
+input_size = Histogram(
+    'detector_input_size_chars', "Characters of text submitted for scoring",
+    ['route'], buckets=SIZE_BUCKETS, registry=registry
+)
+in_flight = Gauge(
+    'detector_requests_in_flight', "Requests currently being handled", registry=registry
+)
+errors_total = Counter(
+    'detector_errors_total', "Failed requests by error type", ['route', 'type'], registry=registry
+)
+stage_duration = Histogram(
+    'detector_stage_duration_seconds', "Time spent in each stage of detect_ai_content",
+    ['stage'], buckets=STAGE_BUCKETS, registry=registry
+)
+
+
+# labels() hashes and locks on every call, so children are looked up once
+_children = {}
+
+
+def _child(metric, *labels):
+    child = _children.get((metric, labels))
+    if child is None:
+        child = _children[(metric, labels)] = metric.labels(*labels)
+    return child
+
+
+def request_started():
+    in_flight.inc()
+    return time.perf_counter()
+
+
+def request_finished(route, status, started):
+    _child(request_duration, route).observe(time.perf_counter() - started)
+    _child(requests_total, route, status).inc()
+    if status >= 400:
+        count_error(route, ERROR_TYPES.get(status, 'internal' if status >= 500 else 'client'))
+    in_flight.dec()
+
+
+def count_error(route, error_type):
+    _child(errors_total, route, error_type).inc()
+
+
+def observe_input_size(route, size):
+    _child(input_size, route).observe(size)
+
+
+def observe_stages(timings):
+    for stage, seconds in timings.items():
+        _child(stage_duration, stage).observe(seconds)
+
+
+def render():
+    """Body and content type of the metrics page"""
+    return generate_latest(registry), CONTENT_TYPE_LATEST
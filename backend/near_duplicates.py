@@ -0,0 +1,237 @@
+# backend/near_duplicates.py
+"""MinHash signatures and an LSH index of previously scored texts.
+
+The exact-hash result cache misses a resubmitted draft with one word
+changed. Here each text gets a MinHash signature over shingles of its word
+stream (the same words extract_features tokenizes), and an LSH index over
+those signatures finds earlier texts with a similar estimated Jaccard
+similarity without comparing against every entry.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from text_features import WORD_RE
+
+NUM_PERM = 128     # signature slots
+SHINGLE_SIZE = 5   # words per shingle
+BANDS = 32         # LSH bands of NUM_PERM // BANDS rows; pairs above ~0.45 similarity become candidates
+EMPTY = np.uint64(2 ** 64 - 1)
+
+
+def _mix(values):
+    """splitmix64 finaliser, spreading the bits of each 64-bit value over the whole word"""
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+# Translation of ASCII bytes: word characters lower-cased, everything else a space,
+# so splitting the result gives the same words as WORD_RE on the lower-cased text
+_ASCII_WORDS = bytes(ord(chr(c).lower()) if chr(c).isalnum() or chr(c) == '_' else ord(' ')
+                     for c in range(256))
+
+
+def words(text):
+    """The lower-cased words of the text, as UTF-8 bytes"""
+    if text.isascii():
+        # Several times faster than the regex
+        return text.encode('ascii').translate(_ASCII_WORDS).split()
+    return [word.encode('utf-8', 'surrogatepass') for word in WORD_RE.findall(text.lower())]
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Hashes of every run of size consecutive words"""
+    tokens = words(text)
+    if len(tokens) < size:
+        return np.empty(0, dtype=np.uint64)
+    # zlib.crc32 rather than hash(), which differs between processes
+    word_hashes = np.fromiter(map(zlib.crc32, tokens), dtype=np.uint64, count=len(tokens))
+    count = len(tokens) - size + 1
+    combined = np.zeros(count, dtype=np.uint64)
+    for offset in range(size):
+        # Wraps around modulo 2**64, which is what we want
+        combined = combined * np.uint64(0x100000001B3) + word_hashes[offset:offset + count]
+    return _mix(combined)
+
+
+def signature(text):
+    """MinHash signature of the text, or None when it has too few words to shingle.
+
+    One-permutation MinHash: each shingle is hashed once, the hash picks one
+    of NUM_PERM slots and each slot keeps its smallest hash. That is one hash
+    per shingle instead of NUM_PERM, with about the same accuracy. Slots no
+    shingle fell into (short texts) borrow the next filled slot's value.
+    """
+    values = shingles(text)
+    if not len(values):
+        return None
+    slots = np.full(NUM_PERM, EMPTY, dtype=np.uint64)
+    np.minimum.at(slots, (values % np.uint64(NUM_PERM)).astype(np.intp), values // np.uint64(NUM_PERM))
+    # Nearest filled slot at or after each slot, wrapping around; the distance is
+    # mixed in so borrowed values differ from the slot they came from
+    filled = np.flatnonzero(slots != EMPTY)
+    following = filled[np.searchsorted(filled, np.arange(NUM_PERM)) % len(filled)]
+    distance = (following - np.arange(NUM_PERM)) % NUM_PERM
+    slots = _mix(slots[following] + distance.astype(np.uint64))
+    # The top 32 bits are plenty to tell slots apart
+    return (slots >> np.uint64(32)).astype(np.uint32)
+
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of the shingle sets behind two signatures"""
+    return np.count_nonzero(first == second) / NUM_PERM
+
+
+class NearDuplicateIndex:
+    """Signatures and results of scored texts, keyed by result-cache key.
+
+    Holds at most max_entries texts, dropping the least recently used.
+    With a path it is loaded at startup and written back by a background
+    thread every save_every additions or save_interval seconds, and on
+    close(); a file from another scoring version is ignored.
+    """
+
+    def __init__(self, version, threshold=0.9, max_entries=10000, path=None, save_every=100,
+                 save_interval=60):
+        self.version = version
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.path = path
+        self.save_every = save_every
+        self.save_interval = save_interval
+        self.rows = NUM_PERM // BANDS
+        self.entries = OrderedDict()  # key -> (signature, result)
+        self.buckets = [{} for _ in range(BANDS)]  # band bytes -> keys with that band
+        self.unsaved = 0
+        self.lock = threading.Lock()
+        # Held across writing and replacing the file, so saves never overlap
+        self.save_lock = threading.Lock()
+        self.save_due = threading.Event()
+        self.closed = False
+        self.saver = None
+        if path:
+            if os.path.exists(path):
+                self._load()
+            self.saver = threading.Thread(target=self._save_periodically, name='near-duplicates-saver',
+                                          daemon=True)
+            self.saver.start()
+
+    @classmethod
+    def from_env(cls, version):
+        """Index configured from NEAR_DUP_THRESHOLD, NEAR_DUP_MAX_ENTRIES and NEAR_DUP_PATH"""
+        return cls(
+            version,
+            threshold=float(os.environ.get('NEAR_DUP_THRESHOLD', 0.9)),
+            max_entries=int(os.environ.get('NEAR_DUP_MAX_ENTRIES', 10000)),
+            path=os.environ.get('NEAR_DUP_PATH') or None,
+            save_interval=float(os.environ.get('NEAR_DUP_SAVE_INTERVAL', 60))
+        )
+
+    def _bands(self, signature):
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(BANDS)]
+
+    def nearest(self, signature):
+        """(key, similarity, result) of the most similar indexed text, or (None, 0.0, None)"""
+        best = (None, 0.0, None)
+        with self.lock:
+            candidates = set()
+            for bucket, band in zip(self.buckets, self._bands(signature)):
+                candidates.update(bucket.get(band, ()))
+            for key in candidates:
+                other, result = self.entries[key]
+                score = similarity(signature, other)
+                if score > best[1]:
+                    best = (key, score, result)
+            if best[0] is not None:
+                self.entries.move_to_end(best[0])
+        return best
+
+    def reusable(self, nearest):
+        """Whether a nearest() match is similar enough to return its result instead of scoring"""
+        return nearest[0] is not None and nearest[1] >= self.threshold
+
+    def add(self, key, signature, result):
+        with self.lock:
+            self._insert(key, signature, result)
+            self.unsaved += 1
+            due = self.path is not None and self.unsaved >= self.save_every
+        if due:
+            # Written by the saver thread, not on the request that happened to be the 100th
+            self.save_due.set()
+
+    def _insert(self, key, signature, result):
+        # Called with the lock held
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = (signature, result)
+        for bucket, band in zip(self.buckets, self._bands(signature)):
+            bucket.setdefault(band, set()).add(key)
+        while len(self.entries) > self.max_entries:
+            self._remove(next(iter(self.entries)))
+
+    def _remove(self, key):
+        signature, _ = self.entries.pop(key)
+        for bucket, band in zip(self.buckets, self._bands(signature)):
+            keys = bucket[band]
+            keys.discard(key)
+            if not keys:
+                del bucket[band]
+
+    def _save_periodically(self):
+        while not self.closed:
+            self.save_due.wait(self.save_interval)
+            self.save_due.clear()
+            if self.unsaved and not self.closed:
+                try:
+                    self.save()
+                except Exception:
+                    logging.getLogger(__name__).exception("Could not save the near-duplicate index")
+
+    def close(self):
+        """Stop the saver thread and write any unsaved entries"""
+        self.closed = True
+        self.save_due.set()
+        if self.saver is not None:
+            self.saver.join()
+        if self.unsaved:
+            self.save()
+
+    def save(self):
+        """Write the index to its path, replacing the previous file atomically"""
+        if self.path is None:
+            return
+        with self.save_lock:
+            with self.lock:
+                keys = list(self.entries)
+                signatures = [signature for signature, _ in self.entries.values()]
+                results = [result for _, result in self.entries.values()]
+                self.unsaved = 0
+            descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)),
+                                                     prefix=os.path.basename(self.path), suffix='.tmp')
+            try:
+                with os.fdopen(descriptor, 'wb') as output:
+                    np.savez(
+                        output, version=np.array(self.version), keys=np.array(keys, dtype=str),
+                        signatures=np.array(signatures, dtype=np.uint32).reshape(len(keys), NUM_PERM),
+                        # One JSON document: a fixed-width string array would pad every result to the longest
+                        results=np.frombuffer(json.dumps(results).encode('utf-8'), dtype=np.uint8)
+                    )
+                os.replace(temporary, self.path)
+            except BaseException:
+                os.unlink(temporary)
+                raise
+
+    def _load(self):
+        with np.load(self.path, allow_pickle=False) as saved:
+            if str(saved['version']) != self.version:
+                return
+            results = json.loads(saved['results'].tobytes().decode('utf-8'))
+            for key, signature, result in zip(saved['keys'], saved['signatures'], results):
+                self._insert(str(key), signature, result)
@@ -0,0 +1,217 @@
+# backend/phrase_matcher.py
+"""Multi-phrase matching with an Aho-Corasick automaton over word token IDs.
+
+Phrases and text are tokenized the same way as the detector does (lower-cased
+\\w+ runs), so a phrase only matches whole words, whatever punctuation or
+whitespace sits between them, and never across a sentence boundary.
+
+Build an index ahead of time so the backend does not compile it on startup:
+
+    python phrase_matcher.py lexicons/ai_markers.txt
+"""
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+from collections import Counter, deque
+from functools import lru_cache
+
+from text_features import SENTENCE_RE, WORD_RE, original_offsets
+
+INDEX_FORMAT = 1
+LEXICON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lexicons')
+DEFAULT_LEXICON = os.path.join(LEXICON_DIR, 'ai_markers.txt')
+
+
+def read_lexicon(path):
+    """Phrases of a lexicon file: one per line, '#' starts a comment"""
+    with open(path, encoding='utf-8') as file:
+        lines = (line.split('#', 1)[0].strip() for line in file)
+        return [line for line in lines if line]
+
+
+def index_path(lexicon_path):
+    return os.path.splitext(lexicon_path)[0] + '.index.json'
+
+
+def lexicon_digest(phrases):
+    return hashlib.sha256('\n'.join(phrases).encode('utf-8')).hexdigest()
+
+
+class PhraseMatcher:
+    """Finds every occurrence of a set of phrases in one pass over the tokens"""
+
+    def __init__(self, phrases, vocabulary, goto, fail, output, output_link):
+        self.phrases = phrases          # phrase text by pattern number
+        self.vocabulary = vocabulary    # token -> token ID
+        self.goto = goto                # per state: token ID -> next state
+        self.fail = fail                # longest proper suffix state
+        self.output = output            # pattern ending at the state, or -1
+        self.output_link = output_link  # nearest suffix state with an output, or 0
+        self.lengths = [len(WORD_RE.findall(phrase.lower())) for phrase in phrases]
+
+    @classmethod
+    def compile(cls, phrases):
+        vocabulary = {}
+        goto, output = [{}], [-1]
+        kept = []
+        for phrase in phrases:
+            tokens = WORD_RE.findall(phrase.lower())
+            if not tokens:
+                continue
+            state = 0
+            for token in tokens:
+                token_id = vocabulary.setdefault(token, len(vocabulary))
+                next_state = goto[state].get(token_id)
+                if next_state is None:
+                    next_state = goto[state][token_id] = len(goto)
+                    goto.append({})
+                    output.append(-1)
+                state = next_state
+            # A phrase listed twice keeps its first spelling
+            if output[state] == -1:
+                output[state] = len(kept)
+                kept.append(phrase)
+
+        # Breadth-first, so every state's fail target is finished before it is needed;
+        # the root's children fail to the root
+        fail = [0] * len(goto)
+        output_link = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token_id, child in goto[state].items():
+                target = fail[state]
+                while target and token_id not in goto[target]:
+                    target = fail[target]
+                fail[child] = goto[target].get(token_id, 0)
+                output_link[child] = fail[child] if output[fail[child]] != -1 else output_link[fail[child]]
+                queue.append(child)
+        return cls(kept, vocabulary, goto, fail, output, output_link)
+
+    def save(self, path, digest=None):
+        index = {
+            'format': INDEX_FORMAT,
+            'digest': digest,
+            'phrases': self.phrases,
+            'vocabulary': self.vocabulary,
+            # JSON object keys are strings, so transitions are stored as pairs
+            'goto': [[item for pair in edges.items() for item in pair] for edges in self.goto],
+            'fail': self.fail,
+            'output': self.output,
+            'output_link': self.output_link,
+        }
+        # A temporary file of its own: every pool worker finding a stale index saves one
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                                 prefix=os.path.basename(path), suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as file:
+                json.dump(index, file, separators=(',', ':'))
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    @classmethod
+    def load(cls, path, digest=None):
+        """Load a saved index; None when it is missing, unreadable or built from another lexicon"""
+        try:
+            with open(path, encoding='utf-8') as file:
+                index = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if index.get('format') != INDEX_FORMAT or (digest and index.get('digest') != digest):
+            return None
+        goto = [dict(zip(edges[::2], edges[1::2])) for edges in index['goto']]
+        return cls(index['phrases'], index['vocabulary'], goto, index['fail'],
+                   index['output'], index['output_link'])
+
+    def scan(self, tokens):
+        """Yield (pattern, end) for every phrase ending after tokens[end - 1]"""
+        vocabulary, goto, fail = self.vocabulary, self.goto, self.fail
+        output, output_link = self.output, self.output_link
+        state = 0
+        for position, token in enumerate(tokens, 1):
+            token_id = vocabulary.get(token)
+            if token_id is None:
+                # No phrase contains this word, so every partial match ends here
+                state = 0
+                continue
+            while state and token_id not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token_id, 0)
+            match = state if output[state] != -1 else output_link[state]
+            while match:
+                yield output[match], position
+                match = output_link[match]
+
+    def count(self, text):
+        """Occurrences of each phrase in the text"""
+        counts = Counter()
+        for segment in SENTENCE_RE.findall(text.lower()):
+            for pattern, _ in self.scan(WORD_RE.findall(segment)):
+                counts[self.phrases[pattern]] += 1
+        return counts
+
+    def find(self, text):
+        """Every match as (phrase, start, end) character offsets into the text"""
+        lowered = text.lower()
+        offsets = original_offsets(text) if len(lowered) != len(text) else None
+        matches = []
+        for sentence in SENTENCE_RE.finditer(lowered):
+            spans = [(word.start(), word.end()) for word in WORD_RE.finditer(lowered, *sentence.span())]
+            for pattern, end in self.scan([lowered[start:stop] for start, stop in spans]):
+                start, stop = spans[end - self.lengths[pattern]][0], spans[end - 1][1]
+                if offsets:
+                    start, stop = offsets[start], offsets[stop]
+                matches.append((self.phrases[pattern], start, stop))
+        return matches
+
+
+def load_matcher(lexicon_path=DEFAULT_LEXICON):
+    """Matcher for a lexicon file, from its precompiled index when that is up to date"""
+    phrases = read_lexicon(lexicon_path)
+    digest = lexicon_digest(phrases)
+    path = index_path(lexicon_path)
+    matcher = PhraseMatcher.load(path, digest)
+    if matcher is None:
+        matcher = PhraseMatcher.compile(phrases)
+        try:
+            matcher.save(path, digest)
+        except OSError:
+            pass  # A read-only install just compiles on every start
+    return matcher
+
+
+@lru_cache(maxsize=None)
+def cached_matcher(lexicon_path):
+    """One matcher per lexicon and process, so pool workers load the index once"""
+    return load_matcher(lexicon_path)
+
+
+def find_markers(text, lexicon_path=DEFAULT_LEXICON, limit=1000):
+    """Marker phrases in a text: total count, count per phrase and the first `limit` matches"""
+    matches = cached_matcher(lexicon_path).find(text)
+    return {
+        'count': len(matches),
+        'phrases': dict(Counter(phrase for phrase, _, _ in matches).most_common()),
+        'matches': [{'phrase': phrase, 'start': start, 'end': end} for phrase, start, end in matches[:limit]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompile a phrase lexicon into an index file")
+    parser.add_argument('lexicon', nargs='?', default=DEFAULT_LEXICON)
+    parser.add_argument('--output', help="index file (default: next to the lexicon)")
+    args = parser.parse_args()
+
+    phrases = read_lexicon(args.lexicon)
+    matcher = PhraseMatcher.compile(phrases)
+    output = args.output or index_path(args.lexicon)
+    matcher.save(output, lexicon_digest(phrases))
+    print(f"{len(matcher.phrases)} phrases, {len(matcher.goto)} states written to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+# backend/profiling.py
+"""Per-request profiling of detect_ai_content, for finding out why one document is slow."""
+import cProfile
+import os
+import time
+import uuid
+
+from ai_detector import detect_ai_content
+
+
+def dump_path(directory):
+    """Unique file name for a profile dump, sortable by time"""
+    return os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.prof")
+
+
+def profile_detection(text, directory=None):
+    """Run detect_ai_content with stage timings, and under cProfile when a dump directory is given.
+
+    Returns (result, profile, statistics) where profile holds the stage
+    breakdown, the total time and the path of the dump, if any, and
+    statistics are the numbers the score was built from (see
+    detect_ai_content). Read dumps with `python -m pstats <file>` or any
+    pstats viewer.
+    """
+    timings, statistics = {}, {}
+    profiler = cProfile.Profile() if directory else None
+    start = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    try:
+        result = detect_ai_content(text, timings, statistics=statistics)
+    finally:
+        if profiler:
+            profiler.disable()
+    profile = {'total': time.perf_counter() - start, 'stages': timings}
+
+    if profiler:
+        os.makedirs(directory, exist_ok=True)
+        path = dump_path(directory)
+        profiler.dump_stats(path)
+        profile['dump'] = path
+    return result, profile, statistics
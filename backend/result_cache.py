@@ -0,0 +1,108 @@
+# backend/result_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def cache_key(text, version):
+    """Content address of a text for a given scoring-algorithm version"""
+    # Texts are hashed exactly as received: even whitespace changes such as
+    # CRLF vs LF or a trailing space can change the score
+    digest = hashlib.sha256()
+    digest.update(version.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(text.encode('utf-8', 'surrogatepass'))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """LRU cache of detection results bounded by a byte budget, with a TTL and
+    an optional SQLite tier that survives restarts"""
+
+    def __init__(self, version, max_bytes=64 * 1024 * 1024, ttl=3600, db_path=None):
+        self.version = version
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (expires_at, payload)
+        self.size = 0
+        self.lock = threading.Lock()
+        self.db = None
+        if db_path:
+            self.db = sqlite3.connect(db_path, check_same_thread=False)
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS results ('
+                'key TEXT PRIMARY KEY, version TEXT, payload TEXT, expires_at REAL)'
+            )
+            # Entries scored by other versions of the algorithm can never hit again
+            self.db.execute('DELETE FROM results WHERE version != ? OR expires_at < ?',
+                            (version, time.time()))
+            self.db.commit()
+
+    @classmethod
+    def from_env(cls, version):
+        """Cache configured from RESULT_CACHE_MAX_BYTES, RESULT_CACHE_TTL and RESULT_CACHE_DB"""
+        return cls(
+            version,
+            max_bytes=int(os.environ.get('RESULT_CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+            ttl=float(os.environ.get('RESULT_CACHE_TTL', 3600)),
+            db_path=os.environ.get('RESULT_CACHE_DB') or None
+        )
+
+    def key(self, text):
+        return cache_key(text, self.version)
+
+    def get(self, key):
+        """Return (result, tier) for a cached key, or (None, None) on a miss"""
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires_at, payload = entry
+                if expires_at > now:
+                    self.entries.move_to_end(key)
+                    return json.loads(payload), 'memory'
+                self._evict(key)
+
+            if self.db is None:
+                return None, None
+            row = self.db.execute('SELECT payload, expires_at FROM results WHERE key = ?',
+                                  (key,)).fetchone()
+            if row is None:
+                return None, None
+            payload, expires_at = row
+            if expires_at <= now:
+                self.db.execute('DELETE FROM results WHERE key = ?', (key,))
+                self.db.commit()
+                return None, None
+            self._store(key, payload, expires_at)
+            return json.loads(payload), 'disk'
+
+    def put(self, key, result):
+        payload = json.dumps(result)
+        expires_at = time.time() + self.ttl
+        with self.lock:
+            self._store(key, payload, expires_at)
+            if self.db is not None:
+                self.db.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)',
+                                (key, self.version, payload, expires_at))
+                self.db.commit()
+
+    def _store(self, key, payload, expires_at):
+        size = len(key) + len(payload)
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self._evict(key)
+        self.entries[key] = (expires_at, payload)
+        self.size += size
+        # Drop least recently used entries until we are back under budget
+        while self.size > self.max_bytes:
+            self._evict(next(iter(self.entries)))
+
+    def _evict(self, key):
+        _, payload = self.entries.pop(key)
+        self.size -= len(key) + len(payload)
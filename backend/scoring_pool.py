@@ -0,0 +1,57 @@
+# backend/scoring_pool.py
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+
+class PoolFull(Exception):
+    """Raised when every worker is busy and the queue is at its limit"""
+
+
+class JobTimeout(Exception):
+    """Raised when a scoring job does not finish within the configured timeout"""
+
+
+class ScoringPool:
+    """Bounded process pool for CPU-bound scoring.
+
+    At most workers + queue_depth jobs are admitted at once; anything beyond
+    that is rejected immediately instead of piling up behind the GIL.
+    """
+
+    def __init__(self, workers=None, queue_depth=None, timeout=30):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_depth = self.workers * 2 if queue_depth is None else queue_depth
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(self.workers + self.queue_depth)
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.closed = False
+
+    def submit(self, func, *args, block=False):
+        """Queue a job, raising PoolFull if there is no room and block is False"""
+        if self.closed:
+            raise PoolFull("Server is shutting down")
+        if not self.slots.acquire(blocking=block):
+            raise PoolFull("Too many requests in progress")
+        try:
+            future = self.executor.submit(func, *args)
+        except Exception:
+            self.slots.release()
+            raise
+        # A job that timed out keeps its slot until the worker is really free
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def run(self, func, *args, block=False):
+        """Run a job in the pool and wait for its result"""
+        future = self.submit(func, *args, block=block)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise JobTimeout(f"Scoring did not finish within {self.timeout} seconds")
+
+    def shutdown(self):
+        """Stop accepting jobs, drop queued ones and wait for running ones"""
+        self.closed = True
+        self.executor.shutdown(wait=True, cancel_futures=True)
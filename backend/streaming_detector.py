@@ -0,0 +1,240 @@
+# backend/streaming_detector.py
+import math
+import re
+import tempfile
+from collections import Counter
+from fractions import Fraction
+from itertools import islice
+
+from ai_detector import build_result, empty_result
+from text_features import WORD_RE, TRANSITION_SET, count_transitions
+
+try:
+    # The same correctly rounded square root statistics.stdev uses (Python 3.11+)
+    from statistics import _float_sqrt_of_frac
+except ImportError:
+    def _float_sqrt_of_frac(numerator, denominator):
+        return math.sqrt(numerator / denominator)
+
+PIECE_RE = re.compile(r'[^.!?]+|[.!?]+')
+DELIMITERS = '.!?'
+# Characters we can always cut an over-long sentence at
+CUT_CHARACTERS = ' \n\t\r'
+# Unprocessed characters held back so lower-casing sees the same neighbours
+# that text.lower() would (the Greek final sigma depends on them)
+CONTEXT = 64
+# Longest stretch of text buffered before a sentence is split at whitespace
+MAX_PENDING = 1024 * 1024
+
+
+class StreamingDetector:
+    """Incremental version of detect_ai_content for text that arrives in chunks.
+
+    Only running statistics are kept in memory: sentence-length sums, the word
+    frequency table and the first few highlight candidates per sentence length.
+    The word stream itself is spooled to a temporary file because the burstiness
+    chunks are thirds of the final word count, which is unknown until finalize().
+    """
+
+    def __init__(self, max_pending=MAX_PENDING):
+        self.max_pending = max_pending
+        self.pending = ''
+        self.previous = ''  # last CONTEXT characters already processed
+        self.length = 0
+        self.has_text = False
+
+        self.sentence_count = 0
+        self.length_sum = 0
+        self.length_sq_sum = 0
+        self.word_count = 0
+        self.word_counts = Counter()
+        self.transition_count = 0
+        self.candidates = {}  # sentence length -> first 3 (index, text) highlight candidates
+        self.words = tempfile.TemporaryFile('w+', encoding='utf-8', newline='\n')
+        self._reset_sentence()
+
+    def _reset_sentence(self):
+        self.open_tokens = 0
+        self.open_transition = False
+        self.open_last_end = {}
+        self.open_offset = 0
+        self.open_text = []
+        self.open_text_size = 0
+        self.open_spool = None
+
+    def feed(self, chunk):
+        """Add the next piece of text"""
+        if not chunk:
+            return
+        self.length += len(chunk)
+        if not self.has_text and not chunk.isspace():
+            self.has_text = True
+        self.pending += chunk
+        while self._process(final=False):
+            pass
+
+    def finalize(self):
+        """Finish the analysis and return the same dict detect_ai_content would"""
+        try:
+            while self._process(final=True):
+                pass
+            if self.pending:
+                self._add_to_sentence(self.pending, 0, len(self.pending))
+                self.pending = ''
+            self._close_sentence()
+
+            if self.length < 50:
+                return empty_result()
+
+            # Lengths are ints, so exact running sums stand in for Welford's update:
+            # no cancellation, and the same variance statistics.stdev computes
+            if self.sentence_count > 1:
+                sentence_variance = _float_sqrt_of_frac(
+                    self.sentence_count * self.length_sq_sum - self.length_sum ** 2,
+                    self.sentence_count * (self.sentence_count - 1)
+                )
+            else:
+                sentence_variance = 0
+
+            unique_words = sum(1 for word in self.word_counts if len(word) > 3)
+            chunk_diversity = self._chunk_diversities() if self.sentence_count > 5 else None
+
+            return build_result(
+                self.sentence_count, sentence_variance, self.word_count, unique_words,
+                self.transition_count, chunk_diversity, self._highlighted_sections()
+            )
+        except Exception as e:
+            return {"error": f"Error during AI detection: {str(e)}"}
+        finally:
+            self.close()
+
+    def close(self):
+        self.words.close()
+        for kept in self.candidates.values():
+            for _, text in kept:
+                if not isinstance(text, str):
+                    text.close()
+        self.candidates = {}
+
+    def _process(self, final):
+        """Consume complete sentences from the pending buffer; True if anything was consumed"""
+        buf = self.pending
+        limit = len(buf) if final else len(buf) - CONTEXT
+        if limit <= 0:
+            return False
+
+        cut = max(buf.rfind(delimiter, 0, limit) for delimiter in DELIMITERS) + 1
+        if cut > 0:
+            for match in PIECE_RE.finditer(buf, 0, cut):
+                if match.group()[0] in DELIMITERS:
+                    self._close_sentence()
+                else:
+                    self._add_to_sentence(buf, match.start(), match.end())
+            consumed = cut
+        elif not final and len(buf) > self.max_pending:
+            # One very long sentence: split it at whitespace, keeping that
+            # whitespace character at the head of the buffer for context
+            cut = max(buf.rfind(character, 0, limit) for character in CUT_CHARACTERS)
+            if cut <= 0:
+                return False
+            self._add_to_sentence(buf, 0, cut + 1, overlap=1)
+            consumed = cut
+        else:
+            return False
+
+        self.previous = (self.previous + buf[:consumed])[-CONTEXT:]
+        self.pending = buf[consumed:]
+        return True
+
+    def _lower(self, buf, start, end):
+        piece = buf[start:end]
+        if 'Σ' not in piece:
+            return piece.lower()
+        # Capital sigma lower-cases differently at the end of a word
+        before = (self.previous + buf[max(0, start - CONTEXT):start])[-CONTEXT:]
+        after = buf[end:end + CONTEXT]
+        lowered = (before + piece + after).lower()
+        return lowered[len(before.lower()):len(lowered) - len(after.lower())]
+
+    def _add_to_sentence(self, buf, start, end, overlap=0):
+        lowered = self._lower(buf, start, end)
+        tokens = lowered.split()
+        if tokens:
+            self.open_tokens += len(tokens)
+            words = WORD_RE.findall(lowered)
+            if words:
+                self.word_count += len(words)
+                self.word_counts.update(words)
+                self.words.write('\n'.join(words))
+                self.words.write('\n')
+            if not TRANSITION_SET.isdisjoint(tokens):
+                self.open_transition = True
+                self.transition_count += count_transitions(lowered, self.open_last_end, self.open_offset)
+        self.open_offset += len(lowered) - overlap
+        self._keep_text(buf[start:end - overlap])
+
+    def _keep_text(self, text):
+        if self.open_spool is not None:
+            self.open_spool.write(text)
+            return
+        self.open_text.append(text)
+        self.open_text_size += len(text)
+        if self.open_text_size > self.max_pending:
+            self.open_spool = tempfile.TemporaryFile('w+', encoding='utf-8', newline='')
+            self.open_spool.write(''.join(self.open_text))
+            self.open_text = []
+
+    def _close_sentence(self):
+        length = self.open_tokens
+        if length:
+            index = self.sentence_count
+            self.sentence_count += 1
+            self.length_sum += length
+            self.length_sq_sum += length * length
+
+            # Only these sentences can ever be highlighted, and only the first
+            # three of a given length can make it into the top three
+            if length > 5 and self.open_transition:
+                kept = self.candidates.setdefault(length, [])
+                if len(kept) < 3:
+                    if self.open_spool is not None:
+                        kept.append((index, self.open_spool))
+                        self.open_spool = None
+                    else:
+                        kept.append((index, ''.join(self.open_text)))
+        if self.open_spool is not None:
+            self.open_spool.close()
+        self._reset_sentence()
+
+    def _chunk_diversities(self):
+        """Diversity of each third of the spooled word stream"""
+        diversities = []
+        self.words.seek(0)
+        step = self.word_count // 3
+        for start in range(0, self.word_count, step):
+            size = min(step, self.word_count - start)
+            chunk = {line[:-1] for line in islice(self.words, size)}
+            distinct = sum(1 for word in chunk if len(word) > 3)
+            diversities.append(distinct / size)
+        return diversities
+
+    def _highlighted_sections(self):
+        highlighted_sections = []
+        if self.sentence_count > 3:
+            average = Fraction(self.length_sum, self.sentence_count)
+            # statistics.mean returns an int when the mean is whole, otherwise a float
+            avg_length = int(average) if average.denominator == 1 else float(average)
+            chosen = sorted(
+                (index, text)
+                for length, kept in self.candidates.items()
+                if abs(length - avg_length) < 2
+                for index, text in kept
+            )[:3]
+            for _, text in chosen:
+                if not isinstance(text, str):
+                    text.seek(0)
+                    text = text.read()
+                sentence = text.strip()
+                if len(sentence) > 20:
+                    highlighted_sections.append(sentence)
+        return highlighted_sections
@@ -0,0 +1,256 @@
+# backend/test_equivalence.py
+"""Equivalence tests: every exact scorer must return what the original scorer did.
+
+baseline_detect_ai_content is a frozen copy of detect_ai_content as it was
+before the single-pass rewrite; it is not to be optimized or restyled. Run
+with `python -m pytest backend`.
+"""
+import math
+import random
+import re
+from statistics import mean, stdev
+
+import pytest
+
+from ai_detector import detect_ai_content, detect_ai_content_batch
+from streaming_detector import StreamingDetector
+from text_features import TRANSITION_WORDS
+
+def baseline_detect_ai_content(text):
+    """Detect AI-generated content using improved heuristic methods"""
+    try:
+        if not text or len(text) < 50:
+            return {
+                'ai_percentage': 0,
+                'highlighted_sections': [],
+                'details': {
+                    'sentence_variety': 0,
+                    'word_repetition': 0,
+                    'transition_usage': 0,
+                    'burstiness': 0
+                }
+            }
+
+        # Split into sentences
+        sentences = re.split(r'[.!?]+', text)
+        sentences = [s.strip() for s in sentences if s.strip()]
+        
+        # 1. Sentence structure variety
+        sentence_lengths = [len(s.split()) for s in sentences]
+        
+        # Calculate variance and normalize based on text length
+        try:
+            sentence_variance = stdev(sentence_lengths) if len(sentence_lengths) > 1 else 0
+            # AI text often has consistent sentence lengths
+            sentence_variety_score = min(100, max(0, 100 - (20 * (5 / (sentence_variance + 1)))))
+        except:
+            sentence_variety_score = 50
+        
+        # 2. Word repetition analysis
+        words = re.findall(r'\b\w+\b', text.lower())
+        word_count = len(words)
+        
+        if word_count > 0:
+            word_freq = {}
+            for word in words:
+                if len(word) > 3:  # Only consider meaningful words
+                    word_freq[word] = word_freq.get(word, 0) + 1
+            
+            # Calculate repetition score
+            if word_freq:
+                unique_ratio = len(word_freq) / word_count
+                repetition_score = min(100, max(0, 100 * (1 - unique_ratio) * 3))
+            else:
+                repetition_score = 0
+        else:
+            repetition_score = 0
+        
+        # 3. Transition words analysis
+        transition_words = [
+            'however', 'therefore', 'moreover', 'furthermore', 'consequently',
+            'additionally', 'nevertheless', 'thus', 'hence', 'accordingly',
+            'subsequently', 'meanwhile', 'conversely', 'similarly', 'likewise'
+        ]
+        
+        transition_count = sum(text.lower().count(" " + word + " ") for word in transition_words)
+        # Normalize by text length
+        transition_ratio = transition_count / (word_count / 100) if word_count > 0 else 0
+        transition_score = min(100, max(0, transition_ratio * 10))
+        
+        # 4. Burstiness (human writing tends to be more "bursty" with varied word usage)
+        if len(sentences) > 5:
+            # Calculate lexical diversity in different parts of the text
+            chunks = [words[i:i+len(words)//3] for i in range(0, len(words), len(words)//3)]
+            chunk_diversities = []
+            
+            for chunk in chunks:
+                if chunk:
+                    chunk_freq = {}
+                    for word in chunk:
+                        if len(word) > 3:
+                            chunk_freq[word] = chunk_freq.get(word, 0) + 1
+                    chunk_diversities.append(len(chunk_freq) / len(chunk))
+            
+            # Calculate variance in lexical diversity
+            burstiness = stdev(chunk_diversities) * 100 if len(chunk_diversities) > 1 else 50
+            burstiness_score = min(100, max(0, 100 - burstiness))
+        else:
+            burstiness_score = 50
+        
+        # Calculate final score with weighted components
+        weights = {
+            'sentence_variety': 0.25,
+            'word_repetition': 0.3,
+            'transition_usage': 0.2,
+            'burstiness': 0.25
+        }
+        
+        ai_percentage = int(
+            sentence_variety_score * weights['sentence_variety'] +
+            repetition_score * weights['word_repetition'] +
+            transition_score * weights['transition_usage'] +
+            burstiness_score * weights['burstiness']
+        )
+        
+        # Find sections that appear most AI-generated
+        highlighted_sections = []
+        if len(sentences) > 3:
+            sentence_scores = []
+            
+            for i, sentence in enumerate(sentences):
+                if len(sentence.split()) > 5:
+                    # Score each sentence based on length, common phrases, etc.
+                    words_in_sentence = sentence.lower().split()
+                    
+                    # Check for transition words
+                    has_transition = any(word in transition_words for word in words_in_sentence)
+                    
+                    # Check for sentence length compared to average
+                    avg_length = mean(sentence_lengths)
+                    length_diff = abs(len(words_in_sentence) - avg_length)
+                    
+                    # Score the sentence
+                    sentence_score = 0
+                    if has_transition:
+                        sentence_score += 30
+                    if length_diff < 2:  # Very close to average length
+                        sentence_score += 40
+                    
+                    sentence_scores.append((i, sentence, sentence_score))
+            
+            # Sort by score and take top 3
+            sentence_scores.sort(key=lambda x: x[2], reverse=True)
+            for _, sentence, score in sentence_scores[:3]:
+                if score > 50 and len(sentence) > 20:
+                    highlighted_sections.append(sentence)
+        
+        return {
+            'ai_percentage': ai_percentage,
+            'highlighted_sections': highlighted_sections,
+            'details': {
+                'sentence_variety': int(sentence_variety_score),
+                'word_repetition': int(repetition_score),
+                'transition_usage': int(transition_score),
+                'burstiness': int(burstiness_score)
+            }
+        }
+    except Exception as e:
+        return {"error": f"Error during AI detection: {str(e)}"}
+
+
+PIECES = list(TRANSITION_WORDS) + ['the', 'a', 'cat', 'dog', 'running', 'Happily', 'x_y', '42', 'well-known',
+                                   "don't", 'however,', 'Thus', 'HENCE']
+UNICODE_PIECES = ['İstanbul', 'İ', 'ΟΔΟΣ', 'ΟΔΟΣ.', 'Σ', 'ß', 'STRASSE', 'naïve', 'ǅ', 'ﬁne', 'Ωμέγα']
+SEPARATORS = ['\r\n', '\r', ' ', ' ', ' ', '  ', '\t', '\n', '. ', '! ', '?', '...', ', ', '.', ' - ', '\x1c']
+
+
+def random_text(rng, pieces=PIECES, terminals=True):
+    out = []
+    for _ in range(rng.randint(0, 400)):
+        out.append(rng.choice(pieces))
+        out.append(rng.choice(SEPARATORS))
+    text = ''.join(out)
+    if not terminals:
+        text = re.sub(r'[.!?]', ' ', text)
+    return text
+
+
+def corpus(seed, count, **options):
+    rng = random.Random(seed)
+    return [random_text(rng, **options) for _ in range(count)]
+
+
+CORPORA = {
+    'ascii': corpus(1, 400),
+    'unicode': corpus(2, 400, pieces=PIECES + UNICODE_PIECES),
+    'no-terminals': corpus(3, 100, pieces=PIECES + UNICODE_PIECES, terminals=False),
+}
+EDGE_CASES = [
+    '',
+    'Too short to analyze.',
+    'İ' * 60,
+    'İstanbul is big. ' * 10,
+    'ΟΔΟΣ ΚΑΙ ΣΟΦΟΣ. ' * 8 + 'ΤΕΛΟΣ',
+    'Die Straße ist groß. ' * 8,
+    'however ' * 40,
+    'Therefore the words go on and on without ever stopping ' * 5,
+    ' however  however , thus thus hence. ' * 6,
+    '.' * 80,
+    'A b c d e f. ' * 6 + 'g',
+]
+
+
+def streamed(text, rng):
+    detector = StreamingDetector(max_pending=rng.choice([10, 100, 5000, 1 << 20]))
+    try:
+        position = 0
+        while position < len(text):
+            size = rng.randint(1, 300)
+            detector.feed(text[position:position + size])
+            position += size
+        return detector.finalize()
+    finally:
+        detector.close()
+
+
+@pytest.mark.parametrize('name', CORPORA)
+def test_detect_ai_content_matches_baseline(name):
+    for text in CORPORA[name]:
+        assert detect_ai_content(text) == baseline_detect_ai_content(text), text
+
+
+@pytest.mark.parametrize('text', EDGE_CASES)
+def test_edge_cases_match_baseline(text):
+    expected = baseline_detect_ai_content(text)
+    assert detect_ai_content(text) == expected
+    assert detect_ai_content_batch([text]) == [expected]
+    assert streamed(text, random.Random(0)) == expected
+
+
+@pytest.mark.parametrize('name', CORPORA)
+def test_batch_matches_baseline(name):
+    texts = CORPORA[name]
+    assert detect_ai_content_batch(texts) == [baseline_detect_ai_content(text) for text in texts]
+
+
+@pytest.mark.parametrize('name', CORPORA)
+def test_batch_statistics_match_single_text(name):
+    texts = CORPORA[name] + EDGE_CASES
+    statistics = []
+    detect_ai_content_batch(texts, statistics)
+    for text, batch in zip(texts, statistics):
+        single = {}
+        detect_ai_content(text, statistics=single)
+        assert batch.keys() == single.keys(), text
+        for column, value in single.items():
+            if isinstance(value, float) and math.isnan(value):
+                assert math.isnan(batch[column]), (column, text)
+            else:
+                assert batch[column] == pytest.approx(value, rel=1e-12, abs=1e-12), (column, text)
+
+
+@pytest.mark.parametrize('name', CORPORA)
+def test_streaming_matches_baseline(name):
+    rng = random.Random(4)
+    for text in CORPORA[name][:150]:
+        assert streamed(text, rng) == baseline_detect_ai_content(text), text
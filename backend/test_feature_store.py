@@ -0,0 +1,82 @@
+# backend/test_feature_store.py
+"""Re-weighting stored statistics against rescoring the texts. Run with `python -m pytest backend`."""
+import math
+
+import numpy as np
+import pytest
+
+import ai_detector
+from ai_detector import detect_ai_content, detect_ai_content_batch, WEIGHTS
+from feature_store import FeatureStore, COLUMNS, normalized_profiles, reweight_stores
+from result_cache import cache_key
+from test_equivalence import CORPORA
+
+TEXTS = CORPORA['ascii'] + CORPORA['unicode']
+PROFILE = {'sentence_variety': 0.1, 'word_repetition': 0.45, 'transition_usage': 0.05, 'burstiness': 0.4}
+
+
+def filled_store(directory, texts, batch=False):
+    """A store holding the statistics of the texts, written in many small segments plus a buffer"""
+    store = FeatureStore(str(directory), segment_rows=64)
+    if batch:
+        statistics = []
+        detect_ai_content_batch(texts, statistics)
+    else:
+        statistics = [{} for _ in texts]
+        for text, text_statistics in zip(texts, statistics):
+            detect_ai_content(text, statistics=text_statistics)
+    for text, text_statistics in zip(texts, statistics):
+        store.append(cache_key(text, 'test'), text_statistics)
+    return store
+
+
+@pytest.mark.parametrize('batch', [False, True], ids=['single', 'batch'])
+def test_default_weights_reproduce_stored_scores(tmp_path, batch):
+    store = filled_store(tmp_path, TEXTS, batch)
+    assert len(store.segments()) > 1 and store.buffer
+    names, scores, summaries = reweight_stores([store], {'current': WEIGHTS})
+    stored = store.columns(('ai_percentage',))['ai_percentage']
+    assert np.array_equal(scores[0], stored)
+    assert summaries['current']['changed'] == 0
+    assert summaries['current']['documents'] == len(store) == sum(summaries['current']['histogram'])
+
+
+def test_other_weights_match_rescoring(tmp_path, monkeypatch):
+    store = filled_store(tmp_path, TEXTS)
+    _, scores, _ = reweight_stores([store], [PROFILE])
+    for name, weight in PROFILE.items():
+        monkeypatch.setitem(ai_detector.WEIGHTS, name, weight)
+    rescored = [detect_ai_content(text)['ai_percentage'] for text in TEXTS if len(text) >= 50]
+    assert scores[0].tolist() == rescored
+
+
+def test_columns_round_trip(tmp_path):
+    texts = [text for text in TEXTS[:200] if len(text) >= 50]
+    store = filled_store(tmp_path, texts + ['too short'])
+    assert len(store) == len(texts)
+    columns = store.columns()
+    assert set(columns) == set(COLUMNS)
+    assert [key.tobytes().hex() for key in columns['key']] == [cache_key(text, 'test') for text in texts]
+    for row, text in enumerate(texts):
+        statistics = {}
+        detect_ai_content(text, statistics=statistics)
+        for name, value in statistics.items():
+            if isinstance(value, float) and math.isnan(value):
+                assert math.isnan(columns[name][row])
+            else:
+                assert columns[name][row] == pytest.approx(value), (name, text)
+
+    store.flush()
+    reopened = FeatureStore(store.directory)
+    assert len(reopened) == len(texts)
+    reopened.truncate(70)
+    assert len(reopened) == 70
+    assert np.array_equal(reopened.columns(('key',))['key'], columns['key'][:70])
+
+
+def test_profiles_are_validated():
+    assert list(normalized_profiles([PROFILE, WEIGHTS])) == ['profile-0', 'profile-1']
+    for profiles in ({}, [], 'weights', {'a': dict(PROFILE, burstiness='high')},
+                     {'a': {'sentence_variety': 1}}, {'a': dict(PROFILE, burstiness=math.inf)}):
+        with pytest.raises(ValueError):
+            normalized_profiles(profiles)
@@ -0,0 +1,75 @@
+# backend/test_heatmap.py
+"""score_windows against a window-by-window rescore with statistics.stdev. Run with `python -m pytest backend`."""
+import random
+from statistics import stdev
+
+import pytest
+
+from ai_detector import WEIGHTS
+from heatmap import score_windows, window_starts
+from text_features import extract_features, sentence_texts
+from test_equivalence import CORPORA, EDGE_CASES
+
+
+def rescored_window(features, first, last):
+    """Score of sentences [first, last), computed from scratch the way detect_ai_content scores a text"""
+    lengths = features.sentence_lengths[first:last]
+    deviation = stdev(lengths) if len(lengths) > 1 else 0
+    sentence_variety = min(100, max(0, 100 - (20 * (5 / (deviation + 1)))))
+    words = sum(features.sentence_word_counts[first:last])
+    transitions = sum(features.sentence_transition_counts[first:last])
+    transition_usage = min(100, max(0, (transitions / (words / 100) if words > 0 else 0) * 10))
+    return int((sentence_variety * WEIGHTS['sentence_variety'] + transition_usage * WEIGHTS['transition_usage'])
+               / (WEIGHTS['sentence_variety'] + WEIGHTS['transition_usage']))
+
+
+@pytest.mark.parametrize('sentence_count, window, stride', [
+    (0, 10, 5), (1, 10, 5), (10, 10, 5), (11, 10, 5), (23, 10, 5), (30, 10, 10), (7, 3, 1), (100, 7, 13),
+])
+def test_windows_cover_every_sentence(sentence_count, window, stride):
+    starts = window_starts(sentence_count, window, stride)
+    assert starts[0] == 0
+    assert list(starts) == sorted(set(starts))
+    assert min(starts[-1] + window, sentence_count) == sentence_count or sentence_count == 0
+    assert all(later - earlier <= stride for earlier, later in zip(starts, starts[1:]))
+
+
+@pytest.mark.parametrize('name', CORPORA)
+def test_scores_match_rescored_windows(name):
+    rng = random.Random(7)
+    for text in CORPORA[name] + EDGE_CASES:
+        window, stride = rng.randint(1, 12), rng.randint(1, 12)
+        result = score_windows(text, window, stride, top_k=3)
+        if not text or len(text) < 50:
+            assert result['scores'] == []
+            continue
+        features = extract_features(text)
+        count = len(features.sentence_lengths)
+        firsts = window_starts(count, window, stride) if count else []
+        expected = [rescored_window(features, first, min(first + window, count)) for first in firsts]
+        assert result['scores'] == expected, text
+
+        # Offsets point into the original text, from the first sentence's start to the last one's end
+        for first, start, end in zip(firsts, result['starts'], result['ends']):
+            last = min(first + window, count) - 1
+            sentences = sentence_texts(text, features, [first, last])
+            assert text[start:end].strip().startswith(sentences[first]), text
+            assert text[start:end].strip().endswith(sentences[last]), text
+
+
+def test_top_sections_do_not_overlap():
+    text = ' '.join(f"Sentence number {i} has {'many ' * (i % 7)}words. Furthermore it goes on."
+                    for i in range(60))
+    result = score_windows(text, window=4, stride=1, top_k=5)
+    sections = result['top_sections']
+    assert len(sections) == 5
+    assert [section['score'] for section in sections] == sorted((s['score'] for s in sections), reverse=True)
+    spans = sorted((section['start'], section['end']) for section in sections)
+    assert all(end <= next_start for (_, end), (next_start, _) in zip(spans, spans[1:]))
+    assert max(result['scores']) == sections[0]['score']
+
+
+def test_rejects_bad_parameters():
+    for window, stride, top_k in ((0, 1, 1), (1, 0, 1), (1, 1, -1)):
+        with pytest.raises(ValueError):
+            score_windows('Some text. ' * 10, window, stride, top_k)
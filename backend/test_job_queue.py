@@ -0,0 +1,98 @@
+# backend/test_job_queue.py
+"""Background jobs: results, progress and cancellation. Run with `python -m pytest backend`."""
+import time
+
+import pytest
+
+from ai_detector import detect_ai_content
+from job_queue import JobQueue, QUEUED, RUNNING, DONE, CANCELLED
+from scoring_pool import PoolFull
+
+TEXT = ("The committee met again on Tuesday. Furthermore, the budget was approved without changes! "
+        "Nobody expected that. However, the minutes were short. ") * 20
+# About 50 MB: scoring it takes several seconds, far longer than a cancelled job may keep its worker
+LARGE_TEXT = TEXT * 15000
+
+
+@pytest.fixture(scope='module')
+def queue():
+    queue = JobQueue(workers=1, max_active=4)
+    yield queue
+    queue.shutdown()
+
+
+def wait_until(queue, job, predicate, timeout=60):
+    """Follow a job's updates until predicate(snapshot) holds; returns every snapshot seen"""
+    seen = [job.snapshot()]
+    version = job.version
+    deadline = time.monotonic() + timeout
+    while not predicate(seen[-1]):
+        assert time.monotonic() < deadline, seen[-1]
+        state, version = queue.wait(job, version, 1)
+        if state is not None:
+            seen.append(state)
+    return seen
+
+
+def test_job_result_matches_detect_ai_content(queue):
+    recorded = []
+    job = queue.submit(TEXT, on_result=lambda result, statistics: recorded.append((result, statistics)))
+    seen = wait_until(queue, job, lambda state: state['status'] == DONE)
+    assert seen[-1]['result'] == detect_ai_content(TEXT)
+    assert seen[-1]['progress'] == 1.0
+    progress = [state['progress'] for state in seen]
+    assert progress == sorted(progress)
+
+    # on_result runs after the status is published, from the future's callback
+    deadline = time.monotonic() + 10
+    while not recorded and time.monotonic() < deadline:
+        time.sleep(0.01)
+    statistics = {}
+    detect_ai_content(TEXT, statistics=statistics)
+    assert recorded == [(seen[-1]['result'], statistics)]
+
+
+def test_known_result_finishes_at_once(queue):
+    job = queue.submit(TEXT, result={'ai_percentage': 12})
+    assert job.status == DONE and job.future is None
+    assert queue.get(job.id).snapshot()['result'] == {'ai_percentage': 12}
+
+
+def test_cancel_running_and_queued_jobs(queue):
+    running = queue.submit(LARGE_TEXT)
+    queued = queue.submit(TEXT)
+    wait_until(queue, running, lambda state: state['status'] == RUNNING and state['progress'] > 0)
+    assert queued.status == QUEUED
+
+    assert queue.cancel(queued.id).status == CANCELLED
+    started = time.monotonic()
+    assert queue.cancel(running.id).status == CANCELLED
+    # The worker gives up at its next progress report, so the next job starts right away
+    after = queue.submit(TEXT)
+    wait_until(queue, after, lambda state: state['status'] == DONE)
+    assert time.monotonic() - started < 3
+    assert running.status == queued.status == CANCELLED
+    assert queue.cancel('no-such-job') is None
+
+
+def test_active_jobs_are_bounded_and_finished_ones_expire(queue):
+    jobs = [queue.submit(LARGE_TEXT) for _ in range(queue.max_active)]
+    with pytest.raises(PoolFull):
+        queue.submit(TEXT)
+    for job in jobs:
+        queue.cancel(job.id)
+    finished = queue.submit(TEXT, result={'ai_percentage': 1})
+
+    ttl, queue.ttl = queue.ttl, 0
+    try:
+        time.sleep(0.01)
+        assert queue.get(finished.id) is None
+    finally:
+        queue.ttl = ttl
+
+
+def test_shut_down_queue_refuses_jobs():
+    queue = JobQueue(workers=1)
+    queue.shutdown()
+    with pytest.raises(PoolFull):
+        queue.submit(TEXT)
@@ -0,0 +1,92 @@
+# backend/test_live_document.py
+"""Spliced live documents against a full rescore of their text. Run with `python -m pytest backend`."""
+import random
+import re
+
+import pytest
+
+from ai_detector import detect_ai_content
+from live_document import LiveDocument, LiveSessions, UnknownSession, VersionConflict, update
+from test_equivalence import PIECES, UNICODE_PIECES, SEPARATORS
+
+# The client's paragraph rule (frontend/live_analysis.py): split after terminal punctuation before a line break
+PARAGRAPH_END_RE = re.compile(r'[.!?](?=\s*\n)')
+
+
+def split_paragraphs(text):
+    ends = [match.end() for match in PARAGRAPH_END_RE.finditer(text)]
+    return [text[start:end] for start, end in zip([0] + ends, ends + [len(text)]) if start < end]
+
+
+def random_paragraph(rng, pieces):
+    words = ''.join(rng.choice(pieces) + rng.choice(SEPARATORS) for _ in range(rng.randint(0, 60)))
+    return rng.choice(['\n', '\n\n', ' \n', '']) + words + rng.choice('.!?')
+
+
+def edit(rng, paragraphs, pieces):
+    """The paragraphs after one random edit: rewrite, insert or delete a run of them"""
+    paragraphs = list(paragraphs)
+    start = rng.randint(0, len(paragraphs))
+    delete = rng.randint(0, min(3, len(paragraphs) - start))
+    insert = [random_paragraph(rng, pieces) for _ in range(rng.randint(0 if delete else 1, 3))]
+    paragraphs[start:start + delete] = insert
+    return split_paragraphs(''.join(paragraphs))
+
+
+def diff(old, new):
+    prefix = 0
+    while prefix < min(len(old), len(new)) and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < min(len(old), len(new)) - prefix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    return prefix, len(old) - prefix - suffix, new[prefix:len(new) - suffix]
+
+
+@pytest.mark.parametrize('pieces', [PIECES, PIECES + UNICODE_PIECES], ids=['ascii', 'unicode'])
+def test_splices_match_full_rescore(pieces):
+    rng = random.Random(21)
+    for _ in range(20):
+        document = LiveDocument()
+        paragraphs = []
+        for _ in range(25):
+            new = edit(rng, paragraphs, pieces)
+            start, delete, insert = diff(paragraphs, new)
+            document.splice(start, delete, insert)
+            paragraphs = new
+            assert document.result() == detect_ai_content(''.join(paragraphs)), ''.join(paragraphs)
+
+
+def test_removing_every_paragraph_resets_the_statistics():
+    document = LiveDocument()
+    text = 'The first sentence is here. Furthermore, it goes on and on.\nAnother one follows it closely!'
+    document.splice(0, 0, split_paragraphs(text))
+    document.splice(0, len(document.paragraphs), [])
+    assert (document.length, document.sentence_count, document.word_count, document.unique_words) == (0, 0, 0, 0)
+    assert not document.frequency.any()
+    document.splice(0, 0, split_paragraphs(text))
+    assert document.result() == detect_ai_content(text)
+
+
+def test_splice_outside_the_document_is_rejected():
+    document = LiveDocument()
+    document.splice(0, 0, ['One.', '\nTwo.'])
+    for start, delete in ((3, 0), (1, 2), (-1, 0)):
+        with pytest.raises(ValueError):
+            document.splice(start, delete, [])
+    assert document.version == 1
+
+
+def test_update_checks_versions_and_sessions():
+    sessions = LiveSessions(max_sessions=2)
+    session_id, version, _ = update(sessions, None, None, 0, 0, ['A first paragraph.'])
+    assert version == 1
+    with pytest.raises(VersionConflict):
+        update(sessions, session_id, 0, 1, 0, ['\nMore.'])
+    assert update(sessions, session_id, 1, 1, 0, ['\nMore.'])[1] == 2
+
+    # Two newer sessions push the least recently used one out
+    update(sessions, None, None, 0, 0, ['Second.'])
+    update(sessions, None, None, 0, 0, ['Third.'])
+    with pytest.raises(UnknownSession):
+        update(sessions, session_id, 2, 0, 0, [])
@@ -0,0 +1,119 @@
+# backend/test_near_duplicates.py
+"""MinHash estimates against exact Jaccard similarity, the LSH index and its file. Run with `python -m pytest backend`."""
+import random
+import time
+
+import numpy as np
+import pytest
+
+from near_duplicates import NearDuplicateIndex, words, shingles, signature, similarity, SHINGLE_SIZE
+from text_features import WORD_RE
+from test_equivalence import CORPORA
+
+VOCABULARY = [f"word{i}" for i in range(3000)]
+
+
+def random_words(rng, count):
+    return [rng.choice(VOCABULARY) for _ in range(count)]
+
+
+def edited(rng, tokens, changes):
+    tokens = list(tokens)
+    for _ in range(changes):
+        tokens[rng.randrange(len(tokens))] = rng.choice(VOCABULARY)
+    return tokens
+
+
+def jaccard(first, second):
+    first, second = set(shingles(first).tolist()), set(shingles(second).tolist())
+    return len(first & second) / len(first | second)
+
+
+def test_ascii_words_match_the_regex():
+    for text in CORPORA['ascii'] + ['Hello, World_42! x\x1cy', 'a\tb\r\nc']:
+        assert words(text) == [word.encode() for word in WORD_RE.findall(text.lower())], text
+
+
+def test_signature_estimates_jaccard_similarity():
+    rng = random.Random(5)
+    errors = []
+    for changes in (0, 2, 5, 10, 20, 40, 80, 150, 300):
+        tokens = random_words(rng, 400)
+        first, second = ' '.join(tokens), ' '.join(edited(rng, tokens, changes))
+        errors.append(abs(similarity(signature(first), signature(second)) - jaccard(first, second)))
+    # 128 slots give a standard error of at most about 0.045
+    assert max(errors) < 0.15
+    assert sum(errors) / len(errors) < 0.06
+
+
+def test_short_and_identical_texts():
+    assert signature(' '.join(['only'] * (SHINGLE_SIZE - 1))) is None
+    text = ' '.join(random_words(random.Random(1), 50))
+    assert similarity(signature(text), signature(text.upper() + '!!')) == 1.0
+
+
+def test_nearest_reuses_only_close_texts():
+    rng = random.Random(9)
+    index = NearDuplicateIndex('v1', threshold=0.9)
+    tokens = random_words(rng, 600)
+    index.add('draft', signature(' '.join(tokens)), {'ai_percentage': 40})
+    for other in range(20):
+        index.add(f'other{other}', signature(' '.join(random_words(rng, 600))), {'ai_percentage': other})
+
+    key, score, result = index.nearest(signature(' '.join(edited(rng, tokens, 1))))
+    assert (key, result) == ('draft', {'ai_percentage': 40}) and index.reusable((key, score, result))
+    rewritten = index.nearest(signature(' '.join(edited(rng, tokens, 200))))
+    assert not index.reusable(rewritten)
+    assert index.nearest(signature(' '.join(random_words(rng, 600)))) == (None, 0.0, None)
+
+
+def test_least_recently_used_entries_are_dropped():
+    rng = random.Random(2)
+    index = NearDuplicateIndex('v1', max_entries=3)
+    texts = {key: ' '.join(random_words(rng, 100)) for key in 'abcd'}
+    for key in 'abc':
+        index.add(key, signature(texts[key]), key)
+    index.nearest(signature(texts['a']))  # a is now the most recently used
+    index.add('d', signature(texts['d']), 'd')
+    assert list(index.entries) == ['c', 'a', 'd']
+    indexed = set().union(*(keys for bucket in index.buckets for keys in bucket.values()))
+    assert indexed == {'a', 'c', 'd'}
+
+
+def test_index_survives_a_restart(tmp_path):
+    rng = random.Random(3)
+    path = str(tmp_path / 'near_duplicates.npz')
+    texts = [' '.join(random_words(rng, 200)) for _ in range(30)]
+    index = NearDuplicateIndex('v1', path=path)
+    for number, text in enumerate(texts):
+        index.add(f'key{number}', signature(text), {'ai_percentage': number, 'note': 'ünïcode'})
+    index.close()
+
+    reloaded = NearDuplicateIndex('v1', path=path)
+    try:
+        assert list(reloaded.entries) == list(index.entries)
+        for number, text in enumerate(texts):
+            assert reloaded.nearest(signature(text)) == (f'key{number}', 1.0,
+                                                          {'ai_percentage': number, 'note': 'ünïcode'})
+    finally:
+        reloaded.close()
+    other_version = NearDuplicateIndex('v2', path=path)
+    other_version.close()
+    assert not other_version.entries
+    assert [entry.name for entry in tmp_path.iterdir()] == ['near_duplicates.npz']
+
+
+def test_saver_thread_writes_after_save_every_additions(tmp_path):
+    path = tmp_path / 'near_duplicates.npz'
+    index = NearDuplicateIndex('v1', path=str(path), save_every=5, save_interval=3600)
+    try:
+        rng = random.Random(4)
+        for number in range(5):
+            index.add(f'key{number}', signature(' '.join(random_words(rng, 50))), number)
+        deadline = time.monotonic() + 10
+        while not path.exists() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        with np.load(path) as saved:
+            assert len(saved['keys']) == 5
+    finally:
+        index.close()
@@ -0,0 +1,81 @@
+# backend/test_phrase_matcher.py
+"""The Aho-Corasick phrase matcher against one regex per phrase. Run with `python -m pytest backend`."""
+import random
+import re
+
+import pytest
+
+from phrase_matcher import (PhraseMatcher, DEFAULT_LEXICON, read_lexicon, lexicon_digest, index_path,
+                            load_matcher)
+from text_features import SENTENCE_RE, WORD_RE, original_offsets
+from test_equivalence import CORPORA
+
+OVERLAPPING = ['in conclusion', 'conclusion', 'it is', 'it is important', 'is important to note',
+               'a a', 'a', 'Note', 'however', 'in', 'in conclusion it is']
+
+
+def regex_matches(text, phrases):
+    """(phrase, start, end) of every occurrence, overlapping ones included, found phrase by phrase"""
+    lowered = text.lower()
+    offsets = original_offsets(text) if len(lowered) != len(text) else None
+    patterns = [(phrase, re.compile(r'(?<!\w)(?=(' + r'\W+'.join(map(re.escape, WORD_RE.findall(phrase.lower())))
+                                    + r')(?!\w))'))
+                for phrase in phrases]
+    matches = []
+    for sentence in SENTENCE_RE.finditer(lowered):
+        for phrase, pattern in patterns:
+            for match in pattern.finditer(lowered, *sentence.span()):
+                start, end = match.span(1)
+                if offsets:
+                    start, end = offsets[start], offsets[end]
+                matches.append((phrase, start, end))
+    return sorted(matches)
+
+
+def phrase_text(rng, phrases, count):
+    """Text stitched from the phrases' own words, so partial and overlapping matches are common"""
+    words = [word for phrase in phrases for word in phrase.split()] + ['the', 'İ', 'ΟΔΟΣ', 'x']
+    separators = [' ', ' ', ', ', '. ', '\n', "'", ' - ', '!']
+    return ''.join(rng.choice(words) + rng.choice(separators) for _ in range(count))
+
+
+@pytest.mark.parametrize('phrases', [read_lexicon(DEFAULT_LEXICON), OVERLAPPING], ids=['lexicon', 'overlapping'])
+def test_find_matches_regex(phrases):
+    matcher = PhraseMatcher.compile(phrases)
+    rng = random.Random(11)
+    texts = [phrase_text(rng, phrases, rng.randint(0, 300)) for _ in range(200)] + CORPORA['unicode'][:100]
+    for text in texts:
+        assert sorted(matcher.find(text)) == regex_matches(text, matcher.phrases), text
+
+
+def test_count_agrees_with_find():
+    matcher = PhraseMatcher.compile(OVERLAPPING)
+    text = phrase_text(random.Random(3), OVERLAPPING, 2000)
+    found = matcher.find(text)
+    assert sum(matcher.count(text).values()) == len(found)
+
+
+def test_saved_index_round_trips(tmp_path):
+    phrases = read_lexicon(DEFAULT_LEXICON)
+    matcher = PhraseMatcher.compile(phrases)
+    path = str(tmp_path / 'markers.index.json')
+    matcher.save(path, lexicon_digest(phrases))
+    loaded = PhraseMatcher.load(path, lexicon_digest(phrases))
+    text = phrase_text(random.Random(5), phrases, 3000)
+    assert loaded.find(text) == matcher.find(text)
+    assert PhraseMatcher.load(path, lexicon_digest(phrases + ['another phrase'])) is None
+    assert [name for name in tmp_path.iterdir()] == [tmp_path / 'markers.index.json']
+
+
+def test_stale_index_is_rebuilt(tmp_path):
+    lexicon = tmp_path / 'markers.txt'
+    lexicon.write_text('in conclusion\n', encoding='utf-8')
+    assert load_matcher(str(lexicon)).phrases == ['in conclusion']
+    lexicon.write_text('in conclusion\n# a comment\nto summarize\n', encoding='utf-8')
+    assert load_matcher(str(lexicon)).phrases == ['in conclusion', 'to summarize']
+    assert PhraseMatcher.load(index_path(str(lexicon)), lexicon_digest(read_lexicon(str(lexicon)))) is not None
+
+
+def test_shipped_index_is_up_to_date():
+    phrases = read_lexicon(DEFAULT_LEXICON)
+    assert PhraseMatcher.load(index_path(DEFAULT_LEXICON), lexicon_digest(phrases)) is not None
@@ -0,0 +1,103 @@
+# backend/test_wire_format.py
+"""Compressed and MessagePack bodies: round trips and the decompression limit. Run with `python -m pytest backend`."""
+import gzip
+import io
+import json
+
+import pytest
+
+from wire_format import (DecompressingReader, BodyTooLarge, UnsupportedEncoding, decompress, compress,
+                         content_encodings, zstandard, msgpack, MSGPACK_TYPE, COMPRESS_MIN_BYTES,
+                         MAX_DECOMPRESSED_BYTES)
+
+TEXT = ("The committee met again on Tuesday. Furthermore, the budget was approved without changes! "
+        "Nobody expected that. ") * 40
+ENCODINGS = content_encodings()
+
+
+@pytest.fixture(scope='module')
+def client():
+    from app import app
+    return app.test_client()
+
+
+@pytest.mark.parametrize('encoding', ENCODINGS)
+def test_compress_round_trips(encoding):
+    data = TEXT.encode('utf-8')
+    assert decompress(compress(data, encoding), encoding) == data
+    assert decompress(compress(b'', encoding), encoding) == b''
+
+
+@pytest.mark.parametrize('encoding', ENCODINGS)
+def test_reader_never_returns_more_than_asked(encoding):
+    data = bytes(range(256)) * 1000
+    reader = DecompressingReader(io.BytesIO(compress(data, encoding)), encoding)
+    blocks = []
+    while True:
+        block = reader.read(777)
+        assert len(block) <= 777
+        if not block:
+            break
+        blocks.append(block)
+    assert b''.join(blocks) == data
+
+
+@pytest.mark.skipif(zstandard is None, reason="zstandard is not installed")
+def test_zstd_reads_every_frame():
+    data = compress(b'first frame ', 'zstd') + compress(b'second frame', 'zstd')
+    assert decompress(data, 'zstd') == b'first frame second frame'
+
+
+@pytest.mark.parametrize('encoding', ENCODINGS)
+def test_decompression_limit(encoding):
+    bomb = compress(b'\0' * (1024 * 1024), encoding)
+    assert len(bomb) < 64 * 1024
+    assert len(decompress(bomb, encoding, limit=1024 * 1024)) == 1024 * 1024
+    with pytest.raises(BodyTooLarge):
+        decompress(bomb, encoding, limit=1024 * 1024 - 1)
+
+
+def test_bad_bodies_are_value_errors():
+    with pytest.raises(ValueError):
+        decompress(b'not gzip at all', 'gzip')
+    with pytest.raises(ValueError):
+        decompress(gzip.compress(TEXT.encode())[:-20], 'gzip')
+    with pytest.raises(UnsupportedEncoding):
+        decompress(b'', 'br')
+
+
+@pytest.mark.parametrize('encoding', ENCODINGS)
+def test_compressed_requests_score_like_plain_ones(client, encoding):
+    expected = client.post('/api/detect_ai', json={'text': TEXT}).get_json()
+    response = client.post('/api/detect_ai', data=compress(json.dumps({'text': TEXT}).encode(), encoding),
+                           headers={'Content-Type': 'application/json', 'Content-Encoding': encoding})
+    assert response.status_code == 200
+    assert response.get_json() == expected
+
+
+@pytest.mark.skipif(msgpack is None, reason="msgpack is not installed")
+@pytest.mark.parametrize('encoding', ENCODINGS)
+def test_msgpack_round_trip(client, encoding):
+    # Marker matches make a response well above COMPRESS_MIN_BYTES
+    text = "In conclusion, it is important to note the results. " * 50
+    expected = client.post('/api/detect_ai/markers', json={'text': text}).get_json()
+    assert len(json.dumps(expected)) > COMPRESS_MIN_BYTES
+    response = client.post('/api/detect_ai/markers', data=msgpack.packb({'text': text}),
+                           headers={'Content-Type': MSGPACK_TYPE, 'Accept': MSGPACK_TYPE,
+                                    'Accept-Encoding': encoding})
+    assert response.status_code == 200
+    assert response.mimetype == MSGPACK_TYPE
+    assert response.headers['Content-Encoding'] == encoding
+    assert msgpack.unpackb(decompress(response.get_data(), encoding), raw=False) == expected
+
+
+def test_bad_and_oversized_bodies_are_rejected(client):
+    headers = {'Content-Type': 'application/json', 'Content-Encoding': 'gzip'}
+    assert client.post('/api/detect_ai', data=b'garbage', headers=headers).status_code == 400
+    assert client.post('/api/detect_ai', data=b'{}', headers=dict(headers, **{'Content-Encoding': 'br'})
+                       ).status_code == 415
+    if msgpack is not None:
+        assert client.post('/api/detect_ai', data=b'\xc1',
+                           headers={'Content-Type': MSGPACK_TYPE}).status_code == 400
+    bomb = gzip.compress(b' ' * (MAX_DECOMPRESSED_BYTES + 1))
+    assert client.post('/api/detect_ai', data=bomb, headers=headers).status_code == 413
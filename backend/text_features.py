@@ -0,0 +1,159 @@
+# backend/text_features.py
+import re
+from array import array
+from collections import defaultdict
+
+import numpy as np
+
+TRANSITION_WORDS = (
+    'however', 'therefore', 'moreover', 'furthermore', 'consequently',
+    'additionally', 'nevertheless', 'thus', 'hence', 'accordingly',
+    'subsequently', 'meanwhile', 'conversely', 'similarly', 'likewise'
+)
+TRANSITION_SET = frozenset(TRANSITION_WORDS)
+
+# A sentence is whatever lies between runs of terminal punctuation
+SENTENCE_RE = re.compile(r'[^.!?]+')
+WORD_RE = re.compile(r'\w+')
+# Transition words count only when surrounded by plain spaces
+TRANSITION_RE = re.compile(r'(?<= )(' + '|'.join(TRANSITION_WORDS) + r')(?= )')
+# extract_features reports progress about this often, in characters
+PROGRESS_EVERY = 1024 * 1024
+
+
+class TextFeatures:
+    """Raw statistics gathered from one pass over a document.
+
+    Words are interned: the token stream holds 4-byte vocabulary IDs and the
+    per-sentence statistics live in typed arrays, so a document costs a few
+    bytes per word instead of a Python string per word.
+    """
+
+    def __init__(self):
+        self.sentence_starts = array('Q')        # offset of each sentence in the lowered text
+        self.sentence_ends = array('Q')
+        self.sentence_lengths = array('I')       # whitespace-separated tokens per sentence
+        self.sentence_transitions = bytearray()  # whether a sentence contains a transition word
+        self.sentence_word_counts = array('I')   # \w+ words per sentence
+        self.sentence_transition_counts = array('I')  # transition hits per sentence
+        self.token_ids = array('I')              # lower-cased words in document order, as vocabulary IDs
+        self.vocabulary = {}                     # word -> ID, in order of first appearance
+        self.transition_count = 0
+        self.lowered_length = 0
+
+    @property
+    def word_count(self):
+        return len(self.token_ids)
+
+    def unique_long_words(self):
+        """Number of distinct words longer than three characters"""
+        # Every vocabulary entry occurs at least once
+        return sum(1 for word in self.vocabulary if len(word) > 3)
+
+    def long_word_mask(self):
+        """Boolean array telling for each vocabulary ID whether the word is longer than three characters"""
+        return np.fromiter((len(word) > 3 for word in self.vocabulary), dtype=bool, count=len(self.vocabulary))
+
+
+def count_transitions(segment, last_end=None, offset=0):
+    """Count transition words like str.count does for each ' word ' pattern.
+
+    last_end and offset carry the overlap state when one sentence is scanned
+    in several pieces.
+    """
+    count = 0
+    if last_end is None:
+        last_end = {}
+    for match in TRANSITION_RE.finditer(segment):
+        word = match.group(1)
+        start = offset + match.start()
+        # str.count never reuses a space, so "x thus thus y" counts once
+        if last_end.get(word) != start - 1:
+            count += 1
+            last_end[word] = offset + match.end()
+    return count
+
+
+def extract_features(text, progress=None):
+    """Tokenize the text once and collect sentence, word and transition statistics.
+
+    progress, if given, is called with the fraction of the text done so far.
+    """
+    # Lower-casing ASCII never changes lengths or depends on the neighbouring
+    # characters, so ASCII text is lowered a sentence at a time instead of copied whole
+    ascii_only = text.isascii()
+    lowered = text if ascii_only else text.lower()
+    features = TextFeatures()
+    features.lowered_length = len(lowered)
+    # Looking up an unseen word assigns it the next ID
+    vocabulary = defaultdict()
+    vocabulary.default_factory = vocabulary.__len__
+    intern = vocabulary.__getitem__
+    next_report = PROGRESS_EVERY if progress is not None else len(lowered) + 1
+
+    for match in SENTENCE_RE.finditer(lowered):
+        if match.start() >= next_report:
+            progress(match.start() / len(lowered))
+            next_report += PROGRESS_EVERY
+        segment = match.group().lower() if ascii_only else match.group()
+        tokens = segment.split()
+        if not tokens:
+            continue
+
+        words = WORD_RE.findall(segment)
+        features.token_ids.extend(map(intern, words))
+
+        has_transition = not TRANSITION_SET.isdisjoint(tokens)
+        transitions = count_transitions(segment) if has_transition else 0
+        features.transition_count += transitions
+
+        start, end = match.span()
+        features.sentence_starts.append(start)
+        features.sentence_ends.append(end)
+        features.sentence_lengths.append(len(tokens))
+        features.sentence_transitions.append(has_transition)
+        features.sentence_word_counts.append(len(words))
+        features.sentence_transition_counts.append(transitions)
+
+    vocabulary.default_factory = None
+    features.vocabulary = vocabulary
+    if progress is not None:
+        progress(1.0)
+    return features
+
+
+def chunk_diversities(token_ids, long_mask):
+    """Share of distinct long words in each third of the token stream"""
+    ids = np.frombuffer(token_ids, dtype=np.uint32)
+    seen = np.zeros(len(long_mask), dtype=bool)
+    diversities = []
+    size = len(ids) // 3
+    for i in range(0, len(ids), size):
+        chunk = ids[i:i+size]
+        if len(chunk):
+            # Mark the chunk's IDs once each; the distinct long words are the marked long IDs
+            seen[:] = False
+            seen[chunk] = True
+            distinct = int(np.count_nonzero(seen & long_mask))
+            diversities.append(distinct / len(chunk))
+    return diversities
+
+
+def original_offsets(text):
+    """Map offsets in text.lower() back to text, for texts whose length changes when lower-cased"""
+    offsets = []
+    for index, char in enumerate(text):
+        offsets.extend([index] * len(char.lower()))
+    offsets.append(len(text))
+    return offsets
+
+
+def sentence_texts(text, features, indices):
+    """Recover the original (not lower-cased) text of the given sentences"""
+    if features.lowered_length == len(text):
+        return {i: text[features.sentence_starts[i]:features.sentence_ends[i]].strip() for i in indices}
+
+    # Lower-casing changed the length, so offsets no longer line up
+    sentences = re.split(r'[.!?]+', text)
+    sentences = [s.strip() for s in sentences if s.strip()]
+    return {i: sentences[i] for i in indices}
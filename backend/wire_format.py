@@ -0,0 +1,160 @@
+# backend/wire_format.py
+"""Compressed (gzip, zstd) and MessagePack request and response bodies."""
+import gzip
+import io
+import json
+import os
+import zlib
+
+from flask import Request
+from werkzeug.exceptions import BadRequest
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; gzip always works
+    zstandard = None
+try:
+    import msgpack
+except ImportError:  # MessagePack is optional; JSON always works
+    msgpack = None
+
+JSON_TYPE = 'application/json'
+MSGPACK_TYPE = 'application/msgpack'
+MSGPACK_TYPES = (MSGPACK_TYPE, 'application/x-msgpack', 'application/vnd.msgpack')
+
+# Responses smaller than this are sent uncompressed; compressing them costs more than it saves
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1400))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', 6))
+ZSTD_LEVEL = int(os.environ.get('ZSTD_LEVEL', 3))
+# Limit on the decompressed size of a request body, so a small zip bomb cannot exhaust memory
+MAX_DECOMPRESSED_BYTES = int(os.environ.get('MAX_DECOMPRESSED_BYTES', 64 * 1024 * 1024))
+
+READ_BLOCK_SIZE = 64 * 1024
+
+
+class BodyTooLarge(Exception):
+    """The request body decompresses to more than the allowed size"""
+
+
+class UnsupportedEncoding(Exception):
+    """The request body uses a Content-Encoding we cannot decode"""
+
+
+def content_encodings():
+    """Encodings accepted for request bodies and offered for responses, best first"""
+    return ['zstd', 'gzip'] if zstandard else ['gzip']
+
+
+def content_types():
+    return [JSON_TYPE, MSGPACK_TYPE] if msgpack else [JSON_TYPE]
+
+
+class DecompressingReader:
+    """Reads a compressed stream as plain bytes; read(size) never returns more than size"""
+
+    def __init__(self, stream, encoding):
+        encoding = (encoding or '').strip().lower()
+        if encoding in ('gzip', 'x-gzip'):
+            self.reader = gzip.GzipFile(fileobj=stream, mode='rb')
+        elif encoding == 'zstd' and zstandard:
+            self.reader = zstandard.ZstdDecompressor().stream_reader(stream, read_across_frames=True)
+        else:
+            raise UnsupportedEncoding(f"Unsupported Content-Encoding: {encoding}")
+
+    def read(self, size):
+        try:
+            return self.reader.read(size)
+        except (OSError, EOFError, zlib.error) as e:
+            raise ValueError(f"Could not decompress body: {str(e)}")
+        except Exception as e:
+            if zstandard and isinstance(e, zstandard.ZstdError):
+                raise ValueError(f"Could not decompress body: {str(e)}")
+            raise
+
+
+def decompress(data, encoding, limit=MAX_DECOMPRESSED_BYTES):
+    """Decompress a whole body, reading at most limit bytes of output"""
+    reader = DecompressingReader(io.BytesIO(data), encoding)
+    blocks = []
+    size = 0
+    while True:
+        block = reader.read(min(READ_BLOCK_SIZE, limit + 1 - size))
+        if not block:
+            return b''.join(blocks)
+        size += len(block)
+        if size > limit:
+            raise BodyTooLarge(f"Body decompresses to more than {limit} bytes")
+        blocks.append(block)
+
+
+class WireRequest(Request):
+    """Flask request whose body may be compressed and may be MessagePack.
+
+    Bodies are limited to MAX_CONTENT_LENGTH, except on streaming_endpoints,
+    which read request.stream themselves and enforce their own limit.
+    """
+
+    _decoded_body = None
+    _unpacked_body = None
+    streaming_endpoints = ('detect_ai_stream',)
+
+    @property
+    def max_content_length(self):
+        if self.endpoint in self.streaming_endpoints:
+            return None
+        return super().max_content_length
+
+    def get_data(self, cache=True, as_text=False, parse_form_data=False):
+        if self._decoded_body is None:
+            data = super().get_data(cache=True, parse_form_data=parse_form_data)
+            encoding = self.headers.get('Content-Encoding')
+            if encoding and encoding.strip().lower() != 'identity':
+                data = decompress(data, encoding)
+            self._decoded_body = data
+        return self._decoded_body.decode('utf-8', 'replace') if as_text else self._decoded_body
+
+    def get_json(self, force=False, silent=False, cache=True):
+        if self.mimetype in MSGPACK_TYPES:
+            if msgpack is None:
+                raise UnsupportedEncoding("MessagePack bodies are not supported by this server")
+            if self._unpacked_body is None or not cache:
+                try:
+                    body = msgpack.unpackb(self.get_data(), raw=False)
+                except (ValueError, msgpack.UnpackException) as e:
+                    if silent:
+                        return None
+                    raise BadRequest(f"Invalid MessagePack body: {str(e) or type(e).__name__}")
+                if not cache:
+                    return body
+                self._unpacked_body = body
+            return self._unpacked_body
+        return super().get_json(force=force, silent=silent, cache=cache)
+
+
+def compress(data, encoding):
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def encode_response(request, response):
+    """Re-encode a JSON response as MessagePack and compress it, as the client accepts"""
+    # Advertise what request bodies may use (RFC 7694)
+    response.headers['Accept-Encoding'] = ', '.join(content_encodings())
+    response.headers['Accept-Post'] = ', '.join(content_types())
+    if response.is_streamed or response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return response
+
+    response.vary.add('Accept')
+    if msgpack and response.mimetype == JSON_TYPE and \
+            request.accept_mimetypes.best_match(content_types()) == MSGPACK_TYPE:
+        response.set_data(msgpack.packb(json.loads(response.get_data()), use_bin_type=True))
+        response.mimetype = MSGPACK_TYPE
+
+    response.vary.add('Accept-Encoding')
+    if response.content_length is not None and response.content_length >= COMPRESS_MIN_BYTES:
+        encoding = request.accept_encodings.best_match(content_encodings())
+        if encoding:
+            response.set_data(compress(response.get_data(), encoding))
+            response.headers['Content-Encoding'] = encoding
+    return response
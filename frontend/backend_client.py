@@ -0,0 +1,220 @@
+import gzip
+import json
+import os
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; gzip always works
+    zstandard = None
+try:
+    import msgpack
+except ImportError:  # MessagePack is optional; JSON always works
+    msgpack = None
+
+DEFAULT_BASE_URL = os.environ.get('AI_DETECTOR_BACKEND_URL', "http://localhost:5000")
+# Request bodies smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = 1400
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+MSGPACK_TYPE = 'application/msgpack'
+# Texts at least this long are scored as background jobs, which have no request timeout
+JOB_MIN_CHARS = int(os.environ.get('AI_DETECTOR_JOB_MIN_CHARS', 1000000))
+# How long the job event stream may stay silent (the backend sends keep-alives) and
+# how often to poll when the stream is not available
+JOB_EVENTS_TIMEOUT = 60
+JOB_POLL_SECONDS = 1.0
+JOB_FINISHED = ('done', 'failed', 'cancelled')
+# Times a request answered with 429 (backend busy) is sent again, after the Retry-After it asks for
+BUSY_RETRIES = 5
+MAX_RETRY_AFTER = 10
+
+
+class SessionLost(Exception):
+    """The engine no longer has the live session; the whole document has to be sent again"""
+
+
+class BackendClient:
+    """Talks to the detection backend over one pooled keep-alive session.
+
+    Request bodies are sent as MessagePack and compressed with zstd or gzip
+    when the backend says it accepts them; responses are asked for in the
+    same formats.
+    """
+
+    def __init__(self, base_url=DEFAULT_BASE_URL, timeout=30, pool_size=10,
+                 compress_min_bytes=COMPRESS_MIN_BYTES, job_min_chars=JOB_MIN_CHARS):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.compress_min_bytes = compress_min_bytes
+        self.job_min_chars = job_min_chars
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['Accept-Encoding'] = 'zstd, gzip' if zstandard else 'gzip'
+        if msgpack:
+            self.session.headers['Accept'] = f'{MSGPACK_TYPE}, application/json;q=0.9'
+        # What the backend accepts for request bodies, from its Accept-Encoding and
+        # Accept-Post headers; None until we have asked
+        self.server_encodings = None
+        self.server_types = None
+
+    def _learn(self, response):
+        def header_list(name):
+            return [item.strip() for item in response.headers.get(name, '').split(',') if item.strip()]
+        self.server_encodings = header_list('Accept-Encoding')
+        self.server_types = header_list('Accept-Post')
+
+    def negotiate(self, timeout=None):
+        """Ask the backend which request body formats it accepts"""
+        response = self.session.get(f"{self.base_url}/api/health", timeout=timeout or self.timeout)
+        response.raise_for_status()
+        self._learn(response)
+
+    def health(self, timeout=None):
+        """Seconds the backend took to answer /api/health, or None when it is unreachable"""
+        started = time.perf_counter()
+        try:
+            self.negotiate(timeout)
+        except requests.RequestException:
+            return None
+        return time.perf_counter() - started
+
+    def _encode(self, payload):
+        """Request body and headers in the best format the backend accepts"""
+        if msgpack and MSGPACK_TYPE in self.server_types:
+            body, headers = msgpack.packb(payload, use_bin_type=True), {'Content-Type': MSGPACK_TYPE}
+        else:
+            body, headers = json.dumps(payload).encode('utf-8'), {'Content-Type': 'application/json'}
+        if len(body) >= self.compress_min_bytes:
+            if zstandard and 'zstd' in self.server_encodings:
+                body, headers['Content-Encoding'] = zstandard.ZstdCompressor().compress(body), 'zstd'
+            elif 'gzip' in self.server_encodings:
+                body, headers['Content-Encoding'] = gzip.compress(body, compresslevel=6), 'gzip'
+        return body, headers
+
+    def _decode(self, response):
+        content = response.content
+        # requests only decodes zstd when its urllib3 supports it, so check before decoding again
+        if response.headers.get('Content-Encoding') == 'zstd' and content[:4] == ZSTD_MAGIC:
+            content = zstandard.ZstdDecompressor().decompressobj().decompress(content)
+        if response.headers.get('Content-Type', '').startswith(MSGPACK_TYPE):
+            return msgpack.unpackb(content, raw=False)
+        return json.loads(content)
+
+    def _post(self, path, payload):
+        if self.server_encodings is None:
+            self.negotiate()
+        body, headers = self._encode(payload)
+        response = self.session.post(f"{self.base_url}{path}", data=body, headers=headers, timeout=self.timeout)
+        if response.status_code == 415 and headers != {'Content-Type': 'application/json'}:
+            # The backend no longer takes what it advertised; learn again and retry
+            self._learn(response)
+            body, headers = self._encode(payload)
+            response = self.session.post(f"{self.base_url}{path}", data=body, headers=headers,
+                                         timeout=self.timeout)
+        for _ in range(BUSY_RETRIES):
+            if response.status_code != 429:
+                break
+            # Every scoring worker is busy: wait as long as the backend asks, then try again
+            try:
+                delay = float(response.headers.get('Retry-After', 1))
+            except ValueError:
+                delay = 1.0
+            time.sleep(min(max(delay, 0.0), MAX_RETRY_AFTER))
+            response = self.session.post(f"{self.base_url}{path}", data=body, headers=headers,
+                                         timeout=self.timeout)
+        response.raise_for_status()
+        return self._decode(response)
+
+    def job_events(self, job_id):
+        """Job states from the backend's Server-Sent Events stream, up to the final one"""
+        response = self.session.get(f"{self.base_url}/api/jobs/{job_id}/events", stream=True,
+                                    headers={'Accept': 'text/event-stream'},
+                                    timeout=(self.timeout, JOB_EVENTS_TIMEOUT))
+        with response:
+            response.raise_for_status()
+            data = []
+            for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                if line.startswith('data:'):
+                    data.append(line[5:].strip())
+                elif not line and data:
+                    yield json.loads('\n'.join(data))
+                    data = []
+
+    def job_status(self, job_id):
+        response = self.session.get(f"{self.base_url}/api/jobs/{job_id}", timeout=self.timeout)
+        response.raise_for_status()
+        return self._decode(response)
+
+    def cancel_job(self, job_id):
+        self.session.delete(f"{self.base_url}/api/jobs/{job_id}", timeout=self.timeout)
+
+    def analyze_job(self, text, progress=None, cancelled=None):
+        """Score a text as a background job, following its progress; raises requests.RequestException.
+
+        progress is called with (percent, stage); when cancelled() turns true
+        the job is cancelled on the backend and an error is returned.
+        """
+        job = self._post('/api/jobs', {"text": text})
+        job_id = job['job_id']
+        states = self.job_events(job_id)
+        while job['status'] not in JOB_FINISHED:
+            if cancelled and cancelled():
+                self.cancel_job(job_id)
+                return {"error": "Analysis cancelled"}
+            if progress:
+                progress(int(job['progress'] * 100), job.get('stage') or job['status'])
+            try:
+                job = next(states)
+            except (StopIteration, requests.RequestException):
+                # No event stream (a proxy may block it, or it dropped): poll instead
+                time.sleep(JOB_POLL_SECONDS)
+                job = self.job_status(job_id)
+        if job['status'] == 'done':
+            return job['result']
+        return {"error": job.get('error') or f"Analysis {job['status']}"}
+
+    def analyze(self, text, progress=None, cancelled=None):
+        """Send text to the backend API for AI detection; raises requests.RequestException.
+
+        Long texts go through the job API, where no request timeout applies.
+        """
+        if len(text) >= self.job_min_chars:
+            try:
+                return self.analyze_job(text, progress, cancelled)
+            except requests.HTTPError as e:
+                # A backend without the job API scores it inline as before
+                if e.response is None or e.response.status_code not in (404, 405):
+                    raise
+        return self._post('/api/detect_ai', {"text": text})
+
+    def detect(self, text, progress=None, cancelled=None):
+        """Send text to the backend API for AI detection"""
+        try:
+            return self.analyze(text, progress, cancelled)
+        except requests.RequestException as e:
+            return {"error": f"Failed to connect to backend: {str(e)}"}
+        except ValueError as e:
+            return {"error": f"Invalid response from backend: {str(e)}"}
+
+    def live_update(self, session, version, start, delete, paragraphs):
+        """Replace paragraphs[start:start + delete] of a live session (a new one when session is None).
+
+        Raises SessionLost when the backend has dropped the session or holds
+        another version of it, and requests.RequestException on other failures.
+        """
+        try:
+            return self._post('/api/detect_ai/live', {
+                "session": session, "version": version,
+                "start": start, "delete": delete, "paragraphs": paragraphs
+            })
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code in (404, 409):
+                raise SessionLost(str(e)) from e
+            raise
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,447 @@
+import csv
+import json
+import os
+import time
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableView, QHeaderView,
+    QFileDialog, QMessageBox, QProgressBar, QSpinBox, QAbstractItemView
+)
+from PyQt5.QtCore import (
+    Qt, QAbstractTableModel, QCoreApplication, QModelIndex, QSortFilterProxyModel, QThreadPool
+)
+from PyQt5.QtGui import QColor
+from workers import Worker
+
+# Documents analyzed at the same time; each holds one request (or embedded call) in flight
+BATCH_CONCURRENCY = int(os.environ.get('AI_DETECTOR_BATCH_CONCURRENCY', 4))
+BATCH_EXTENSIONS = ('.txt', '.pdf')
+
+QUEUED = 'Queued'
+READING = 'Reading'
+ANALYZING = 'Analyzing'
+DONE = 'Done'
+FAILED = 'Error'
+CANCELLED = 'Cancelled'
+
+DETAILS = ('sentence_variety', 'word_repetition', 'transition_usage', 'burstiness')
+REPORT_FIELDS = ('file', 'status', 'ai_percentage') + DETAILS + (
+    'characters', 'seconds', 'error', 'highlighted_sections')
+
+
+def batch_files(directory):
+    """Every .txt and .pdf file below the directory, in sorted order"""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(BATCH_EXTENSIONS):
+                yield os.path.join(root, name)
+
+
+def scan_folder(worker, directory):
+    """BatchItems for every file batch_files finds; runs on the batch thread pool"""
+    items = []
+    for path in batch_files(directory):
+        worker.check_cancelled()
+        items.append(BatchItem(path, directory))
+    return items
+
+
+def read_document(path, cancelled=lambda: False):
+    """Text of a .txt or .pdf file"""
+    if not path.lower().endswith('.pdf'):
+        with open(path, encoding='utf-8', errors='replace') as file:
+            return file.read()
+    from pdf_ingest import iter_pdf_pages
+    # One process per PDF: the batch already works on several files at once
+    return ''.join(text for _, _, text in iter_pdf_pages(path, workers=1, cancelled=cancelled))
+
+
+def analyze_file(worker, client, path):
+    """Read one file and score it; runs on the batch thread pool"""
+    started = time.perf_counter()
+    text = read_document(path, cancelled=lambda: worker.is_cancelled).strip()
+    worker.check_cancelled()
+    if not text:
+        return {"error": "No text found in the file"}, 0, time.perf_counter() - started
+    worker.report(-1, ANALYZING)
+    result = client.detect(text, cancelled=lambda: worker.is_cancelled)
+    return result, len(text), time.perf_counter() - started
+
+
+class BatchItem:
+    """One file of a batch; only the summary of its result is kept, never its text"""
+    __slots__ = ('path', 'name', 'status', 'result', 'error', 'characters', 'seconds')
+
+    def __init__(self, path, root):
+        self.path = path
+        self.name = os.path.relpath(path, root)
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.characters = None
+        self.seconds = None
+
+    @property
+    def ai_percentage(self):
+        return self.result.get('ai_percentage') if self.result else None
+
+    def report_row(self):
+        details = self.result.get('details', {}) if self.result else {}
+        row = {
+            'file': self.path,
+            'status': self.status,
+            'ai_percentage': self.ai_percentage,
+            'characters': self.characters,
+            'seconds': round(self.seconds, 3) if self.seconds is not None else None,
+            'error': self.error,
+            'highlighted_sections': self.result.get('highlighted_sections', []) if self.result else [],
+        }
+        row.update((name, details.get(name)) for name in DETAILS)
+        return row
+
+
+def score_color(ai_percentage):
+    """Background for a score, in the colours of the main window's score bar"""
+    if ai_percentage < 30:
+        return QColor('#dcedc8')
+    if ai_percentage < 70:
+        return QColor('#fff9c4')
+    return QColor('#ffcdd2')
+
+
+class BatchResultsModel(QAbstractTableModel):
+    """Table of batch items for a QTableView.
+
+    The view only asks for the rows on screen, so thousands of files cost
+    no more to show than a screenful; data() is a couple of attribute reads.
+    """
+    HEADERS = ('File', 'Status', 'AI Score', 'Sentence Variety', 'Word Repetition',
+               'Transition Usage', 'Burstiness', 'Characters', 'Seconds')
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.items = []
+
+    def set_items(self, items):
+        self.beginResetModel()
+        self.items = items
+        self.endResetModel()
+
+    def item_changed(self, row):
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.HEADERS) - 1))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.items)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def _value(self, item, column):
+        """Sortable value of a cell: numbers stay numbers"""
+        if column == 0:
+            return item.name
+        if column == 1:
+            return item.status
+        if column == 2:
+            return item.ai_percentage
+        if column <= 6:
+            return item.result.get('details', {}).get(DETAILS[column - 3]) if item.result else None
+        if column == 7:
+            return item.characters
+        return round(item.seconds, 2) if item.seconds is not None else None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        item = self.items[index.row()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            value = self._value(item, column)
+            if value is None:
+                return ''
+            return f"{value}%" if 2 <= column <= 6 else str(value)
+        if role == Qt.UserRole:
+            value = self._value(item, column)
+            return -1 if value is None else value
+        if role == Qt.BackgroundRole and column == 2 and item.ai_percentage is not None:
+            return score_color(item.ai_percentage)
+        if role == Qt.ToolTipRole and column in (0, 1):
+            if item.error:
+                return item.error
+            sections = item.result.get('highlighted_sections') if item.result else None
+            return '\n\n'.join(sections) if sections else item.path
+        if role == Qt.TextAlignmentRole and column >= 2:
+            return Qt.AlignRight | Qt.AlignVCenter
+        return None
+
+
+class BatchReportWriter:
+    """Appends one line per finished file to a CSV or JSONL report, so the
+    report never has to be built in memory and survives an interrupted batch"""
+
+    def __init__(self, path):
+        self.path = path
+        self.jsonl = path.lower().endswith(('.jsonl', '.json'))
+        self.file = open(path, 'w', encoding='utf-8', newline='')
+        if not self.jsonl:
+            self.csv = csv.DictWriter(self.file, fieldnames=REPORT_FIELDS)
+            self.csv.writeheader()
+
+    def write(self, item):
+        row = item.report_row()
+        if self.jsonl:
+            self.file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        else:
+            row['highlighted_sections'] = ' | '.join(row['highlighted_sections'])
+            self.csv.writerow(row)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class BatchWindow(QWidget):
+    """Analyzes every .txt and .pdf file in a folder, a few at a time"""
+
+    def __init__(self, client_factory, parent=None):
+        super().__init__(parent, Qt.Window)
+        # The main window's engine selector, fetched on the GUI thread when a batch starts
+        self.client_factory = client_factory
+        self.client = None
+        self.thread_pool = QThreadPool(self)
+        self.directory = None
+        self.scan_worker = None
+        self.queue = []          # rows waiting for a worker, in reverse order
+        self.running = {}        # worker -> row
+        self.finished_count = 0
+        self.writer = None
+        self.started_at = None
+        self.init_ui()
+
+    def init_ui(self):
+        self.setWindowTitle('AI Content Detector - Batch Analysis')
+        self.resize(1000, 600)
+        layout = QVBoxLayout(self)
+
+        controls = QHBoxLayout()
+        self.folder_label = QLabel("No folder selected")
+        self.folder_label.setStyleSheet("color: #666;")
+        controls.addWidget(self.folder_label, 1)
+        controls.addWidget(QLabel("Concurrent files:"))
+        self.concurrency = QSpinBox()
+        self.concurrency.setRange(1, 32)
+        self.concurrency.setValue(BATCH_CONCURRENCY)
+        controls.addWidget(self.concurrency)
+        self.folder_button = QPushButton('Choose Folder...')
+        self.folder_button.clicked.connect(self.choose_folder)
+        controls.addWidget(self.folder_button)
+        self.start_button = QPushButton('Start')
+        self.start_button.setEnabled(False)
+        self.start_button.clicked.connect(self.start_batch)
+        controls.addWidget(self.start_button)
+        self.cancel_button = QPushButton('Cancel')
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_batch)
+        controls.addWidget(self.cancel_button)
+        layout.addLayout(controls)
+
+        self.model = BatchResultsModel(self)
+        self.proxy = QSortFilterProxyModel(self)
+        self.proxy.setSourceModel(self.model)
+        self.proxy.setSortRole(Qt.UserRole)
+        self.table = QTableView()
+        self.table.setModel(self.proxy)
+        self.table.setSortingEnabled(True)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setAlternatingRowColors(True)
+        self.table.setWordWrap(False)
+        # Fixed row heights and column widths: nothing has to measure every row
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(24)
+        self.table.verticalHeader().hide()
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.Interactive)
+        header.setSectionResizeMode(0, QHeaderView.Stretch)
+        layout.addWidget(self.table, 1)
+
+        status_layout = QHBoxLayout()
+        self.progress = QProgressBar()
+        self.progress.setRange(0, 1)
+        self.progress.setValue(0)
+        status_layout.addWidget(self.progress, 1)
+        self.status = QLabel("Choose a folder of .txt and .pdf files")
+        self.status.setStyleSheet("color: #666; padding: 5px;")
+        status_layout.addWidget(self.status, 2)
+        layout.addLayout(status_layout)
+
+    def choose_folder(self):
+        directory = QFileDialog.getExistingDirectory(self, "Choose Folder")
+        if not directory:
+            return
+        # A large tree takes a while to walk, so the scan runs off the GUI thread
+        worker = Worker(scan_folder, directory)
+        worker.signals.finished.connect(lambda items: self.folder_scanned(directory, items))
+        worker.signals.error.connect(lambda error: self.scan_failed(f"Failed to read folder: {error}"))
+        worker.signals.cancelled.connect(lambda: self.scan_failed(None))
+        self.scan_worker = worker
+        self.folder_button.setEnabled(False)
+        self.start_button.setEnabled(False)
+        self.status.setText(f"Scanning {directory}...")
+        self.thread_pool.start(worker)
+
+    def scan_failed(self, error):
+        self.scan_worker = None
+        self.folder_button.setEnabled(True)
+        self.start_button.setEnabled(bool(self.model.items))
+        self.status.setText(error or "Scan cancelled")
+        if error:
+            QMessageBox.critical(self, "Error", error)
+
+    def folder_scanned(self, directory, items):
+        self.scan_worker = None
+        self.folder_button.setEnabled(True)
+        if not items:
+            self.start_button.setEnabled(bool(self.model.items))
+            self.status.setText("Choose a folder of .txt and .pdf files")
+            QMessageBox.warning(self, "Warning", "No .txt or .pdf files in that folder")
+            return
+        self.directory = directory
+        self.model.set_items(items)
+        self.folder_label.setText(f"{directory} ({len(items)} files)")
+        self.progress.setRange(0, len(items))
+        self.progress.setValue(0)
+        self.start_button.setEnabled(True)
+        self.status.setText(f"{len(items)} files queued")
+
+    def start_batch(self):
+        """Ask where the report goes, then dispatch the files"""
+        report, chosen = QFileDialog.getSaveFileName(
+            self, "Save Batch Report", os.path.join(self.directory, 'ai_detection_report.csv'),
+            "CSV Files (*.csv);;JSON Lines (*.jsonl)")
+        if not report:
+            return
+        if chosen.startswith('JSON') and not report.lower().endswith(('.jsonl', '.json')):
+            report += '.jsonl'
+        try:
+            self.writer = BatchReportWriter(report)
+        except OSError as e:
+            QMessageBox.critical(self, "Error", f"Failed to create report: {str(e)}")
+            return
+
+        items = self.model.items
+        for item in items:
+            item.status, item.result, item.error = QUEUED, None, None
+            item.characters = item.seconds = None
+        self.model.set_items(items)
+        self.client = self.client_factory()
+        # Without the backend, files are scored by the embedded engine, which needs
+        # as many worker processes as files in flight
+        self.client.set_scoring_workers(self.concurrency.value())
+        self.queue = list(reversed(range(len(items))))
+        self.finished_count = 0
+        self.started_at = time.monotonic()
+        self.thread_pool.setMaxThreadCount(self.concurrency.value())
+        self.progress.setValue(0)
+        self.start_button.setEnabled(False)
+        self.folder_button.setEnabled(False)
+        self.concurrency.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        self.dispatch()
+
+    def dispatch(self):
+        """Start files until the concurrency limit is reached"""
+        while self.queue and len(self.running) < self.concurrency.value():
+            row = self.queue.pop()
+            item = self.model.items[row]
+            worker = Worker(analyze_file, self.client, item.path)
+            worker.signals.progress.connect(lambda _, stage, row=row: self.set_status(row, stage))
+            worker.signals.finished.connect(lambda response, worker=worker: self.file_finished(worker, response))
+            worker.signals.error.connect(
+                lambda error, worker=worker: self.file_finished(worker, ({"error": error}, None, None)))
+            worker.signals.cancelled.connect(lambda worker=worker: self.file_finished(worker, None))
+            self.running[worker] = row
+            self.set_status(row, READING)
+            self.thread_pool.start(worker)
+
+    def set_status(self, row, status):
+        self.model.items[row].status = status
+        self.model.item_changed(row)
+
+    def file_finished(self, worker, response):
+        row = self.running.pop(worker)
+        item = self.model.items[row]
+        if response is None:
+            item.status = CANCELLED
+        else:
+            result, item.characters, item.seconds = response
+            if "error" in result:
+                item.status, item.error = FAILED, result["error"]
+            else:
+                item.status, item.result = DONE, result
+        self.model.item_changed(row)
+        if self.writer is not None:
+            self.writer.write(item)
+        self.finished_count += 1
+        self.progress.setValue(self.finished_count)
+        self.show_progress()
+        self.dispatch()
+        if not self.running and not self.queue:
+            self.batch_done()
+
+    def show_progress(self):
+        elapsed = time.monotonic() - self.started_at
+        rate = self.finished_count / elapsed if elapsed else 0
+        self.status.setText(f"{self.finished_count} of {len(self.model.items)} files, "
+                            f"{rate:.1f} files/s, {len(self.running)} in flight")
+
+    def cancel_batch(self):
+        """Skip the queued files and stop the running ones"""
+        for row in self.queue:
+            self.model.items[row].status = CANCELLED
+            if self.writer is not None:
+                self.writer.write(self.model.items[row])
+        self.finished_count += len(self.queue)
+        self.queue = []
+        if self.model.items:
+            self.model.dataChanged.emit(self.model.index(0, 1), self.model.index(len(self.model.items) - 1, 1))
+        for worker in self.running:
+            worker.cancel()
+        self.progress.setValue(self.finished_count)
+        self.status.setText("Cancelling...")
+        if not self.running:
+            self.batch_done()
+
+    def batch_done(self):
+        self.client.set_scoring_workers(1)
+        report = self.writer.path if self.writer else None
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        self.start_button.setEnabled(True)
+        self.folder_button.setEnabled(True)
+        self.concurrency.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+        counts = {}
+        for item in self.model.items:
+            counts[item.status] = counts.get(item.status, 0) + 1
+        summary = ', '.join(f"{count} {status.lower()}" for status, count in counts.items())
+        self.status.setText(f"Batch finished in {time.monotonic() - self.started_at:.1f}s: {summary}"
+                            + (f"; report saved to {os.path.basename(report)}" if report else ""))
+
+    def closeEvent(self, event):
+        """Stop the batch before the window goes away"""
+        if self.scan_worker is not None:
+            self.scan_worker.cancel()
+        if self.running or self.queue:
+            self.cancel_batch()
+        # The main window closes the client right after this, so no worker may still be using it.
+        # Then deliver their last signals, so the batch is wound up and its report closed now
+        self.thread_pool.waitForDone()
+        QCoreApplication.sendPostedEvents()
+        super().closeEvent(event)
@@ -0,0 +1,135 @@
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from backend_client import SessionLost
+
+# Where ai_detector.py and the rest of the backend live
+BACKEND_DIR = os.environ.get(
+    'AI_DETECTOR_BACKEND_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+)
+
+# Live documents of the embedded engine; only ever set inside its worker process
+_live_sessions = None
+
+
+def start_worker(backend_dir):
+    """Runs once in the worker process: make the backend importable and load it"""
+    sys.path.insert(0, backend_dir)
+    import ai_detector  # NumPy and the scoring code load before the first text arrives
+
+
+def ping():
+    return True
+
+
+def detect(text):
+    from ai_detector import detect_ai_content
+    return detect_ai_content(text)
+
+
+def live_update(session, version, start, delete, paragraphs):
+    """Backend live_document.update, with its exceptions turned into a status the GUI process can read"""
+    global _live_sessions
+    from live_document import LiveSessions, UnknownSession, VersionConflict, update
+    if _live_sessions is None:
+        _live_sessions = LiveSessions()
+    try:
+        session, version, result = update(_live_sessions, session, version, start, delete, paragraphs)
+    except (UnknownSession, VersionConflict) as e:
+        return 'lost', str(e)
+    except ValueError as e:
+        return 'invalid', str(e)
+    return 'ok', dict(result, session=session, version=version)
+
+
+class EmbeddedEngine:
+    """Scores texts with the backend's detector in a worker process owned by the GUI.
+
+    No HTTP server, JSON or sockets in between, and it keeps working when the
+    backend is down. The worker is spawned rather than forked, since forking a
+    process with Qt threads running is unsafe, and is restarted if it dies.
+
+    Live documents stay on that one worker. With set_scoring_workers(n > 1),
+    detect() runs on a separate pool of n workers instead, so the batch view
+    can score several files at once.
+    """
+
+    def __init__(self, backend_dir=BACKEND_DIR):
+        self.backend_dir = backend_dir
+        self.executor = None
+        self.scoring_workers = 1
+        self.scoring_executor = None
+        self.lock = threading.Lock()
+
+    def _spawn(self, workers):
+        return ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+            initializer=start_worker, initargs=(self.backend_dir,)
+        )
+
+    def _executor(self, scoring=False):
+        with self.lock:
+            if scoring and self.scoring_workers > 1:
+                if self.scoring_executor is None:
+                    self.scoring_executor = self._spawn(self.scoring_workers)
+                return self.scoring_executor
+            if self.executor is None:
+                self.executor = self._spawn(1)
+            return self.executor
+
+    def _run(self, func, *args, scoring=False):
+        executor = self._executor(scoring)
+        try:
+            return executor.submit(func, *args).result()
+        except BrokenProcessPool:
+            with self.lock:
+                if self.executor is executor:
+                    self.executor = None
+                if self.scoring_executor is executor:
+                    self.scoring_executor = None
+            raise
+
+    def set_scoring_workers(self, workers):
+        """Score up to workers texts at once; 1 scores them one at a time on the live-document worker"""
+        with self.lock:
+            if workers == self.scoring_workers:
+                return
+            self.scoring_workers = workers
+            previous, self.scoring_executor = self.scoring_executor, None
+        if previous is not None:
+            # Texts already submitted still finish
+            previous.shutdown(wait=False)
+
+    def start(self):
+        """Start the worker process now, so the first text does not wait for it"""
+        try:
+            self._run(ping)
+        except Exception:
+            pass  # The next detect() or live_update() reports what went wrong
+
+    def detect(self, text):
+        try:
+            return self._run(detect, text, scoring=True)
+        except Exception as e:
+            return {"error": f"Embedded engine failed: {str(e)}"}
+
+    def live_update(self, session, version, start, delete, paragraphs):
+        """Same contract as BackendClient.live_update; raises RuntimeError if the worker died"""
+        status, value = self._run(live_update, session, version, start, delete, paragraphs)
+        if status == 'lost':
+            raise SessionLost(value)
+        if status == 'invalid':
+            raise ValueError(value)
+        return value
+
+    def close(self):
+        with self.lock:
+            for executor in (self.executor, self.scoring_executor):
+                if executor is not None:
+                    executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = self.scoring_executor = None
@@ -0,0 +1,156 @@
+import os
+import threading
+import time
+import requests
+from backend_client import BackendClient, SessionLost
+
+# 'auto' uses the backend when it answers and the embedded engine otherwise;
+# 'backend' and 'embedded' always use that one
+ENGINE_MODE = os.environ.get('AI_DETECTOR_ENGINE', 'auto')
+# How long /api/health may take before the backend counts as unreachable
+HEALTH_TIMEOUT = float(os.environ.get('AI_DETECTOR_HEALTH_TIMEOUT', 1.0))
+# While on the embedded engine, how often to check whether the backend is back
+RECHECK_SECONDS = float(os.environ.get('AI_DETECTOR_RECHECK_SECONDS', 30))
+
+BACKEND = 'backend'
+EMBEDDED = 'embedded'
+
+
+class EngineSelector:
+    """Sends work to the HTTP backend when /api/health answers, and to an
+    embedded in-process engine when it does not, or stops answering.
+
+    Offers detect() and live_update() like BackendClient, and keeps the last
+    latency of each engine for display.
+    """
+
+    def __init__(self, base_url=None, mode=ENGINE_MODE):
+        self.mode = mode
+        self.remote = BackendClient(base_url) if base_url else BackendClient()
+        self.embedded = None
+        self.active = None
+        self.checked_at = 0.0
+        self.latency = {}  # engine name -> seconds taken by the last call
+        self.health_latency = None
+        self.scoring_workers = 1
+        self.checking = False
+        self.lock = threading.Lock()
+        self.checked = threading.Condition(self.lock)
+
+    def _embedded(self):
+        # Under the lock: the batch view calls in from many threads at once, and
+        # every extra engine would spawn (and leak) a worker process
+        with self.lock:
+            if self.embedded is None:
+                from embedded_engine import EmbeddedEngine
+                self.embedded = EmbeddedEngine()
+                self.embedded.set_scoring_workers(self.scoring_workers)
+            return self.embedded
+
+    def set_scoring_workers(self, workers):
+        """How many texts the embedded engine may score at once (the batch view's concurrency)"""
+        with self.lock:
+            self.scoring_workers = workers
+            embedded = self.embedded
+        if embedded is not None:
+            embedded.set_scoring_workers(workers)
+
+    def select(self):
+        """Name of the engine to use, checking the backend's health when due"""
+        with self.lock:
+            check = not self.checking and (self.active is None or (
+                self.active == EMBEDDED and self.mode == 'auto' and
+                time.monotonic() - self.checked_at >= RECHECK_SECONDS
+            ))
+            if check and self.mode == EMBEDDED:
+                self.active, check = EMBEDDED, False
+            if check:
+                # Claimed before the lock is released, so one thread checks and the rest carry on
+                self.checking = True
+                self.checked_at = time.monotonic()
+        if check:
+            # The health check can take HEALTH_TIMEOUT, so it runs outside the lock
+            latency = None
+            try:
+                latency = self.remote.health(HEALTH_TIMEOUT)
+            finally:
+                with self.lock:
+                    self.health_latency = latency
+                    self.active = BACKEND if latency is not None or self.mode == BACKEND else EMBEDDED
+                    self.checking = False
+                    self.checked.notify_all()
+        with self.lock:
+            # Only the very first check leaves no engine to use in the meantime
+            while self.active is None:
+                self.checked.wait()
+            engine = self.active
+        if engine == EMBEDDED:
+            self._embedded().start()
+        return engine
+
+    def _backend_lost(self):
+        """True, after switching to the embedded engine, when falling back is allowed"""
+        if self.mode != 'auto':
+            return False
+        with self.lock:
+            self.active = EMBEDDED
+            self.checked_at = time.monotonic()
+            self.health_latency = None
+        return True
+
+    def _timed(self, engine, call):
+        started = time.perf_counter()
+        try:
+            return call()
+        finally:
+            self.latency[engine] = time.perf_counter() - started
+
+    def detect(self, text, progress=None, cancelled=None):
+        """Score a text on the selected engine; progress and cancelled as for BackendClient.analyze"""
+        if self.select() == EMBEDDED:
+            return self._timed(EMBEDDED, lambda: self._embedded().detect(text))
+        try:
+            return self._timed(BACKEND, lambda: self.remote.analyze(text, progress, cancelled))
+        except requests.ConnectionError as e:
+            if self._backend_lost():
+                return self.detect(text)
+            return {"error": f"Failed to connect to backend: {str(e)}"}
+        except requests.RequestException as e:
+            return {"error": f"Failed to connect to backend: {str(e)}"}
+        except ValueError as e:
+            return {"error": f"Invalid response from backend: {str(e)}"}
+
+    def live_update(self, session, version, start, delete, paragraphs):
+        """BackendClient.live_update on the selected engine"""
+        if self.select() == EMBEDDED:
+            return self._timed(EMBEDDED, lambda: self._embedded().live_update(
+                session, version, start, delete, paragraphs))
+        try:
+            return self._timed(BACKEND, lambda: self.remote.live_update(
+                session, version, start, delete, paragraphs))
+        except requests.ConnectionError:
+            if self._backend_lost():
+                # The session lives on the backend, so the embedded engine needs the whole document
+                raise SessionLost("Backend unreachable, switched to the embedded engine")
+            raise
+
+    def describe(self):
+        """One line for the status bar: the engine in use and the latency of each"""
+        if self.active is None:
+            return "Engine: checking backend..."
+        if self.active == BACKEND:
+            status = f"Engine: backend at {self.remote.base_url}"
+        elif self.mode == EMBEDDED:
+            status = "Engine: embedded"
+        else:
+            status = "Engine: embedded (backend unreachable)"
+        timings = [f"{name} {self.latency[name] * 1000:.0f} ms" for name in (BACKEND, EMBEDDED)
+                   if name in self.latency]
+        if self.health_latency is not None:
+            timings.append(f"health check {self.health_latency * 1000:.0f} ms")
+        return status + (" | last " + ", ".join(timings) if timings else "")
+
+    def close(self):
+        self.remote.close()
+        if self.embedded is not None:
+            self.embedded.close()
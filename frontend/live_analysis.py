@@ -0,0 +1,83 @@
+import re
+import time
+import requests
+from backend_client import SessionLost
+
+# A paragraph ends at terminal punctuation followed by a line break. Splitting
+# right after the punctuation never cuts a sentence in two, and leaves the
+# whitespace in front of the next sentence where transition matching sees it,
+# so the backend can add up per-paragraph statistics and still get the score
+# of the whole text.
+PARAGRAPH_END_RE = re.compile(r'[.!?](?=\s*\n)')
+
+
+def split_paragraphs(text):
+    paragraphs = []
+    start = 0
+    for match in PARAGRAPH_END_RE.finditer(text):
+        paragraphs.append(text[start:match.end()])
+        start = match.end()
+    if start < len(text):
+        paragraphs.append(text[start:])
+    return paragraphs
+
+
+def diff_paragraphs(old, new):
+    """(start, delete, insert): replacing old[start:start + delete] with insert gives new"""
+    limit = min(len(old), len(new))
+    prefix = 0
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    return prefix, len(old) - prefix - suffix, new[prefix:len(new) - suffix]
+
+
+class LiveSession:
+    """Keeps the backend's copy of an edited document in step, sending only changed paragraphs.
+
+    Not thread-safe: run one update at a time.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.session = None
+        self.version = None
+        self.paragraphs = []
+        self.last_rescored = 0
+        self.last_elapsed = 0.0
+
+    def update(self, text):
+        """Score the text, sending the backend only what changed since the last update"""
+        started = time.perf_counter()
+        paragraphs = split_paragraphs(text)
+        try:
+            try:
+                start, delete, insert = diff_paragraphs(self.paragraphs, paragraphs)
+                response = self.client.live_update(self.session, self.version, start, delete, insert)
+            except SessionLost:
+                # The engine dropped our session, missed an update or is another engine: send everything again
+                self.session = self.version = None
+                start, delete, insert = 0, 0, paragraphs
+                response = self.client.live_update(None, None, 0, 0, insert)
+        except requests.RequestException as e:
+            self.session = self.version = None
+            self.paragraphs = []
+            return {"error": f"Failed to connect to backend: {str(e)}"}
+        except ValueError as e:
+            self.session = self.version = None
+            self.paragraphs = []
+            return {"error": f"Invalid response from backend: {str(e)}"}
+        except RuntimeError as e:
+            # The embedded engine's worker process died; it is restarted on the next update
+            self.session = self.version = None
+            self.paragraphs = []
+            return {"error": f"Embedded engine failed: {str(e)}"}
+
+        self.session = response.pop('session', None)
+        self.version = response.pop('version', None)
+        self.paragraphs = paragraphs
+        self.last_rescored = len(insert)
+        self.last_elapsed = time.perf_counter() - started
+        return response
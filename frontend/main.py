@@ -4,13 +4,14 @@ import json
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QPushButton, QTextEdit, QLabel, 
     QFileDialog, QMessageBox, QProgressBar, QHBoxLayout, QFrame, 
-    QSplitter, QGridLayout, QGroupBox, QTabWidget, QScrollArea
+    QSplitter, QGridLayout, QGroupBox, QTabWidget, QScrollArea, QCheckBox
 )
-from PyQt5.QtCore import Qt, QSize, QPropertyAnimation, QEasingCurve
+from PyQt5.QtCore import Qt, QSize, QPropertyAnimation, QEasingCurve, QThreadPool, QTimer
 from PyQt5.QtGui import QFont, QColor, QPalette, QIcon, QTextCharFormat, QTextCursor
-import requests
-import pdfplumber
-import qdarkstyle
+from workers import Worker
+
+# Live mode waits for this long a pause in typing before rescoring
+LIVE_DEBOUNCE_MS = 400
 
 class ModernButton(QPushButton):
     def __init__(self, text, icon_path=None):
@@ -37,11 +38,70 @@ class ModernButton(QPushButton):
             }
         """)
 
+def extract_pdf_text(worker, file_name):
+    """Stream the PDF's pages to the GUI in order as they are extracted"""
+    from pdf_ingest import iter_pdf_pages
+    for index, total, text in iter_pdf_pages(file_name, cancelled=lambda: worker.is_cancelled):
+        worker.emit_partial(text)
+        worker.report(int((index + 1) * 100 / total), f"page {index + 1}/{total}")
+    worker.check_cancelled()
+
+def preload_modules(worker):
+    import engine_selector
+    import live_analysis
+    import pdf_ingest
+
 class AIDetectorApp(QWidget):
     def __init__(self):
         super().__init__()
+        self.thread_pool = QThreadPool.globalInstance()
+        self._client = None
+        self.workers = set()  # keeps running workers alive until they report back
+        self.pdf_worker = None
+        self.analysis_worker = None
+        self._live_session = None
+        self.live_worker = None
+        self.live_pending = False  # the text changed while a live update was running
+        self.live_timer = QTimer(self)
+        self.live_timer.setSingleShot(True)
+        self.live_timer.setInterval(LIVE_DEBOUNCE_MS)
+        self.live_timer.timeout.connect(self.live_update)
+        self.batch_window = None
         self.init_ui()
         self.last_result = None
+        # Once the window is up, load what the first analysis or PDF will need
+        QTimer.singleShot(0, self.preload)
+    
+    @property
+    def client(self):
+        # requests takes a noticeable part of startup, so it is imported on first use
+        if self._client is None:
+            from engine_selector import EngineSelector
+            self._client = EngineSelector()
+        return self._client
+    
+    @property
+    def live_session(self):
+        if self._live_session is None:
+            from live_analysis import LiveSession
+            self._live_session = LiveSession(self.client)
+        return self._live_session
+    
+    def preload(self):
+        """Import the heavy modules on the thread pool while the user is still reading the window"""
+        worker = Worker(preload_modules)
+        worker.signals.finished.connect(lambda _: self.select_engine())
+        self.start_worker(worker)
+    
+    def select_engine(self):
+        """Check for the backend in the background, starting the embedded engine if it is down"""
+        client = self.client
+        worker = Worker(lambda worker: client.select())
+        worker.signals.finished.connect(lambda _: self.show_engine_status())
+        self.start_worker(worker)
+    
+    def show_engine_status(self):
+        self.engine_status.setText(self.client.describe())
         
     def init_ui(self):
         self.setWindowTitle('AI Content Detector')
@@ -92,7 +152,7 @@ class AIDetectorApp(QWidget):
         main_layout.addWidget(description)
         
         # Content area
-        content_splitter = QSplitter(Qt.Horizontal)
+        self.content_splitter = content_splitter = QSplitter(Qt.Horizontal)
         
         # Left panel - Text input
         left_panel = QWidget()
@@ -121,8 +181,14 @@ class AIDetectorApp(QWidget):
         self.text_edit = QTextEdit()
         self.text_edit.setPlaceholderText('Enter text or upload a PDF...')
         self.text_edit.setMinimumHeight(300)
+        self.text_edit.textChanged.connect(self.text_changed)
         input_layout.addWidget(self.text_edit)
         
+        # Live mode rescores the changed paragraphs as the user types
+        self.live_checkbox = QCheckBox('Live analysis while typing')
+        self.live_checkbox.toggled.connect(self.live_toggled)
+        input_layout.addWidget(self.live_checkbox)
+        
         # Buttons layout
         buttons_layout = QHBoxLayout()
         
@@ -131,6 +197,11 @@ class AIDetectorApp(QWidget):
         self.upload_button.clicked.connect(self.upload_pdf)
         buttons_layout.addWidget(self.upload_button)
         
+        # Batch Button: every file in a folder, in a window of its own
+        self.batch_button = ModernButton('Analyze Folder')
+        self.batch_button.clicked.connect(self.open_batch)
+        buttons_layout.addWidget(self.batch_button)
+        
         # Detect AI Content Button
         self.detect_button = ModernButton('Detect AI Content')
         self.detect_button.setStyleSheet("""
@@ -150,6 +221,29 @@ class AIDetectorApp(QWidget):
         self.detect_button.clicked.connect(self.detect_ai)
         buttons_layout.addWidget(self.detect_button)
         
+        # Cancel Button (only enabled while an analysis is running)
+        self.cancel_button = ModernButton('Cancel')
+        self.cancel_button.setStyleSheet("""
+            QPushButton {
+                background-color: #9e9e9e;
+                color: white;
+                border-radius: 5px;
+                padding: 8px 16px;
+            }
+            QPushButton:hover {
+                background-color: #8e8e8e;
+            }
+            QPushButton:pressed {
+                background-color: #7e7e7e;
+            }
+            QPushButton:disabled {
+                background-color: #cfcfcf;
+            }
+        """)
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_analysis)
+        buttons_layout.addWidget(self.cancel_button)
+        
         # Clear Button
         self.clear_button = ModernButton('Clear')
         self.clear_button.setStyleSheet("""
@@ -172,7 +266,37 @@ class AIDetectorApp(QWidget):
         input_layout.addLayout(buttons_layout)
         left_layout.addWidget(input_group)
         
-        # Right panel - Results
+        # Right panel - Results, built the first time there is something to show
+        self.results_panel = None
+        self.results_placeholder = QLabel("Waiting for analysis...")
+        self.results_placeholder.setAlignment(Qt.AlignCenter)
+        self.results_placeholder.setStyleSheet("color: #666;")
+        
+        # Add panels to splitter
+        content_splitter.addWidget(left_panel)
+        content_splitter.addWidget(self.results_placeholder)
+        content_splitter.setSizes([450, 450])
+        
+        main_layout.addWidget(content_splitter)
+        
+        # Status bar
+        status_layout = QHBoxLayout()
+        self.status_bar = QLabel("Ready")
+        self.status_bar.setStyleSheet("color: #666; padding: 5px; border-top: 1px solid #ccc;")
+        status_layout.addWidget(self.status_bar, 1)
+        
+        # Which engine scores the text (backend or embedded) and how fast each answered
+        self.engine_status = QLabel("Engine: checking backend...")
+        self.engine_status.setStyleSheet("color: #666; padding: 5px; border-top: 1px solid #ccc;")
+        status_layout.addWidget(self.engine_status)
+        main_layout.addLayout(status_layout)
+        
+        self.setLayout(main_layout)
+        
+    def ensure_results_panel(self):
+        """Build the results panel in place of its placeholder, once"""
+        if self.results_panel is not None:
+            return
         right_panel = QWidget()
         right_layout = QVBoxLayout(right_panel)
         right_layout.setContentsMargins(10, 0, 0, 0)
@@ -271,49 +395,128 @@ class AIDetectorApp(QWidget):
         
         right_layout.addWidget(results_group)
         
-        # Add panels to splitter
-        content_splitter.addWidget(left_panel)
-        content_splitter.addWidget(right_panel)
-        content_splitter.setSizes([450, 450])
-        
-        main_layout.addWidget(content_splitter)
-        
-        # Status bar
-        self.status_bar = QLabel("Ready")
-        self.status_bar.setStyleSheet("color: #666; padding: 5px; border-top: 1px solid #ccc;")
-        main_layout.addWidget(self.status_bar)
-        
-        self.setLayout(main_layout)
+        self.results_panel = right_panel
+        sizes = self.content_splitter.sizes()
+        self.content_splitter.replaceWidget(1, right_panel)
+        self.content_splitter.setSizes(sizes)
+        self.results_placeholder.deleteLater()
+        self.results_placeholder = None
         
     def upload_pdf(self):
         """Upload and extract text from a PDF file"""
         file_name, _ = QFileDialog.getOpenFileName(self, "Open PDF", "", "PDF Files (*.pdf)")
         if file_name:
-            try:
-                self.status_bar.setText(f"Loading PDF: {os.path.basename(file_name)}...")
-                QApplication.processEvents()
-                
-                with pdfplumber.open(file_name) as pdf:
-                    text = ""
-                    for page in pdf.pages:
-                        text += page.extract_text() or ""
-                    self.text_edit.setPlainText(text)
-                
-                self.status_bar.setText(f"PDF loaded: {os.path.basename(file_name)}")
-            except Exception as e:
-                self.status_bar.setText("Error loading PDF")
-                QMessageBox.critical(self, "Error", f"Failed to read PDF: {str(e)}")
+            base_name = os.path.basename(file_name)
+            self.status_bar.setText(f"Loading PDF: {base_name}...")
+            self.upload_button.setEnabled(False)
+            self.cancel_button.setEnabled(True)
+            self.text_edit.clear()
+            self.text_edit.setReadOnly(True)
+            
+            # Extraction runs on the thread pool so the window stays responsive;
+            # pages are appended to the text box as they arrive
+            worker = Worker(extract_pdf_text, file_name)
+            worker.signals.progress.connect(
+                lambda percent, message: self.status_bar.setText(f"Loading PDF: {base_name} ({message})"))
+            worker.signals.partial.connect(self.append_pdf_text)
+            worker.signals.finished.connect(lambda _: self.pdf_loaded(base_name))
+            worker.signals.error.connect(self.pdf_failed)
+            worker.signals.cancelled.connect(self.pdf_finished)
+            self.pdf_worker = worker
+            self.start_worker(worker)
+    
+    def open_batch(self):
+        """Show the batch window, which analyzes a whole folder of files"""
+        if self.batch_window is None:
+            from batch_analysis import BatchWindow
+            self.batch_window = BatchWindow(lambda: self.client)
+        self.batch_window.show()
+        self.batch_window.raise_()
+        self.batch_window.activateWindow()
+    
+    def append_pdf_text(self, text):
+        cursor = QTextCursor(self.text_edit.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+    
+    def pdf_loaded(self, base_name):
+        self.status_bar.setText(f"PDF loaded: {base_name}")
+        self.pdf_finished()
+    
+    def pdf_failed(self, error):
+        self.status_bar.setText("Error loading PDF")
+        self.pdf_finished()
+        QMessageBox.critical(self, "Error", f"Failed to read PDF: {error}")
+    
+    def pdf_finished(self):
+        self.pdf_worker = None
+        self.text_edit.setReadOnly(False)
+        self.upload_button.setEnabled(True)
+        self.cancel_button.setEnabled(self.analysis_worker is not None)
+        if self.live_checkbox.isChecked():
+            self.live_timer.start()
+    
+    def text_changed(self):
+        # Pages streaming in from a PDF are scored once the whole file is loaded
+        if self.live_checkbox.isChecked() and self.pdf_worker is None:
+            self.live_timer.start()
+    
+    def live_toggled(self, enabled):
+        if enabled:
+            self.live_timer.start()
+        else:
+            self.live_timer.stop()
+            self.live_pending = False
+    
+    def live_update(self):
+        """Send the paragraphs changed since the last live update"""
+        if self.live_worker is not None:
+            # One update at a time; the newest text goes as soon as this one is back
+            self.live_pending = True
+            return
+        text = self.text_edit.toPlainText().strip()
+        if not text:
+            return
+        
+        session = self.live_session  # created here on the GUI thread, not by the worker
+        worker = Worker(lambda worker: session.update(text))
+        worker.signals.finished.connect(lambda response: self.live_finished(worker, response))
+        worker.signals.error.connect(lambda error: self.live_finished(worker, {"error": error}))
+        self.live_worker = worker
+        self.start_worker(worker)
+    
+    def live_finished(self, worker, response):
+        if worker is not self.live_worker:
+            return
+        self.live_worker = None
+        self.show_engine_status()
+        if not self.live_checkbox.isChecked():
+            return
+        if self.live_pending:
+            self.live_pending = False
+            self.live_update()
+        if "error" in response:
+            # No dialogs while typing; the button still reports errors properly
+            self.status_bar.setText(f"Live analysis failed: {response['error']}")
+            return
+        self.last_result = response
+        self.update_results(response)
+        session = self.live_session
+        self.status_bar.setText(
+            f"Live analysis: {session.last_rescored} of {len(session.paragraphs)} paragraphs "
+            f"rescored in {session.last_elapsed * 1000:.0f} ms")
     
     def clear_text(self):
         """Clear the text input and reset results"""
         self.text_edit.clear()
-        self.progress_bar.setValue(0)
-        self.sentence_variety_bar.setValue(0)
-        self.word_repetition_bar.setValue(0)
-        self.transition_usage_bar.setValue(0)
-        self.burstiness_bar.setValue(0)
-        self.highlighted_sections.clear()
-        self.score_interpretation.setText("Waiting for analysis...")
+        if self.results_panel is not None:
+            self.progress_bar.setValue(0)
+            self.sentence_variety_bar.setValue(0)
+            self.word_repetition_bar.setValue(0)
+            self.transition_usage_bar.setValue(0)
+            self.burstiness_bar.setValue(0)
+            self.highlighted_sections.clear()
+            self.score_interpretation.setText("Waiting for analysis...")
         self.status_bar.setText("Ready")
         self.last_result = None
 
@@ -325,9 +528,37 @@ class AIDetectorApp(QWidget):
             return
         
         self.status_bar.setText("Analyzing text...")
-        QApplication.processEvents()
-        
-        response = self.send_to_backend(text)
+        self.detect_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        
+        # The request runs on the thread pool; results come back through signals
+        client = self.client  # created here on the GUI thread, not by the worker
+        # Long texts run as backend jobs, which report progress and can be cancelled there
+        worker = Worker(lambda worker: client.detect(
+            text, progress=worker.report, cancelled=lambda: worker.is_cancelled))
+        worker.signals.progress.connect(lambda percent, stage: self.analysis_progress(worker, percent, stage))
+        worker.signals.finished.connect(lambda response: self.analysis_finished(worker, response))
+        worker.signals.error.connect(lambda error: self.analysis_finished(worker, {"error": error}))
+        self.analysis_worker = worker
+        self.start_worker(worker)
+
+    def start_worker(self, worker):
+        """Run a worker on the thread pool, holding on to it until it is done"""
+        self.workers.add(worker)
+        for signal in (worker.signals.finished, worker.signals.error, worker.signals.cancelled):
+            signal.connect(lambda *_: self.workers.discard(worker))
+        self.thread_pool.start(worker)
+
+    def analysis_progress(self, worker, percent, stage):
+        if worker is self.analysis_worker:
+            self.status_bar.setText(f"Analyzing text... {percent}% ({stage})")
+
+    def analysis_finished(self, worker, response):
+        """Show the backend's answer once the analysis worker is done"""
+        if worker is not self.analysis_worker:
+            return
+        self.analysis_done()
+        self.show_engine_status()
         if response:
             if "error" in response:
                 self.status_bar.setText("Error in analysis")
@@ -337,18 +568,26 @@ class AIDetectorApp(QWidget):
                 self.update_results(response)
                 self.status_bar.setText("Analysis complete")
 
-    def send_to_backend(self, text):
-        """Send text to the backend API for AI detection"""
-        try:
-            url = "http://localhost:5000/api/detect_ai"
-            response = requests.post(url, json={"text": text}, timeout=30)
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
-            return {"error": f"Failed to connect to backend: {str(e)}"}
+    def cancel_analysis(self):
+        """Cancel the running analysis or PDF load"""
+        if self.pdf_worker:
+            # Extraction stops at the next page and reports back as cancelled
+            self.pdf_worker.cancel()
+            self.status_bar.setText("PDF loading cancelled")
+        if self.analysis_worker:
+            # Don't wait for the request to return; its result will be dropped
+            self.analysis_worker.cancel()
+            self.analysis_done()
+            self.status_bar.setText("Analysis cancelled")
+
+    def analysis_done(self):
+        self.analysis_worker = None
+        self.detect_button.setEnabled(True)
+        self.cancel_button.setEnabled(self.pdf_worker is not None)
 
     def update_results(self, result):
         """Update the UI with detection results"""
+        self.ensure_results_panel()
         ai_percentage = result.get('ai_percentage', 0)
         
         # Animate progress bar
@@ -457,13 +696,34 @@ class AIDetectorApp(QWidget):
                 self.status_bar.setText("Error saving report")
                 QMessageBox.critical(self, "Error", f"Failed to save report: {str(e)}")
 
+    def closeEvent(self, event):
+        """Stop background work before the window goes away"""
+        self.live_timer.stop()
+        for worker in (self.pdf_worker, self.analysis_worker, self.live_worker):
+            if worker:
+                worker.cancel()
+        if self.batch_window is not None:
+            self.batch_window.close()
+        if self._client is not None:
+            self._client.close()
+        super().closeEvent(event)
+
 if __name__ == '__main__':
+    if '--startup-timing' in sys.argv:
+        # Runs the GUI in a child process and reports how long it took to first paint
+        from startup_timing import report
+        sys.exit(report(sys.argv[1:]))
+    
     app = QApplication(sys.argv)
     
-    # Apply dark style if preferred
-    # Uncomment the next line to use dark mode
-    # app.setStyleSheet(qdarkstyle.load_stylesheet_pyqt5())
+    # Dark style on request; qdarkstyle is only imported when it is used
+    if '--dark' in sys.argv:
+        import qdarkstyle
+        app.setStyleSheet(qdarkstyle.load_stylesheet_pyqt5())
     
     window = AIDetectorApp()
+    if '--startup-probe' in sys.argv:
+        from startup_timing import FirstPaintProbe
+        window.installEventFilter(FirstPaintProbe(window))
     window.show()
     sys.exit(app.exec_())
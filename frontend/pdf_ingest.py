@@ -0,0 +1,145 @@
+import hashlib
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import pdfplumber
+
+CACHE_DIR = os.environ.get(
+    'AI_DETECTOR_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'ai_content_detector')
+)
+# Smallest number of pages handed to a worker process at a time; each batch
+# opens the PDF once, so batches grow with the document
+BATCH_SIZE = 8
+# Below this many uncached pages, starting worker processes costs more than it saves
+PARALLEL_THRESHOLD = 16
+
+
+def file_digest(path):
+    """SHA-256 of the file contents, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class PageCache:
+    """Extracted page texts on disk, keyed by file content hash and page index"""
+
+    def __init__(self, digest, root=CACHE_DIR):
+        self.directory = os.path.join(root, 'pdf_pages', digest)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _write(self, name, content):
+        os.makedirs(self.directory, exist_ok=True)
+        # A temporary file of its own: two windows may be caching the same PDF
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, prefix=name, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'w', encoding='utf-8', newline='') as file:
+                file.write(content)
+            os.replace(temporary, self._path(name))
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    def page_count(self):
+        try:
+            with open(self._path('pages'), encoding='utf-8') as file:
+                return int(file.read())
+        except (OSError, ValueError):
+            return None
+
+    def set_page_count(self, count):
+        try:
+            self._write('pages', str(count))
+        except OSError:
+            pass  # The cache is only an optimisation
+
+    def get(self, index):
+        try:
+            with open(self._path(f'{index}.txt'), encoding='utf-8', newline='') as file:
+                return file.read()
+        except OSError:
+            return None
+
+    def put(self, index, text):
+        try:
+            self._write(f'{index}.txt', text)
+        except OSError:
+            pass  # The cache is only an optimisation
+
+
+def extract_pages(path, indices):
+    """Extract the given pages of a PDF; runs inside a worker process"""
+    with pdfplumber.open(path) as pdf:
+        return [(index, pdf.pages[index].extract_text() or "") for index in indices]
+
+
+def iter_pdf_pages(path, workers=None, cancelled=lambda: False):
+    """Yield (index, page_count, text) for every page of a PDF, in page order.
+
+    Cached pages are returned straight from disk. The rest are extracted in
+    parallel across a process pool and yielded as soon as every earlier page
+    is available.
+    """
+    cache = PageCache(file_digest(path))
+    total = cache.page_count()
+    if total is None:
+        with pdfplumber.open(path) as pdf:
+            total = len(pdf.pages)
+        cache.set_page_count(total)
+
+    pages = {}
+    missing = []
+    for index in range(total):
+        text = cache.get(index)
+        if text is None:
+            missing.append(index)
+        else:
+            pages[index] = text
+
+    next_index = 0
+
+    def ready():
+        nonlocal next_index
+        while next_index in pages:
+            yield next_index, total, pages.pop(next_index)
+            next_index += 1
+
+    workers = workers or os.cpu_count() or 1
+    if len(missing) < PARALLEL_THRESHOLD or workers == 1:
+        yield from ready()
+        if missing:
+            with pdfplumber.open(path) as pdf:
+                for index in missing:
+                    if cancelled():
+                        return
+                    text = pdf.pages[index].extract_text() or ""
+                    cache.put(index, text)
+                    pages[index] = text
+                    yield from ready()
+        return
+
+    # About four batches per worker keeps every process busy while pages still
+    # arrive roughly in order
+    batch_size = max(BATCH_SIZE, -(-len(missing) // (workers * 4)))
+    batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+    # Spawned, not forked: this runs on a Qt worker thread, and forking a process
+    # with live Qt threads can deadlock the child
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        pending = {executor.submit(extract_pages, path, batch) for batch in batches}
+        yield from ready()
+        while pending and not cancelled():
+            done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            for future in done:
+                for index, text in future.result():
+                    cache.put(index, text)
+                    pages[index] = text
+            yield from ready()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
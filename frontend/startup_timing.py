@@ -0,0 +1,103 @@
+"""Measure how long the GUI takes to start.
+
+    python main.py --startup-timing [--runs N] [--budget-ms MS]
+
+Starts the GUI in a child process under `python -X importtime`, stops it at
+the first paint of the main window and reports the time from process start to
+first paint and what each module imported before then cost. Exits with status
+1 when the median time to first paint is over the budget.
+"""
+import json
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+
+from PyQt5.QtCore import QObject, QEvent, QThreadPool, QTimer
+from PyQt5.QtWidgets import QApplication
+
+# Time to first paint we aim for, from process start, in milliseconds
+STARTUP_BUDGET_MS = float(os.environ.get('STARTUP_BUDGET_MS', 500))
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+FIRST_PAINT_MARKER = 'startup-probe: first paint'
+# "import time: self [us] | cumulative | imported package", nested imports indented
+IMPORT_LINE_RE = re.compile(r'import time:\s+\d+ \|\s+(\d+) \|( +)(\S+)')
+
+
+class FirstPaintProbe(QObject):
+    """Event filter that reports the first paint of a window and quits the application"""
+
+    def __init__(self, window):
+        super().__init__(window)
+        self.window = window
+
+    def eventFilter(self, watched, event):
+        if watched is self.window and event.type() == QEvent.Paint:
+            self.window.removeEventFilter(self)
+            print(json.dumps({'first_paint': time.time()}), flush=True)
+            print(FIRST_PAINT_MARKER, file=sys.stderr, flush=True)
+            QTimer.singleShot(0, self.quit)
+        return False
+
+    def quit(self):
+        # Let modules still being preloaded finish importing before the interpreter exits
+        QThreadPool.globalInstance().waitForDone()
+        QApplication.quit()
+
+
+def top_level_imports(stderr):
+    """Cumulative microseconds per top-level module imported before the first paint"""
+    costs = defaultdict(int)
+    for line in stderr.splitlines():
+        if line.startswith(FIRST_PAINT_MARKER):
+            break
+        match = IMPORT_LINE_RE.match(line)
+        if match and len(match.group(2)) == 1:
+            costs[match.group(3)] += int(match.group(1))
+    return costs
+
+
+def measure():
+    """(milliseconds to first paint, {module: import microseconds}) for one cold start"""
+    # Imported here rather than at the top, where they would count against the probed GUI
+    import subprocess
+    started = time.time()
+    child = subprocess.run([sys.executable, '-X', 'importtime', MAIN, '--startup-probe'],
+                           capture_output=True, text=True, timeout=120)
+    lines = [line for line in child.stdout.splitlines() if line.startswith('{')]
+    if child.returncode != 0 or not lines:
+        raise RuntimeError(f"GUI did not start: {child.stderr.strip()[-2000:]}")
+    first_paint = json.loads(lines[-1])['first_paint']
+    return (first_paint - started) * 1000, top_level_imports(child.stderr)
+
+
+def report(argv=None):
+    import argparse
+    import statistics
+    parser = argparse.ArgumentParser(description="Measure GUI startup time")
+    parser.add_argument('--startup-timing', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--runs', type=int, default=3, help="cold starts to take the median of")
+    parser.add_argument('--budget-ms', type=float, default=STARTUP_BUDGET_MS,
+                        help="time to first paint to aim for")
+    parser.add_argument('--top', type=int, default=15, help="modules to list")
+    args = parser.parse_args(argv)
+
+    runs = [measure() for _ in range(args.runs)]
+    first_paint = statistics.median(ms for ms, _ in runs)
+    imports = defaultdict(list)
+    for _, costs in runs:
+        for module, us in costs.items():
+            imports[module].append(us)
+    medians = {module: statistics.median(values) / 1000 for module, values in imports.items()}
+
+    print(f"Time to first paint: {first_paint:.0f} ms (median of {args.runs}; "
+          f"runs {', '.join(f'{ms:.0f}' for ms, _ in runs)} ms)")
+    print(f"Budget: {args.budget_ms:.0f} ms")
+    print(f"Imports before first paint: {sum(medians.values()):.0f} ms")
+    for module, ms in sorted(medians.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {ms:8.1f} ms  {module}")
+    if first_paint > args.budget_ms:
+        print(f"Over budget by {first_paint - args.budget_ms:.0f} ms")
+        return 1
+    return 0
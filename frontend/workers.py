@@ -0,0 +1,68 @@
+import threading
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+
+class Cancelled(Exception):
+    """Raised inside a task when the user cancelled it"""
+
+
+class WorkerSignals(QObject):
+    progress = pyqtSignal(int, str)   # percent (or -1 if unknown), message
+    partial = pyqtSignal(object)      # a piece of the result, for tasks that stream
+    finished = pyqtSignal(object)     # the task's return value
+    error = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+
+class Worker(QRunnable):
+    """Runs a task on a QThreadPool and reports back to the GUI thread through signals.
+
+    The task is called as task(worker, *args, **kwargs) so it can report
+    progress and check for cancellation between steps.
+    """
+
+    def __init__(self, task, *args, **kwargs):
+        super().__init__()
+        self.task = task
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+        self._cancel = threading.Event()
+        # We keep a reference ourselves until the signals have been handled
+        self.setAutoDelete(False)
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def is_cancelled(self):
+        return self._cancel.is_set()
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise Cancelled()
+
+    def report(self, percent, message=""):
+        self.signals.progress.emit(percent, message)
+
+    def emit_partial(self, value):
+        self.signals.partial.emit(value)
+
+    def run(self):
+        try:
+            result = self.task(self, *self.args, **self.kwargs)
+        except Cancelled:
+            self.signals.cancelled.emit()
+            return
+        except Exception as e:
+            if self.is_cancelled:
+                self.signals.cancelled.emit()
+            else:
+                self.signals.error.emit(str(e))
+            return
+
+        # A blocking call can't be interrupted, so a late result is simply dropped
+        if self.is_cancelled:
+            self.signals.cancelled.emit()
+        else:
+            self.signals.finished.emit(result)